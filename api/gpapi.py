@@ -2,20 +2,29 @@
 # version 1 PSB, 
 #  - requires all data files to be present as data files are checked at startup
 #  - allows running with any network (not tied to one network or the other)
-#  - runs GP in foreground so response is not given until GP is complete
+#  - preloads the data of the network into memory at startup, /ready reports when done
+#  - runs GP jobs on a bounded pool of worker threads.  Jobs are submitted to /jobs/ 
+#    and polled for status and results, /run/ waits for the job without blocking the server
 
 
 import os, sys
 import os.path as osp
 import pathlib
+import asyncio
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 
 import pandas as pd
 
-from typing import Union, Literal
+from typing import Callable, Optional, Union, Literal
 from pydantic import BaseModel, Field
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, status
 
 from geneplexus import GenePlexus, config, util
+from geneplexus.cache import DATA_CACHE, ResultCache
 
 ############ types
 GENESET = list[str]
@@ -78,6 +87,19 @@ class GPconvertOut(BaseModel):
     entrez_id: int = Field(alias = "Entrez ID")
     in_network: Literal['Y', 'N'] = Field(alias = "In Network")
      
+class GPstage(BaseModel):
+    """ one stage of the run profile, see geneplexus.profile.Profile """
+    # example data
+    # {'name': 'fit', 'depth': 1, 'start': 0.52, 'wall_time': 0.31, 'cpu_time': 0.33, 
+    #  'peak_rss_delta': 1048576, 'bytes_read': 0}
+    name: str
+    depth: int
+    start: float
+    wall_time: float
+    cpu_time: float
+    peak_rss_delta: Optional[int] = None
+    bytes_read: Optional[int] = None
+
 class GPOutput(BaseModel):
     probs: list[GPprob]
     edge_list: list[GPedge]
@@ -86,6 +108,17 @@ class GPOutput(BaseModel):
     sim_dis: list[GPsimDis]
     convert_out: list[GPconvertOut]
     positive_genes: int
+    profile: list[GPstage] = []
+
+class GPJob(BaseModel):
+    """status of a GP job.  stage is the latest status message reported by the GPRunner"""
+    job_id: str
+    status: Literal['queued', 'running', 'done', 'failed'] = 'queued'
+    stage: str = ""
+    submitted: float
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    error: Optional[str] = None
 
 
 
@@ -108,7 +141,7 @@ def all_data_files_present(file_loc:str)->bool:
 class GPRunner():
     """ class to run GP, collect outputs and create graph structure"""
 
-    def __init__(self,file_loc:str, net_type:config.NET_TYPE):
+    def __init__(self,file_loc:str, net_type:config.NET_TYPE, result_cache:Optional[ResultCache] = None):
         
         self.status = ""
         self.set_status("validating backend data")
@@ -118,59 +151,195 @@ class GPRunner():
         
         self.file_loc = file_loc
         self.net_type = net_type
+        # reuse the outputs (and models) of repeated gene sets instead of rerunning the pipeline
+        self.result_cache = result_cache
+        # set once all data is preloaded
+        self.ready = threading.Event()
+        self.preload_error: Optional[str] = None
+        
+    def preload(self, features:list[config.FEATURE_TYPE], gscs:list[config.GSC_TYPE]):
+        """load all data for the network into the shared in-memory data cache, so runs only do 
+        the work specific to the gene set.  Runs submitted before preloading is done still work 
+        but load data on demand"""
+        self.set_status(f"preloading data for {self.net_type}: features {features}, gscs {gscs}")
+        start = time.time()
+        try:
+            util.preload_data(self.file_loc, [self.net_type], features, gscs)
+        except Exception as e:
+            self.preload_error = f"{type(e).__name__}: {e}"
+            self.set_status(f"preloading failed, {self.preload_error}")
+            return
+        self.ready.set()
+        self.set_status(f"preloading done in {time.time() - start:.1f}s, {DATA_CACHE.stats()}")
         
 
     def set_status(self,status_msg:str):
         self.status = status_msg
         print(status_msg) 
 
-    def run(self,gpinput:GPInput) -> GPOutput:
-        """run the whole GP pipeline.  Alter outputs to make them API/JSON friendly"""
+    def get_output_key(self, gpinput:GPInput) -> str:
+        """result cache key of the whole pipeline output.  Covers the input and the versions
+        (size and modification time) of all files in the data directory"""
+        data_versions = {}
+        for entry in os.scandir(self.file_loc):
+            if entry.is_file():
+                stat = entry.stat()
+                data_versions[entry.name] = [stat.st_size, stat.st_mtime_ns]
+        return ResultCache.make_key(
+            output="gpapi",
+            net_type=gpinput.net_type,
+            features=gpinput.features,
+            gsc=gpinput.gsc,
+            geneset=gpinput.geneset,
+            data_versions=data_versions,
+        )
+
+    def run(self,gpinput:GPInput, set_status:Optional[Callable[[str], None]] = None) -> GPOutput:
+        """run the whole GP pipeline.  Alter outputs to make them API/JSON friendly
+        
+        set_status is called with each stage of the pipeline, use self.set_status if not set 
+        (e.g. to report the status of a job)
+
+        with a result cache, the output of a repeated query is returned right away (without
+        a profile) instead of rerunning the pipeline
+        """
+        if set_status is None:
+            set_status = self.set_status
         
         # if no net_type is sent, use class property to set it 
         if not gpinput.net_type:
             gpinput.net_type = self.net_type
-        self.set_status(status_msg=f"starting GP with {net_type}")
+
+        output_key = None
+        if self.result_cache is not None:
+            output_key = self.get_output_key(gpinput)
+            output = self.result_cache.get(output_key)
+            if output is not None:
+                set_status(f"using cached output {output_key}")
+                return GPOutput(**output)
+
+        set_status(f"starting GP with {gpinput.net_type}")
         
         gp = GenePlexus(self.file_loc, 
                         gpinput.net_type, 
                         gpinput.features, 
-                        gpinput.gsc
+                        gpinput.gsc,
+                        result_cache = self.result_cache
                         )
         
         # load genes on separate process for profiling and debugging
-        self.set_status(status_msg=f"loading geneset")
+        set_status(f"loading geneset")
         gp.load_genes(gpinput.geneset)
         
-        self.set_status(status_msg=f"loaded {len(gpinput.geneset)} genes")
+        set_status(f"loaded {len(gpinput.geneset)} genes")
         
         # GP pipeline
-        self.set_status(status_msg=f"calculating model weights")
+        set_status(f"calculating model weights")
 
         mdl_weights, df_probs, avgps = gp.fit_and_predict()
-        self.set_status(status_msg=f"make_sim_dfs")
+        set_status(f"make_sim_dfs")
         df_sim_go, df_sim_dis, weights_go, weights_dis = gp.make_sim_dfs()
-        self.set_status(status_msg=f"make edgelist")
+        set_status(f"make edgelist")
 
         df_edgelist, isolated_genes, df_edge_sym, isolated_genes_sym = gp.make_small_edgelist()
-        self.set_status(status_msg=f"make gene list")
+        set_status(f"make gene list")
         df_convert_out, positive_genes = gp.alter_validation_df()
         
         # convert data frames to dictionaries for type checking and 
         # fix column names as needed to make it api/JSON friendly        
-        self.set_status(status_msg=f"preparing output")
+        set_status(f"preparing output")
         df_convert_out.columns = ["Original ID","Entrez ID","In Network"]
 
-        return(GPOutput(
+        output = dict(
                     probs=df_probs.to_dict('records'),
                     sim_go = df_sim_go.to_dict('records'), 
                     edge_list=df_edgelist.to_dict('records'),
                     sim_dis = df_sim_dis.to_dict('records'),
                     avgps = avgps, 
                     convert_out = df_convert_out.to_dict('records'),
-                    positive_genes = positive_genes
+                    positive_genes = positive_genes,
                     )
-                )
+        if output_key is not None:
+            self.result_cache.put(output_key, output)
+
+        return(GPOutput(**output, profile = gp.profile.stages))
+
+
+class QueueFullError(Exception):
+    """raised when the job queue is at capacity"""
+
+
+class JobManager():
+    """ run GP jobs on a bounded pool of worker threads, and keep their status and results 
+    
+    at most max_queued jobs can be waiting or running, further submissions are rejected 
+    with QueueFullError until jobs finish (backpressure).  Only the most recent 
+    max_finished jobs are kept for fetching status and results. 
+    """
+
+    def __init__(self, gprunner:GPRunner, max_workers:int = 2, max_queued:int = 16, max_finished:int = 100):
+        self.gprunner = gprunner
+        self.max_queued = max_queued
+        self.max_finished = max_finished
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gpjob")
+        self.lock = threading.Lock()
+        self.jobs: OrderedDict[str, GPJob] = OrderedDict()
+        self.futures: dict[str, Future] = {}
+        self.num_pending = 0
+
+    def submit(self, gpinput:GPInput) -> tuple[GPJob, Future]:
+        """queue a GP run, return the job and the future of its output.
+        raises QueueFullError if too many jobs are pending"""
+        with self.lock:
+            if self.num_pending >= self.max_queued:
+                raise QueueFullError(f"{self.num_pending} jobs pending, try again later")
+            self.num_pending += 1
+            job = GPJob(job_id=uuid.uuid4().hex, submitted=time.time())
+            self.jobs[job.job_id] = job
+            self.futures[job.job_id] = future = self.executor.submit(self._run, job, gpinput)
+        # the job is only marked finished once its output (or error) is available from the future
+        future.add_done_callback(lambda future: self._finish(job, future))
+        return job, future
+
+    def _run(self, job:GPJob, gpinput:GPInput) -> GPOutput:
+        job.status = 'running'
+        job.started = time.time()
+
+        def set_status(status_msg:str):
+            job.stage = status_msg
+            self.gprunner.set_status(f"job {job.job_id}: {status_msg}")
+
+        return self.gprunner.run(gpinput, set_status=set_status)
+
+    def _finish(self, job:GPJob, future:Future):
+        """record the outcome of the job, called when its future is done"""
+        error = future.exception()
+        if error is None:
+            job.status = 'done'
+        else:
+            job.status = 'failed'
+            job.error = f"{type(error).__name__}: {error}"
+        job.finished = time.time()
+        with self.lock:
+            self.num_pending -= 1
+            self._drop_finished()
+
+    def _drop_finished(self):
+        """forget the oldest finished jobs beyond max_finished"""
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished is not None]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self.jobs[job_id]
+            del self.futures[job_id]
+
+    def get(self, job_id:str) -> GPJob:
+        """return the job, raises KeyError for unknown (or dropped) jobs"""
+        with self.lock:
+            return self.jobs[job_id]
+
+    def get_future(self, job_id:str) -> Future:
+        """return the future of the job output, raises KeyError for unknown (or dropped) jobs"""
+        with self.lock:
+            return self.futures[job_id]
 
 
 ######### api
@@ -184,7 +353,42 @@ file_loc = os.getenv('FILE_LOC', '../.data')
 
 all_data_files_present(file_loc)
 
-gprunner = GPRunner(file_loc, net_type)
+# memory budget for the data shared by all runs, needs to fit the preloaded data
+if os.getenv('CACHE_MAX_BYTES'):
+    DATA_CACHE.set_max_bytes(int(os.getenv('CACHE_MAX_BYTES')))
+
+# cache of model results for repeated gene sets, in memory and optionally on disk
+result_cache = ResultCache(max_bytes = int(os.getenv('RESULT_CACHE_MAX_BYTES', str(256 * 1024**2))),
+                           cache_dir = os.getenv('RESULT_CACHE_DIR'),
+                           max_disk_bytes = int(os.getenv('RESULT_CACHE_MAX_DISK_BYTES', str(4 * 1024**3)))
+                           )
+
+gprunner = GPRunner(file_loc, net_type, result_cache)
+
+# preload in the background so the server can respond (e.g. to /ready) while loading
+preload_features = os.getenv('PRELOAD_FEATURES', 'Embedding').split(',')
+preload_gscs = os.getenv('PRELOAD_GSCS', ','.join(config.ALL_GSCS)).split(',')
+threading.Thread(target=gprunner.preload, args=(preload_features, preload_gscs), daemon=True).start()
+
+# number of concurrent GP runs, and maximum number of waiting or running jobs
+jobmanager = JobManager(gprunner, 
+                        max_workers = int(os.getenv('MAX_WORKERS', '2')),
+                        max_queued = int(os.getenv('MAX_QUEUED_JOBS', '16')),
+                        max_finished = int(os.getenv('MAX_FINISHED_JOBS', '100'))
+                        )
+
+def submit_job(gpinput: GPInput) -> tuple[GPJob, Future]:
+    """submit to the job manager, respond with 429 Too Many Requests if the queue is full"""
+    try:
+        return jobmanager.submit(gpinput)
+    except QueueFullError as e:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(e), headers={"Retry-After": "30"})
+
+def get_job(job_id: str) -> GPJob:
+    try:
+        return jobmanager.get(job_id)
+    except KeyError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"job {job_id} not found")
 
 @app.get("/")
 async def root():
@@ -192,6 +396,19 @@ async def root():
     app_name = os.getenv('APPNAME', 'no name app')
     return {"message": app_name}
  
+@app.get("/ready")
+async def ready():
+    """readiness check, 503 Service Unavailable until the network data is preloaded"""
+    if not gprunner.ready.is_set():
+        detail = gprunner.preload_error or f"preloading data for {gprunner.net_type}"
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=detail)
+    return {"ready": True, "net_type": gprunner.net_type, "cache": DATA_CACHE.stats()}
+
+@app.get("/stats")
+async def stats():
+    """hit rates and memory usage of the result and data caches"""
+    return {"result_cache": result_cache.stats(), "data_cache": DATA_CACHE.stats()}
+
 @app.post("/check/") 
 async def check(gpinput: GPInput) -> GPInput:
     """ mirror the input to check that the server is accepting input"""
@@ -200,9 +417,37 @@ async def check(gpinput: GPInput) -> GPInput:
     
 @app.post("/run/")
 async def run(gpinput: GPInput) -> GPOutput:
-    """run the GP pipeline for input parameters and geneset"""
-    gpoutput = gprunner.run(gpinput)
+    """run the GP pipeline for input parameters and geneset, and wait for the output. 
+    The pipeline runs on the job worker pool so the server stays responsive"""
+    job, future = submit_job(gpinput)
+    gpoutput = await asyncio.wrap_future(future)
     return(gpoutput)
+
+@app.post("/jobs/", status_code=status.HTTP_202_ACCEPTED)
+async def submit(gpinput: GPInput) -> GPJob:
+    """queue a run of the GP pipeline, returns the job with its id to poll status and results"""
+    job, future = submit_job(gpinput)
+    return(job)
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str) -> GPJob:
+    """status of the job: queued, running (with current pipeline stage), done or failed"""
+    return(get_job(job_id))
+
+@app.get("/jobs/{job_id}/result")
+async def job_result(job_id: str) -> GPOutput:
+    """output of a finished job.  409 Conflict if the job is not finished, 500 if it failed"""
+    job = get_job(job_id)
+    if job.status == 'failed':
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=job.error)
+    if job.status != 'done':
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"job {job_id} is {job.status}")
+    try:
+        future = jobmanager.get_future(job_id)
+    except KeyError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"job {job_id} not found")
+    # the job is done, so the future is resolved and awaiting it does not block
+    return(await asyncio.wrap_future(future))
    
 
 
@@ -0,0 +1,30 @@
+"""Benchmarks of the custom network builders."""
+import os.path as osp
+import shutil
+
+import pytest
+
+from geneplexus import custom
+
+
+@pytest.fixture
+def custom_dir(data_dir, tmp_path):
+    """Data directory with the edgelist, NodeOrder, and original GSC files."""
+    for fn in ["Edgelist_BioGRID.edg", "NodeOrder_BioGRID.txt", "GSCOriginal_GO.json"]:
+        shutil.copy(osp.join(data_dir, fn), tmp_path / fn)
+    return str(tmp_path)
+
+
+def test_edgelist_to_nodeorder(benchmark, custom_dir):
+    edgelist_loc = osp.join(custom_dir, "Edgelist_BioGRID.edg")
+    benchmark(lambda: custom.edgelist_to_nodeorder(edgelist_loc, custom_dir, "custom"))
+
+
+@pytest.mark.parametrize("features", ["Adjacency", "Influence", "Embedding"])
+def test_edgelist_to_matrix(benchmark, custom_dir, features):
+    edgelist_loc = osp.join(custom_dir, "Edgelist_BioGRID.edg")
+    benchmark(lambda: custom.edgelist_to_matrix(edgelist_loc, custom_dir, "BioGRID", features))
+
+
+def test_subset_gsc_to_network(benchmark, custom_dir):
+    benchmark(lambda: custom.subset_gsc_to_network(custom_dir, "BioGRID", "GO", min_size=5))
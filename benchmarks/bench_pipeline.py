@@ -0,0 +1,81 @@
+"""Benchmarks of the GenePlexus pipeline stages and the CLI."""
+import copy
+import os.path as osp
+
+import numpy as np
+import pytest
+
+from geneplexus import GenePlexus
+from geneplexus import util
+
+FEATURES = ["Adjacency", "Influence", "Embedding"]
+NUM_GENES = [10, 50, 200]
+
+
+def get_genes(data_dir: str, num_genes: int):
+    """Get an input gene list of network genes, half of them as symbols."""
+    genes = np.loadtxt(osp.join(data_dir, "NodeOrder_BioGRID.txt"), dtype=str)
+    genes = np.random.default_rng(0).choice(genes, num_genes, replace=False).tolist()
+    return genes[: num_genes // 2] + [f"SYM{gene}" for gene in genes[num_genes // 2 :]]
+
+
+@pytest.fixture
+def gp(data_dir, features):
+    """GenePlexus object on the synthetic data, with the data cache filled."""
+    gp = GenePlexus(data_dir, "BioGRID", features, "GO")
+    util.preload_data(data_dir, ["BioGRID"], [features], ["GO", "DisGeNet"])
+    return gp
+
+
+@pytest.mark.parametrize("features", FEATURES)
+def test_load_data(benchmark, data_dir, features):
+    benchmark(lambda: util.preload_data(data_dir, ["BioGRID"], [features], ["GO", "DisGeNet"]), cold=True)
+
+
+@pytest.mark.parametrize("num_genes", NUM_GENES)
+@pytest.mark.parametrize("features", ["Embedding"])
+def test_load_genes(benchmark, gp, data_dir, num_genes):
+    genes = get_genes(data_dir, num_genes)
+    benchmark(lambda gp_copy: gp_copy.load_genes(genes), setup=lambda: (copy.copy(gp),))
+
+
+@pytest.mark.parametrize("num_genes", NUM_GENES)
+@pytest.mark.parametrize("features", FEATURES)
+def test_fit_and_predict(benchmark, gp, data_dir, num_genes):
+    gp.load_genes(get_genes(data_dir, num_genes))
+    benchmark(lambda gp_copy: gp_copy.fit_and_predict(min_num_pos=5), setup=lambda: (copy.copy(gp),))
+
+
+@pytest.mark.parametrize("features", FEATURES)
+def test_make_sim_dfs(benchmark, gp, data_dir):
+    gp.load_genes(get_genes(data_dir, 50))
+    gp.fit_and_predict()
+    benchmark(lambda gp_copy: gp_copy.make_sim_dfs(), setup=lambda: (copy.copy(gp),))
+
+
+@pytest.mark.parametrize("num_genes", NUM_GENES)
+@pytest.mark.parametrize("features", ["Embedding"])
+def test_make_small_edgelist(benchmark, gp, data_dir, num_genes):
+    gp.load_genes(get_genes(data_dir, num_genes))
+    gp.fit_and_predict(min_num_pos=5)
+    benchmark(lambda gp_copy: gp_copy.make_small_edgelist(num_nodes=num_genes), setup=lambda: (copy.copy(gp),))
+
+
+@pytest.mark.parametrize("features", FEATURES)
+def test_cli(benchmark, data_dir, features, tmp_path):
+    input_file = tmp_path / "input_genes.txt"
+    input_file.write_text("\n".join(get_genes(data_dir, 50)))
+    args = [
+        f"--input_file={input_file}",
+        "--network=BioGRID",
+        f"--feature={features}",
+        f"--data_dir={data_dir}",
+        f"--output_dir={tmp_path / 'result'}",
+        "--overwrite",
+        "--quiet",
+    ]
+    benchmark.module("geneplexus.cli", args)
+
+
+def test_cli_startup(benchmark):
+    benchmark.module("geneplexus.cli", ["--help"])
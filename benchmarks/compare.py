@@ -0,0 +1,80 @@
+"""Compare benchmark results against a baseline.
+
+Example:
+    Run the benchmarks on the baseline and on the new code, then compare
+
+    .. code-block:: bash
+
+        pytest benchmarks/ --bench-output base.json
+        pytest benchmarks/ --bench-output new.json
+        python benchmarks/compare.py base.json new.json
+
+    The script exits with a non-zero status if any benchmark is slower or uses
+    more memory than the baseline by more than the tolerance.
+
+"""
+import argparse
+import json
+import sys
+from typing import Any
+from typing import Dict
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse arguments from command line."""
+    parser = argparse.ArgumentParser(description="Compare benchmark results against a baseline.")
+    parser.add_argument("baseline", help="Baseline benchmark results (JSON).")
+    parser.add_argument("results", help="New benchmark results (JSON).")
+    parser.add_argument(
+        "--time-tolerance",
+        default=0.2,
+        type=float,
+        help="Maximum relative increase of the minimum run time (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--memory-tolerance",
+        default=0.1,
+        type=float,
+        help="Maximum relative increase of the peak memory (default: %(default)s).",
+    )
+    return parser.parse_args()
+
+
+def load_results(path: str) -> Dict[str, Dict[str, Any]]:
+    """Load benchmark results keyed by the benchmark names."""
+    with open(path) as f:
+        return {result["name"]: result for result in json.load(f)["benchmarks"]}
+
+
+def main():
+    """Print the relative changes and exit with 1 if any is regressed."""
+    args = parse_args()
+    baseline = load_results(args.baseline)
+    results = load_results(args.results)
+
+    width = max(map(len, results), default=4)
+    print(f"{'name':<{width}} {'time':>8} {'memory':>8}")
+    num_regressed = 0
+    for name, result in results.items():
+        if name not in baseline:
+            print(f"{name:<{width}} {'new':>8} {'new':>8}")
+            continue
+        # The minimum run time is the least affected by other processes
+        time_change = result["min_time"] / baseline[name]["min_time"] - 1
+        memory_change = float("nan")
+        if result["peak_memory"] is not None and baseline[name]["peak_memory"] is not None:
+            memory_change = result["peak_memory"] / max(baseline[name]["peak_memory"], 1) - 1
+        regressed = time_change > args.time_tolerance or memory_change > args.memory_tolerance
+        num_regressed += regressed
+        print(f"{name:<{width}} {time_change:>+8.1%} {memory_change:>+8.1%}{'  REGRESSED' if regressed else ''}")
+
+    for name in baseline.keys() - results.keys():
+        print(f"{name:<{width}} {'missing':>8} {'missing':>8}")
+
+    if num_regressed:
+        print(f"{num_regressed} benchmark(s) regressed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
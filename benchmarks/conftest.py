@@ -0,0 +1,221 @@
+"""Benchmark fixtures, options and reporting.
+
+Each benchmark runs the measured function once with :mod:`tracemalloc` to
+record the peak memory allocated, then times it over a number of rounds.
+Modules run as scripts (e.g., the CLI) are run in subprocesses, recording the
+peak resident set size of the subprocess instead.
+The results are summarized at the end of the session and can be saved to a
+JSON file to be compared against a baseline with ``benchmarks/compare.py``.
+"""
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+
+import pytest
+
+from geneplexus.cache import DATA_CACHE
+from geneplexus.synthetic import make_synthetic_data
+
+RESULTS: List[Dict[str, Any]] = []
+
+# Run a module as a script and save the peak resident set size (kB) of the
+# process to a file at exit, i.e., ``python -c RUN_MODULE_CODE path module ...``
+RUN_MODULE_CODE = """
+import atexit, runpy, sys
+
+def save_peak_rss(path=sys.argv.pop(1)):
+    try:
+        with open("/proc/self/status") as status:
+            peak_rss = next(line.split()[1] for line in status if line.startswith("VmHWM:"))
+    except (OSError, StopIteration):
+        return
+    with open(path, "w") as f:
+        f.write(peak_rss)
+
+atexit.register(save_peak_rss)
+runpy.run_module(sys.argv.pop(1), run_name="__main__", alter_sys=True)
+"""
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("geneplexus benchmarks")
+    group.addoption(
+        "--bench-nodes",
+        default="1000,4000",
+        help="Comma separated numbers of network nodes to benchmark.",
+    )
+    group.addoption(
+        "--bench-rounds",
+        default=3,
+        type=int,
+        help="Number of timed rounds of each benchmark.",
+    )
+    group.addoption(
+        "--bench-output",
+        default=None,
+        help="Save the benchmark results to this JSON file.",
+    )
+
+
+def pytest_generate_tests(metafunc):
+    if "num_nodes" in metafunc.fixturenames:
+        num_nodes = [int(i) for i in metafunc.config.getoption("bench_nodes").split(",")]
+        metafunc.parametrize("num_nodes", num_nodes, scope="session")
+
+
+@pytest.fixture(scope="session")
+def data_dir(tmp_path_factory, num_nodes):
+    """Synthetic data directory of a network with ``num_nodes`` nodes."""
+    path = tmp_path_factory.mktemp(f"data_{num_nodes}")
+    make_synthetic_data(str(path), num_nodes)
+    return str(path)
+
+
+class Benchmark:
+    """Measure and record the run time and peak memory of a function."""
+
+    def __init__(self, name: str, params: Dict[str, Any], rounds: int):
+        """Initialize the benchmark.
+
+        Args:
+            name: Name of the benchmark.
+            params: Parameters of the benchmark, e.g., the number of nodes.
+            rounds: Number of timed rounds.
+
+        """
+        self.name = name
+        self.params = params
+        self.rounds = rounds
+
+    def __call__(self, func: Callable, setup: Optional[Callable[[], tuple]] = None, cold: bool = False) -> Any:
+        """Run the benchmark.
+
+        Args:
+            func: Function to measure.
+            setup: Function returning the arguments of ``func``, called
+                before each round and not measured.
+            cold: If set, then clear the data cache before each round, so that
+                the data loading is measured as well.
+
+        Returns:
+            The return value of the last call of ``func``.
+
+        """
+
+        def run_round(trace: bool):
+            args = setup() if setup is not None else ()
+            if cold:
+                DATA_CACHE.clear()
+            gc.collect()
+            if trace:
+                tracemalloc.start()
+            start = time.perf_counter()
+            out = func(*args)
+            elapsed = time.perf_counter() - start
+            peak = None
+            if trace:
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            return out, elapsed, peak
+
+        out, _, peak_memory = run_round(trace=True)
+        times = [run_round(trace=False)[1] for _ in range(self.rounds)]
+        self._record(times, peak_memory, "tracemalloc", cold)
+        return out
+
+    def module(self, module: str, args: List[str]):
+        """Run the benchmark on a Python module run as a script in a subprocess.
+
+        The peak memory is the peak resident set size of the subprocess, only
+        available on Linux.
+
+        Args:
+            module: Name of the module, e.g., ``"geneplexus.cli"``.
+            args: Command line arguments of the module.
+
+        """
+        times, peak_memory = [], None
+        with tempfile.TemporaryDirectory() as tmpdir:
+            peak_rss_path = os.path.join(tmpdir, "peak_rss")
+            for _ in range(self.rounds):
+                start = time.perf_counter()
+                subprocess.run(
+                    [sys.executable, "-c", RUN_MODULE_CODE, peak_rss_path, module, *args],
+                    check=True,
+                    stdout=subprocess.DEVNULL,
+                )
+                times.append(time.perf_counter() - start)
+                if os.path.isfile(peak_rss_path):
+                    with open(peak_rss_path) as f:
+                        peak_memory = max(peak_memory or 0, int(f.read()) * 1024)
+        self._record(times, peak_memory, "peak_rss", True)
+
+    def _record(self, times: List[float], peak_memory: Optional[int], memory: str, cold: bool):
+        RESULTS.append(
+            {
+                "name": self.name,
+                "params": self.params,
+                "cold": cold,
+                "times": times,
+                "min_time": min(times),
+                "median_time": statistics.median(times),
+                "peak_memory": peak_memory,
+                "memory": memory,
+            },
+        )
+
+
+@pytest.fixture
+def benchmark(request):
+    """Benchmark the run time and peak memory of a function."""
+    params = {}
+    if hasattr(request.node, "callspec"):
+        params = {key: val for key, val in request.node.callspec.params.items() if key != "data_dir"}
+    return Benchmark(request.node.name, params, request.config.getoption("bench_rounds"))
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    if not RESULTS:
+        return
+
+    terminalreporter.section("geneplexus benchmarks")
+    width = max(len(result["name"]) for result in RESULTS)
+    terminalreporter.write_line(f"{'name':<{width}} {'min (s)':>10} {'median (s)':>10} {'peak mem (MB)':>14}")
+    for result in sorted(RESULTS, key=lambda result: result["name"]):
+        terminalreporter.write_line(
+            f"{result['name']:<{width}} {result['min_time']:>10.4f} {result['median_time']:>10.4f} "
+            f"{(result['peak_memory'] or float('nan')) / 2**20:>14.1f}",
+        )
+
+    output = config.getoption("bench_output")
+    if output is not None:
+        info = {
+            "commit": _get_commit(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "platform": platform.platform(),
+        }
+        with open(output, "w") as f:
+            json.dump({"info": info, "benchmarks": RESULTS}, f, indent=4)
+        terminalreporter.write_line(f"Benchmark results saved to {output}")
+
+
+def _get_commit() -> Optional[str]:
+    """Get the git commit of the benchmarked code if available."""
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
@@ -125,11 +125,42 @@ However, when using a custom network, the model similarity
 analysis *cannot* be done due to the lack to pretrained models.
 
 """
-from ._config import config  # noreorder
-from . import download
-from . import util
-from . import custom
-from .geneplexus import GenePlexus
+import importlib
+from typing import Any
+from typing import List
+from typing import TYPE_CHECKING
 
+from ._config import config
 
-__all__ = ["download", "GenePlexus", "util", "config", "custom"]
+if TYPE_CHECKING:
+    from . import cache
+    from . import custom
+    from . import download
+    from . import index
+    from . import precision
+    from . import profile
+    from . import synthetic
+    from . import util
+    from .geneplexus import GenePlexus
+
+# Submodules and the GenePlexus class are imported on first access, so that
+# importing the package (e.g., to run the CLI) does not load the heavy
+# dependencies (scikit-learn, SciPy, pandas, requests) until needed
+_SUBMODULES = ["cache", "custom", "download", "index", "precision", "profile", "synthetic", "util"]
+
+
+def __getattr__(name: str) -> Any:
+    if name in _SUBMODULES:
+        return importlib.import_module(f".{name}", __name__)
+    elif name == "GenePlexus":
+        from .geneplexus import GenePlexus
+
+        return GenePlexus
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> List[str]:
+    return sorted(__all__)
+
+
+__all__ = ["cache", "download", "index", "profile", "GenePlexus", "util", "config", "custom", "synthetic", "precision"]
@@ -5,13 +5,22 @@ from typing import Any
 from typing import Dict
 from typing import List
 from typing import Literal
+from typing import Optional
 from typing import Set
 from typing import Tuple
+from typing import TYPE_CHECKING
 from typing import Union
 
-import numpy as np
+# Only needed for type annotations, not imported at runtime to keep the import fast
+if TYPE_CHECKING:
+    import numpy as np
 
 MAX_RETRY = 10  # maximum number of retries for downloading
+DEFAULT_CACHE_MAX_BYTES = 2 * 1024**3  # memory budget of the data cache (2GB)
+FEATURE_CHUNK_BYTES = 64 * 1024**2  # size of feature row blocks processed at once (64MB)
+EDGELIST_CHUNK_ROWS = 1_000_000  # number of edgelist lines parsed at once
+DOWNLOAD_CHUNK_BYTES = 1024**2  # size of chunks streamed to disk when downloading (1MB)
+DOWNLOAD_PROGRESS_INTERVAL = 10  # seconds between download progress reports
 
 URL_DICT = {
     "Zenodo": "https://zenodo.org/record/6383205/files/",
@@ -37,8 +46,18 @@ DEFAULT_LOGREG_KWARGS: Dict[str, Any] = {
 
 LOG_LEVEL_TYPE = Literal["CRITICAL", "ERROR", "WARNING", "INFO", "DEBUG"]
 
+MMAP_MODES = [None, "r", "c"]
+MMAP_MODE_TYPE = Optional[Literal["r", "c"]]
+
+# Precisions the network features, correction matrices, and pretrained weights
+# can be stored in (see geneplexus.precision), float64 being the original data
+PRECISIONS = ["float64", "float32", "float16", "int8"]
+PRECISION_TYPE = Literal["float64", "float32", "float16", "int8"]
+
 ID_SRC_TYPE = Literal["ENSG", "ENSP", "ENST", "Entrez", "Symbol"]
 ID_DST_TYPE = Literal["Entrez", "ENSG", "Name", "Symbol"]
+ID_CONVERSION_SRC_TYPES: List[ID_SRC_TYPE] = ["ENSG", "Symbol", "ENSP", "ENST"]  # in order of priority
+ID_CONVERSION_INDEX_FILENAME = "IDconversion_Homo-sapiens_index.npz"
 VALID_ID_CONVERSION: Set[Tuple[ID_SRC_TYPE, ID_DST_TYPE]] = {
     ("ENSG", "Entrez"),
     ("ENSP", "Entrez"),
@@ -60,11 +79,12 @@ FEATURE_SELECTION_TYPE = Union[Literal["All"], FEATURE_TYPE, List[FEATURE_TYPE]]
 GSC_SELECTION_TYPE = Union[Literal["All"], GSC_TYPE, List[GSC_TYPE]]
 
 ID_CONVERSION_MAP_TYPE = Dict[str, List[str]]
-GSC_DATA_TYPE = Dict[str, Dict[Literal["Name", "Genes"], Union[str, np.ndarray]]]
-PRETRAINED_DATA_TYPE = Dict[str, Dict[Literal["Name", "Weights", "PosGenes"], Union[str, np.ndarray]]]
+GSC_DATA_TYPE = Dict[str, Dict[Literal["Name", "Genes"], Union[str, "np.ndarray"]]]
+PRETRAINED_DATA_TYPE = Dict[str, Dict[Literal["Name", "Weights", "PosGenes"], Union[str, "np.ndarray"]]]
 
 __all__ = [
     "URL_DICT",
+    "DEFAULT_CACHE_MAX_BYTES",
     "CONFIG_PATH",
     "DATA_FILENAMES_PATH",
     "ALL_TASKS",
@@ -72,8 +92,13 @@ __all__ = [
     "ALL_FEATURES",
     "ALL_GSCS",
     "LOG_LEVEL_TYPE",
+    "MMAP_MODE_TYPE",
+    "PRECISIONS",
+    "PRECISION_TYPE",
     "ID_SRC_TYPE",
     "ID_DST_TYPE",
+    "ID_CONVERSION_SRC_TYPES",
+    "ID_CONVERSION_INDEX_FILENAME",
     "VALID_ID_CONVERSION",
     "TASK_TYPE",
     "NET_TYPE",
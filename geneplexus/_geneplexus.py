@@ -1,48 +1,53 @@
-import os.path as osp
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 from typing import Dict
 from typing import Optional
 
 import numpy as np
 import pandas as pd
-from scipy.spatial.distance import cosine
+from scipy.special import expit
 from scipy.stats import hypergeom
 from scipy.stats import rankdata
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import average_precision_score
 from sklearn.model_selection import StratifiedKFold
-from sklearn.preprocessing import StandardScaler
 
+from . import profile
 from . import util
 from ._config import logger
 from ._config.config import DEFAULT_LOGREG_KWARGS
+from ._config.config import MMAP_MODE_TYPE
+from ._config.config import PRECISION_TYPE
+from .index import FeatureStats
 
 
 def _initial_id_convert(input_genes, file_loc):
-    # load all the possible conversion dictionaries
-    convert_types = ["ENSG", "Symbol", "ENSP", "ENST"]
-    all_convert_dict = {}
-    for anIDtype in convert_types:
-        convert_tmp = util.load_geneid_conversion(file_loc, anIDtype, "Entrez", upper=True)
-        all_convert_dict[anIDtype] = convert_tmp
+    # Entrez IDs are used directly, the rest are converted in batch using the
+    # (prebuilt) conversion index of all possible ID types
+    input_genes = list(input_genes)
+    entrez_ids = {}
+    for idx, agene in enumerate(input_genes):
+        try:
+            entrez_ids[idx] = int(agene)
+        except ValueError:
+            continue
+    other_idx = [idx for idx in range(len(input_genes)) if idx not in entrez_ids]
+    id_index = util.load_id_conversion_index(file_loc)
+    mapped = dict(zip(other_idx, id_index.convert([input_genes[idx] for idx in other_idx])))
 
     # make some place holder arrays
     convert_ids = []  # This will be a flat list for Entrez IDs to use as positives
     convert_out = []  # This will be a list of lists that will be used to tell user the conversions made
-    for agene in input_genes:
-        try:
-            agene_int = int(agene)
-            convert_out.append([agene_int, agene_int])
-            convert_ids.append(agene_int)
-        except ValueError:
-            converted_gene: Optional[str] = None
-            for anIDtype in convert_types:
-                if agene in all_convert_dict[anIDtype]:
-                    convert_ids.extend(all_convert_dict[anIDtype][agene])
-                    converted_gene = ", ".join(all_convert_dict[anIDtype][agene])
-                    logger.debug(f"Found mapping ({anIDtype}) {agene} -> {all_convert_dict[anIDtype][agene]}")
-                    break
-            convert_out.append([agene, converted_gene or "Could Not be mapped to Entrez"])
+    for idx, agene in enumerate(input_genes):
+        if idx in entrez_ids:
+            convert_out.append([entrez_ids[idx], entrez_ids[idx]])
+            convert_ids.append(entrez_ids[idx])
+        elif mapped[idx] is not None:
+            convert_ids.extend(mapped[idx])
+            convert_out.append([agene, ", ".join(mapped[idx])])
+            logger.debug(f"Found mapping ({id_index.get_src_type(agene)}) {agene} -> {mapped[idx]}")
+        else:
+            convert_out.append([agene, "Could Not be mapped to Entrez"])
 
     column_names = ["Original ID", "Entrez ID"]
     df_convert_out = pd.DataFrame(convert_out, columns=column_names).astype(str)
@@ -69,26 +74,25 @@ def _make_validation_df(df_convert_out, file_loc):
 
 
 def _get_genes_in_network(file_loc, net_type, convert_ids):
-    net_genes = util.load_node_order(file_loc, net_type)
+    net_index = util.load_network_index(file_loc, net_type)
     convert_ids = np.array(convert_ids, dtype=str)
-    pos_genes_in_net = np.intersect1d(convert_ids, net_genes)
-    genes_not_in_net = np.setdiff1d(convert_ids, net_genes)
-    return pos_genes_in_net, genes_not_in_net, net_genes
+    in_net = net_index.contains(convert_ids)
+    pos_genes_in_net = np.unique(convert_ids[in_net])
+    genes_not_in_net = np.unique(convert_ids[~in_net])
+    return pos_genes_in_net, genes_not_in_net, net_index.genes
 
 
 def _get_negatives(file_loc, net_type, gsc, pos_genes_in_net):
-    uni_genes = util.load_genes_universe(file_loc, gsc, net_type)
-    good_sets = util.load_gsc(file_loc, gsc, net_type)
-    M = len(uni_genes)
+    # Remove genes annotated to any term significantly enriched with the
+    # positive genes (hypergeometric test), in addition to the positives
+    gsc_incidence = util.load_gsc_incidence(file_loc, gsc, net_type)
+    M = gsc_incidence.universe_size
     N = len(pos_genes_in_net)
-    genes_to_remove = pos_genes_in_net
-    for akey in good_sets:
-        n = len(good_sets[akey]["Genes"])
-        k = len(np.intersect1d(pos_genes_in_net, good_sets[akey]["Genes"]))
-        pval = hypergeom.sf(k - 1, M, n, N)
-        if pval < 0.05:
-            genes_to_remove = np.union1d(genes_to_remove, good_sets[akey]["Genes"])
-    negative_genes = np.setdiff1d(uni_genes, genes_to_remove)
+    pos_mask = gsc_incidence.get_gene_mask(pos_genes_in_net)
+    k = gsc_incidence.get_overlaps(pos_mask)
+    pvals = hypergeom.sf(k - 1, M, gsc_incidence.set_sizes, N)
+    genes_to_remove = pos_mask | gsc_incidence.get_annotated_mask(pvals < 0.05)
+    negative_genes = gsc_incidence.genes[gsc_incidence.in_universe & ~genes_to_remove]
     return negative_genes
 
 
@@ -98,13 +102,15 @@ def _run_sl(
     features,
     pos_genes_in_net,
     negative_genes,
-    net_genes,
     logreg_kwargs: Optional[Dict[str, Any]] = None,
     min_num_pos: int = 15,
     num_folds: int = 3,
     null_val: float = -10,
     random_state: Optional[int] = 0,
     cross_validate: bool = True,
+    mmap_mode: MMAP_MODE_TYPE = None,
+    n_jobs: int = 1,
+    precision: PRECISION_TYPE = "float64",
 ):
     if logreg_kwargs is None:
         logreg_kwargs = DEFAULT_LOGREG_KWARGS
@@ -112,19 +118,26 @@ def _run_sl(
     else:
         logger.info(f"Using custom logistic regression settings: {logreg_kwargs}")
 
-    pos_inds = [np.where(net_genes == agene)[0][0] for agene in pos_genes_in_net]
-    neg_inds = [np.where(net_genes == agene)[0][0] for agene in negative_genes]
-    data = util.load_gene_features(file_loc, features, net_type)
-    std_scale = StandardScaler().fit(data)
-    data = std_scale.transform(data)
-    Xdata = data[pos_inds + neg_inds, :]
+    net_index = util.load_network_index(file_loc, net_type)
+    pos_inds = net_index.get_rows(pos_genes_in_net, missing_ok=False)
+    neg_inds = net_index.get_rows(negative_genes, missing_ok=False)
+    # Only the training rows are copied and standardized, using precomputed
+    # statistics. The standardization is folded into the model parameters
+    # for predicting the full (possibly memory-mapped) feature matrix.
+    # Reduced precision features are dequantized and computed with in float32
+    dtype = _get_dtype(precision)
+    data = util.load_gene_features(file_loc, features, net_type, mmap_mode=mmap_mode, precision=precision)
+    feature_stats = util.load_feature_stats(file_loc, features, net_type, precision=precision)
+    if feature_stats.shape != data.shape:
+        logger.warning(
+            f"Precomputed feature statistics {feature_stats.shape} do not match the features {data.shape}, recomputing",
+        )
+        feature_stats = FeatureStats.from_data(data)
+    with profile.stage("scaling"):
+        Xdata = feature_stats.transform(data[np.concatenate((pos_inds, neg_inds)), :]).astype(dtype, copy=False)
     ydata = np.array([1] * len(pos_inds) + [0] * len(neg_inds))
-    clf = LogisticRegression(**logreg_kwargs)
-    clf.fit(Xdata, ydata)
-    mdl_weights = np.squeeze(clf.coef_)
-    probs = clf.predict_proba(data)[:, 1]
 
-    avgps = [null_val] * num_folds
+    folds = []
     if not cross_validate:
         logger.info("Skipping cross validation.")
     elif len(pos_genes_in_net) < min_num_pos:
@@ -135,43 +148,73 @@ def _run_sl(
         )
     else:
         logger.info("Performing cross validation.")
-        avgps = []
         skf = StratifiedKFold(n_splits=num_folds, shuffle=True, random_state=random_state)
-        for trn_inds, tst_inds in skf.split(Xdata, ydata):
-            clf_cv = LogisticRegression(**logreg_kwargs)
-            clf_cv.fit(Xdata[trn_inds], ydata[trn_inds])
-            probs_cv = clf_cv.predict_proba(Xdata[tst_inds])[:, 1]
-            avgp = average_precision_score(ydata[tst_inds], probs_cv)
-            num_tst_pos = np.sum(ydata[tst_inds])
-            prior = num_tst_pos / Xdata[tst_inds].shape[0]
-            log2_prior = np.log2(avgp / prior)
-            avgps.append(log2_prior)
+        folds = list(skf.split(Xdata, ydata))
+
+    # The final model and the cross validation models are fitted concurrently
+    # in threads sharing the training data
+    with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+        clf_future = executor.submit(profile.in_context(_fit_logreg, "fit"), Xdata, ydata, logreg_kwargs)
+        avgp_futures = [
+            executor.submit(
+                profile.in_context(_cross_validate_fold, "cv_fold"),
+                Xdata,
+                ydata,
+                trn_inds,
+                tst_inds,
+                logreg_kwargs,
+            )
+            for trn_inds, tst_inds in folds
+        ]
+        clf = clf_future.result()
+        avgps = [future.result() for future in avgp_futures] if folds else [null_val] * num_folds
+
+    mdl_weights = np.squeeze(clf.coef_)
+    coef, intercept = feature_stats.fold_into_linear_model(clf.coef_[0], clf.intercept_[0])
+    with profile.stage("predict"):
+        probs = expit(data @ coef.astype(dtype, copy=False) + intercept)
+
+    if folds:
         logger.info(f"{avgps=}")
         logger.info(f"{np.median(avgps)=:.2f}")
         logger.info(f"{np.mean(avgps)=:.2f}")
     return mdl_weights, probs, avgps
 
 
-def _make_prob_df(file_loc, net_genes, probs, pos_genes_in_net, negative_genes):
-    Entrez_to_Symbol = util.load_geneid_conversion(file_loc, "Entrez", "Symbol")
-    Entrez_to_Name = util.load_geneid_conversion(file_loc, "Entrez", "Name")
-    prob_results = []
-    for idx in range(len(net_genes)):
-        if net_genes[idx] in pos_genes_in_net:
-            class_label = "P"
-            novel_label = "Known"
-        elif net_genes[idx] in negative_genes:
-            class_label = "N"
-            novel_label = "Novel"
-        else:
-            class_label = "U"
-            novel_label = "Novel"
-        syms_tmp = util.mapgene(net_genes[idx], Entrez_to_Symbol)
-        name_tmp = util.mapgene(net_genes[idx], Entrez_to_Name)
-        prob_results.append([net_genes[idx], syms_tmp, name_tmp, probs[idx], novel_label, class_label])
+def _get_dtype(precision):
+    return np.float64 if precision == "float64" else np.float32
+
+
+def _fit_logreg(Xdata, ydata, logreg_kwargs):
+    clf = LogisticRegression(**logreg_kwargs)
+    clf.fit(Xdata, ydata)
+    return clf
+
+
+def _cross_validate_fold(Xdata, ydata, trn_inds, tst_inds, logreg_kwargs):
+    clf_cv = _fit_logreg(Xdata[trn_inds], ydata[trn_inds], logreg_kwargs)
+    probs_cv = clf_cv.predict_proba(Xdata[tst_inds])[:, 1]
+    avgp = average_precision_score(ydata[tst_inds], probs_cv)
+    num_tst_pos = np.sum(ydata[tst_inds])
+    prior = num_tst_pos / Xdata[tst_inds].shape[0]
+    return np.log2(avgp / prior)
+
+
+def _make_prob_df(file_loc, net_type, probs, pos_genes_in_net, negative_genes):
+    net_index = util.load_network_index(file_loc, net_type)
+    if len(probs) != len(net_index):
+        raise ValueError(f"{len(probs)} probabilities for {len(net_index)} network genes")
+    is_pos = net_index.get_mask(pos_genes_in_net)
+    is_neg = net_index.get_mask(negative_genes) & ~is_pos
     df_probs = pd.DataFrame(
-        prob_results,
-        columns=["Entrez", "Symbol", "Name", "Probability", "Known/Novel", "Class-Label"],
+        {
+            "Entrez": net_index.genes,
+            "Symbol": util.load_network_gene_names(file_loc, net_type, "Symbol"),
+            "Name": util.load_network_gene_names(file_loc, net_type, "Name"),
+            "Probability": probs,
+            "Known/Novel": np.where(is_pos, "Known", "Novel"),
+            "Class-Label": np.where(is_pos, "P", np.where(is_neg, "N", "U")),
+        },
     )
     df_probs = df_probs.astype({"Entrez": str, "Probability": float})
     df_probs = df_probs.sort_values(by=["Probability"], ascending=False).reset_index(drop=True)
@@ -179,54 +222,76 @@ def _make_prob_df(file_loc, net_genes, probs, pos_genes_in_net, negative_genes):
     return df_probs
 
 
-def _make_sim_dfs(file_loc, mdl_weights, gsc, net_type, features):
+def _make_sim_dfs(file_loc, mdl_weights, gsc, net_type, features, precision="float64"):
     dfs_out = []
+    mdl_weights = np.asarray(mdl_weights, dtype=_get_dtype(precision))
     for target_set in ["GO", "DisGeNet"]:
-        weights_dict = util.load_pretrained_weights(file_loc, target_set, net_type, features)
-        if target_set == "GO":
-            weights_dict_GO = weights_dict
-        if target_set == "DisGeNet":
-            weights_dict_Dis = weights_dict
+        pretrained_models = util.load_pretrained_models(file_loc, target_set, net_type, features, precision=precision)
         order = util.load_correction_order(file_loc, target_set, net_type)
-        cor_mat = util.load_correction_mat(file_loc, gsc, target_set, net_type, features)
-        add_row = np.zeros((1, len(order)))
-        for idx, aset in enumerate(order):
-            cos_sim = 1 - cosine(weights_dict[aset]["Weights"], mdl_weights)
-            add_row[0, idx] = cos_sim
-        cor_mat = np.concatenate((cor_mat, add_row), axis=0)
-        last_row = cor_mat[-1, :]
-        zq = np.maximum(0, (last_row - np.mean(last_row)) / np.std(last_row))
-        zs = np.maximum(0, (last_row - np.mean(cor_mat, axis=0)) / np.std(cor_mat, axis=0))
-        z = np.sqrt(zq**2 + zs**2)
-        results_tmp = []
-        for idx2, termID_tmp in enumerate(order):
-            ID_tmp = termID_tmp
-            Name_tmp = weights_dict[termID_tmp]["Name"]
-            z_tmp = z[idx2]
-            results_tmp.append([ID_tmp, Name_tmp, z_tmp])
-        df_tmp = pd.DataFrame(results_tmp, columns=["ID", "Name", "Similarity"]).sort_values(
-            by=["Similarity"],
-            ascending=False,
-        )
+        cor_mat = util.load_correction_mat(file_loc, gsc, target_set, net_type, features, precision=precision)
+        rows = pretrained_models.get_rows(order)
+        z = _compute_model_similarities(pretrained_models.weights[rows], cor_mat, mdl_weights)
+        df_tmp = pd.DataFrame(
+            {"ID": order, "Name": pretrained_models.term_names[rows], "Similarity": z},
+        ).sort_values(by=["Similarity"], ascending=False)
         df_tmp["Rank"] = rankdata(1 / (df_tmp["Similarity"].to_numpy() + 1e-9), method="min")
         dfs_out.append(df_tmp)
+    # The full pretrained weights are only parsed if the caller uses them
+    weights_dict_GO = util.LazyPretrainedWeights(file_loc, "GO", net_type, features)
+    weights_dict_Dis = util.LazyPretrainedWeights(file_loc, "DisGeNet", net_type, features)
     return dfs_out[0], dfs_out[1], weights_dict_GO, weights_dict_Dis
 
 
+def _compute_model_similarities(pretrained_weights, cor_mat, mdl_weights):
+    """Compute the corrected similarities between models and pretrained models.
+
+    The cosine similarities between the model(s) and the pretrained models
+    (``pretrained_weights``, row-normalized) are z-scored both against the
+    similarities of the same model (zq) and against the correction matrix
+    with the model similarities appended as an additional row (zs).
+
+    Args:
+        pretrained_weights: Row-normalized pretrained weights (terms x dim).
+        cor_mat: Correction matrix (any number of rows x terms).
+        mdl_weights: Weights of a single model (dim) or multiple models
+            (num models x dim).
+
+    """
+    mdl_weights = np.asarray(mdl_weights)
+    weights = np.atleast_2d(mdl_weights)
+    sims = (weights / np.linalg.norm(weights, axis=1, keepdims=True)) @ pretrained_weights.T
+
+    zq = np.maximum(0, (sims - sims.mean(axis=1, keepdims=True)) / sims.std(axis=1, keepdims=True))
+
+    # Column statistics of the correction matrix with the similarities of a
+    # model appended as the last row, updated from those of the correction
+    # matrix alone (Welford) to handle all models at once
+    num_rows = cor_mat.shape[0] + 1
+    cor_mean = cor_mat.mean(axis=0)
+    cor_m2 = cor_mat.var(axis=0) * cor_mat.shape[0]
+    new_mean = cor_mean + (sims - cor_mean) / num_rows
+    new_std = np.sqrt((cor_m2 + (sims - cor_mean) * (sims - new_mean)) / num_rows)
+    zs = np.maximum(0, (sims - new_mean) / new_std)
+
+    z = np.sqrt(zq**2 + zs**2)
+    return z[0] if mdl_weights.ndim == 1 else z
+
+
 def _make_small_edgelist(file_loc, df_probs, net_type, num_nodes=50):
     # This will set the max number of genes to look at to a given number
-    # Load network as edge list dataframe
-    filepath = osp.join(file_loc, f"Edgelist_{net_type}.edg")
-    if net_type == "BioGRID":
-        df_edge = pd.read_csv(filepath, sep="\t", header=None, names=["Node1", "Node2"])
-        df_edge["Weight"] = 1
-    else:
-        df_edge = pd.read_csv(filepath, sep="\t", header=None, names=["Node1", "Node2", "Weight"])
-    df_edge = df_edge.astype({"Node1": str, "Node2": str})
-
-    # Take subgraph induced by top genes
     top_genes = df_probs["Entrez"].to_numpy()[:num_nodes]
-    df_edge = df_edge[(df_edge["Node1"].isin(top_genes)) & (df_edge["Node2"].isin(top_genes))]
+
+    # Take subgraph induced by top genes, indexed by line in the edge list
+    edge_store = util.load_edge_store(file_loc, net_type)
+    edge_ids = edge_store.get_induced_edges(top_genes)
+    df_edge = pd.DataFrame(
+        {
+            "Node1": edge_store.nodes[edge_store.node1[edge_ids]],
+            "Node2": edge_store.nodes[edge_store.node2[edge_ids]],
+            "Weight": edge_store.weights[edge_ids],
+        },
+        index=edge_ids,
+    ).astype({"Node1": str, "Node2": str})
     genes_in_edge = np.union1d(df_edge["Node1"].unique(), df_edge["Node2"].unique())
     isolated_genes = np.setdiff1d(top_genes, genes_in_edge).tolist()
 
@@ -234,7 +299,7 @@ def _make_small_edgelist(file_loc, df_probs, net_type, num_nodes=50):
     Entrez_to_Symbol = util.load_geneid_conversion(file_loc, "Entrez", "Symbol")
     replace_dict = {gene: util.mapgene(gene, Entrez_to_Symbol) for gene in genes_in_edge}
     isolated_genes_sym = [util.mapgene(gene, Entrez_to_Symbol) for gene in isolated_genes]
-    df_edge_sym = df_edge.replace(to_replace=replace_dict)
+    df_edge_sym = df_edge.assign(Node1=df_edge["Node1"].map(replace_dict), Node2=df_edge["Node2"].map(replace_dict))
 
     return df_edge, isolated_genes, df_edge_sym, isolated_genes_sym
 
@@ -0,0 +1,513 @@
+"""Caching of GenePlexus data and results.
+
+All ``geneplexus.util.load_*`` functions go through :data:`DATA_CACHE`, so a
+data file is parsed at most once per process as long as it is not modified on
+disk and fits in the memory budget. The budget can be changed via
+:meth:`DataCache.set_max_bytes`, e.g., ``DATA_CACHE.set_max_bytes(8 * 1024**3)``.
+
+Note:
+    Cached objects are shared across all callers. Arrays are returned as
+    read-only; dictionaries must not be modified in place. Copy-on-write
+    memory-maps (``mmap_mode="c"``) are therefore not cached.
+
+Model training results can be cached with a :class:`ResultCache` (see the
+``result_cache`` option of :class:`geneplexus.GenePlexus`), so that repeated
+queries with the same gene set and settings are not retrained. Applications
+can cache their whole outputs the same way, keyed by :meth:`ResultCache.make_key`.
+
+"""
+import hashlib
+import io
+import json
+import os
+import os.path as osp
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Hashable
+from typing import Optional
+from typing import Tuple
+
+import numpy as np
+
+from . import profile
+from ._config import logger
+from ._config.config import DEFAULT_CACHE_MAX_BYTES
+
+_MISSING = object()
+
+
+class DataCache:
+    """Thread-safe LRU cache with a memory budget.
+
+    Entries are keyed by the absolute path of the source file, its
+    modification time and size, and optional extra key components (e.g., how
+    the file is parsed). A cached entry is therefore invalidated automatically
+    when the underlying file changes.
+
+    """
+
+    def __init__(self, max_bytes: Optional[int] = DEFAULT_CACHE_MAX_BYTES):
+        """Initialize the DataCache object.
+
+        Args:
+            max_bytes: Maximum total (estimated) size of the cached objects in
+                bytes. Least recently used entries are evicted when exceeded.
+                Set to 0 to disable caching, or None for unlimited.
+
+        """
+        self._lock = threading.Lock()
+        # Lock serializing the loading of each key, with the number of threads using it
+        self._load_locks: Dict[Hashable, Tuple[threading.Lock, int]] = {}
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int]]" = OrderedDict()
+        self._versions: Dict[Hashable, Hashable] = {}
+        self._max_bytes = max_bytes
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def max_bytes(self) -> Optional[int]:
+        """Memory budget of the cache in bytes (None for unlimited)."""
+        return self._max_bytes
+
+    def set_max_bytes(self, max_bytes: Optional[int]):
+        """Set the memory budget and evict entries exceeding it."""
+        with self._lock:
+            self._max_bytes = max_bytes
+            self._evict()
+
+    def get(self, path: str, loader: Callable[[], Any], *key: Hashable) -> Any:
+        """Return the cached object for a file, loading it on cache miss.
+
+        Args:
+            path: Path to the source file of the object.
+            loader: Function that loads the object from the file.
+            key: Extra key components distinguishing different objects derived
+                from the same file.
+
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        version_key = (path, key)
+        full_key = (path, key, stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            value = self._lookup(full_key)
+            if value is not _MISSING:
+                return value
+            load_lock, num_users = self._load_locks.get(full_key, (threading.Lock(), 0))
+            self._load_locks[full_key] = (load_lock, num_users + 1)
+
+        # Serialize loading of the same object so concurrent requests for a
+        # file that is not yet cached only parse it once. The lock is kept
+        # until its last user is done, so that no other lock is created for
+        # the same key while threads are still waiting on it.
+        try:
+            with load_lock:
+                with self._lock:
+                    value = self._lookup(full_key)
+                if value is _MISSING:
+                    logger.debug(f"Data cache miss, loading {path} {key}")
+                    with profile.stage(f"load {osp.basename(path)}" + (f" ({key[0]})" if key else "")):
+                        value = loader()
+                    if isinstance(value, np.ndarray):
+                        value.setflags(write=False)
+                    with self._lock:
+                        self.misses += 1
+                        self._insert(version_key, full_key, value, _get_nbytes(value, stat.st_size))
+        finally:
+            with self._lock:
+                load_lock, num_users = self._load_locks.pop(full_key)
+                if num_users > 1:
+                    self._load_locks[full_key] = (load_lock, num_users - 1)
+
+        return value
+
+    def clear(self):
+        """Remove all cached entries and reset the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+            self._bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, Optional[int]]:
+        """Return cache hit, miss, eviction, and memory usage statistics."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self._max_bytes,
+            }
+
+    def _lookup(self, full_key: Hashable) -> Any:
+        entry = self._entries.get(full_key)
+        if entry is None:
+            return _MISSING
+        self._entries.move_to_end(full_key)
+        self.hits += 1
+        return entry[0]
+
+    def _insert(self, version_key: Hashable, full_key: Hashable, value: Any, nbytes: int):
+        # Drop the entry of an outdated version of the same file
+        old_key = self._versions.pop(version_key, None)
+        if old_key is not None and old_key in self._entries:
+            self._bytes -= self._entries.pop(old_key)[1]
+
+        if self._max_bytes is not None and nbytes > self._max_bytes:
+            logger.debug(f"Object too large to be cached ({nbytes} > {self._max_bytes} bytes): {full_key}")
+            return
+
+        self._entries[full_key] = (value, nbytes)
+        self._versions[version_key] = full_key
+        self._bytes += nbytes
+        self._evict()
+
+    def _evict(self):
+        if self._max_bytes is None:
+            return
+        while self._bytes > self._max_bytes and self._entries:
+            (path, key, *_), (_, nbytes) = self._entries.popitem(last=False)
+            self._versions.pop((path, key), None)
+            self._bytes -= nbytes
+            self.evictions += 1
+
+
+def _get_nbytes(value: Any, file_size: int) -> int:
+    """Estimate the memory footprint of a cached object.
+
+    The exact size is used for arrays and objects reporting their size via an
+    ``nbytes`` attribute. The size of (parsed JSON) containers is estimated by
+    summing the sizes of all objects they contain (see :func:`sys.getsizeof`),
+    and the size of the source file is used as a proxy for other objects.
+    Memory-mapped arrays are backed by the page cache and thus do not count
+    toward the budget.
+
+    """
+    if isinstance(value, np.memmap):
+        return 0
+    elif hasattr(value, "nbytes"):
+        return value.nbytes
+    elif isinstance(value, (dict, list, tuple)):
+        return _get_container_nbytes(value)
+    return file_size
+
+
+def _get_container_nbytes(value: Any) -> int:
+    """Estimate the total size of a container and the objects it contains.
+
+    Objects referenced multiple times (e.g., interned strings) are counted
+    each time, so the estimate tends to be an upper bound.
+
+    """
+    nbytes, stack = 0, [value]
+    while stack:
+        obj = stack.pop()
+        if isinstance(obj, np.ndarray):
+            nbytes += obj.nbytes
+            continue
+        nbytes += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple)) and obj:
+            # Lists of numbers (e.g., model weights) and strings (e.g., genes)
+            # are assumed to be homogeneous to keep the estimate fast
+            if isinstance(obj[0], (int, float)):
+                nbytes += len(obj) * sys.getsizeof(obj[0])
+            elif isinstance(obj[0], str):
+                nbytes += sum(map(sys.getsizeof, obj))
+            else:
+                stack.extend(obj)
+    return nbytes
+
+
+class ResultCache:
+    """Thread-safe content-addressed cache of results with a disk tier.
+
+    Results are stored under a key derived from a canonical hash of all inputs
+    determining them (see :meth:`make_key`). Results are serialized as npz
+    files holding the arrays and a JSON description of the containers, which
+    are loaded without pickle, so a shared cache directory cannot inject code.
+    Results may consist of None, bools, numbers, strings, lists, tuples,
+    dictionaries, NumPy arrays and scalars (not of object dtype, except for
+    arrays of strings), and pandas DataFrames of such columns. Recently used results
+    are kept in memory, and all results are optionally kept in a directory
+    to be shared across processes and sessions. Both tiers are bounded in
+    size, evicting the least recently used results.
+
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 256 * 1024**2,
+        cache_dir: Optional[str] = None,
+        max_disk_bytes: int = 4 * 1024**3,
+    ):
+        """Initialize the ResultCache object.
+
+        Args:
+            max_bytes: Maximum total size of the (serialized) results kept in
+                memory in bytes.
+            cache_dir: Directory to keep results on disk. Only use the memory
+                tier if not set.
+            max_disk_bytes: Maximum total size of the results kept on disk in
+                bytes.
+
+        """
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(**components: Any) -> str:
+        """Return the SHA-256 hash of the canonical JSON form of the components.
+
+        Components must be JSON serializable. Dictionary keys are sorted, so
+        the key does not depend on the order of the keyword arguments.
+
+        """
+        canonical = json.dumps(components, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Any:
+        """Return the cached result, or None if not cached."""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return _load_result(data)
+
+        data = self._read_disk(key)
+        result = None
+        if data is not None:
+            try:
+                result = _load_result(data)
+            except Exception as e:
+                logger.warning(f"Ignoring invalid cached result {key} ({e})")
+                data = None
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._insert(key, data)
+        return result
+
+    def put(self, key: str, value: Any):
+        """Cache a result in memory and on disk.
+
+        Raises:
+            TypeError: if the result contains objects that cannot be
+                serialized (see :class:`ResultCache`).
+
+        """
+        data = _dump_result(value)
+        with self._lock:
+            self._insert(key, data)
+        self._write_disk(key, data)
+
+    def clear(self):
+        """Remove all cached results (including those on disk) and reset the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = self.disk_hits = self.misses = 0
+            for path in self._list_disk():
+                _remove(path)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache hit, miss, and memory usage statistics."""
+        with self._lock:
+            num_queries = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / num_queries if num_queries else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _insert(self, key: str, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old)
+        self._entries[key] = data
+        self._bytes += len(data)
+        while self._bytes > self.max_bytes:
+            _, data = self._entries.popitem(last=False)
+            self._bytes -= len(data)
+
+    def _list_disk(self):
+        if self.cache_dir is None:
+            return []
+        return [entry.path for entry in os.scandir(self.cache_dir) if entry.name.endswith(".npz")]
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        if self.cache_dir is None:
+            return None
+        path = _get_result_path(self.cache_dir, key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # Mark as recently used
+            return data
+        except OSError:
+            return None
+
+    def _write_disk(self, key: str, data: bytes):
+        if self.cache_dir is None or len(data) > self.max_disk_bytes:
+            return
+        try:
+            # Write to a temporary file first so concurrent readers never see
+            # a partially written result
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, _get_result_path(self.cache_dir, key))
+        except OSError as e:
+            logger.warning(f"Unable to save result to the cache directory {self.cache_dir} ({e})")
+            return
+
+        paths = sorted(self._list_disk(), key=_get_mtime)
+        sizes = [_get_size(path) for path in paths]
+        total = sum(sizes)
+        for path, size in zip(paths, sizes):
+            if total <= self.max_disk_bytes:
+                break
+            _remove(path)
+            total -= size
+
+
+def _dump_result(value: Any) -> bytes:
+    """Serialize a result into npz bytes (see :class:`ResultCache`)."""
+    arrays: Dict[str, Any] = {}
+
+    def add_array(array: np.ndarray) -> Dict[str, Any]:
+        name = f"a{len(arrays)}"
+        if array.dtype == object:
+            if not all(isinstance(item, str) for item in array.ravel().tolist()):
+                raise TypeError("Unable to cache arrays of objects other than strings")
+            arrays[name] = array.astype(str)
+            return {"array": name, "object": True}
+        arrays[name] = array
+        return {"array": name}
+
+    def encode(obj: Any) -> Any:
+        if isinstance(obj, np.generic):
+            return {"type": "scalar", **add_array(np.asarray(obj))}
+        elif obj is None or isinstance(obj, (bool, int, float, str)):
+            return obj
+        elif isinstance(obj, np.ndarray):
+            return {"type": "ndarray", **add_array(np.asarray(obj))}
+        elif isinstance(obj, (list, tuple)):
+            return {"type": type(obj).__name__, "items": [encode(item) for item in obj]}
+        elif isinstance(obj, dict):
+            return {"type": "dict", "items": [[encode(key), encode(val)] for key, val in obj.items()]}
+
+        pd = sys.modules.get("pandas")
+        if pd is not None and isinstance(obj, pd.DataFrame):
+            index = obj.index
+            default_index = isinstance(index, pd.RangeIndex) and index.start == 0 and index.step == 1
+            return {
+                "type": "DataFrame",
+                "columns": [encode(column) for column in obj.columns],
+                "dtypes": [str(dtype) for dtype in obj.dtypes],
+                "values": [add_array(obj.iloc[:, i].to_numpy()) for i in range(obj.shape[1])],
+                "index": None if default_index else add_array(index.to_numpy()),
+            }
+        raise TypeError(f"Unable to cache objects of type {type(obj).__name__}")
+
+    meta = json.dumps(encode(value))
+    buffer = io.BytesIO()
+    np.savez(buffer, __meta__=np.array(meta), **arrays)
+    return buffer.getvalue()
+
+
+def _load_result(data: bytes) -> Any:
+    """Deserialize a result saved by :func:`_dump_result` (without pickle)."""
+    with np.load(io.BytesIO(data), allow_pickle=False) as f:
+
+        def get_array(meta: Dict[str, Any]) -> np.ndarray:
+            array = f[meta["array"]]
+            return array.astype(object) if meta.get("object") else array
+
+        def decode(obj: Any) -> Any:
+            if not isinstance(obj, dict):
+                return obj
+            elif obj["type"] == "scalar":
+                return get_array(obj)[()]
+            elif obj["type"] == "ndarray":
+                return get_array(obj)
+            elif obj["type"] in ("list", "tuple"):
+                items = [decode(item) for item in obj["items"]]
+                return tuple(items) if obj["type"] == "tuple" else items
+            elif obj["type"] == "dict":
+                return {decode(key): decode(val) for key, val in obj["items"]}
+            elif obj["type"] == "DataFrame":
+                import pandas as pd
+
+                df = pd.DataFrame(
+                    {i: get_array(values) for i, values in enumerate(obj["values"])},
+                    index=None if obj["index"] is None else get_array(obj["index"]),
+                )
+                df = df.astype(dict(enumerate(obj["dtypes"])))
+                df.columns = [decode(column) for column in obj["columns"]]
+                return df
+            raise ValueError(f"Unknown cached object type {obj['type']!r}")
+
+        return decode(json.loads(f["__meta__"].item()))
+
+
+def _get_result_path(cache_dir: str, key: str) -> str:
+    return osp.join(cache_dir, f"{key}.npz")
+
+
+def _get_mtime(path: str) -> float:
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return 0
+
+
+def _get_size(path: str) -> int:
+    try:
+        return os.stat(path).st_size
+    except OSError:
+        return 0
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+DATA_CACHE = DataCache()
+"""Data cache shared by all data loaders in :mod:`geneplexus.util`."""
+
+__all__ = ["DataCache", "DATA_CACHE", "ResultCache"]
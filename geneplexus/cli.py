@@ -1,22 +1,38 @@
 """Command line interface for the GenePlexus pipeline."""
 import argparse
 import atexit
+import functools
 import os
 import os.path as osp
 import pathlib
+import re
 import shutil
+import sys
 import tempfile
+from typing import Any
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import TYPE_CHECKING
 
 import numpy as np
-import pandas as pd
 
 from . import config
 from ._config import logger
 from ._config.logger_util import attach_file_handler
-from .geneplexus import GenePlexus
 from .util import format_choices
 from .util import normexpand
 from .util import read_gene_list
+from .util import read_gmt
+
+# GenePlexus and pandas are imported when running the pipeline, so that the
+# help page and clearing the data do not pay for importing them
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from .geneplexus import GenePlexus
 
 os.environ["COLUMNS"] = "100"  # for CLI help page wrap line
 
@@ -27,7 +43,8 @@ FILE_HANDLER = attach_file_handler(logger, log_path=TMP_LOG_PATH)
 def parse_args() -> argparse.Namespace:
     """Parse arguments from command line."""
     parser = argparse.ArgumentParser(
-        description="Run the GenePlexus pipline on a input gene list.",
+        description="Run the GenePlexus pipline on a input gene list, or on "
+        "multiple gene sets from a GMT file or a directory of gene lists.",
         formatter_class=argparse.ArgumentDefaultsHelpFormatter,
         usage=argparse.SUPPRESS,
     )
@@ -37,7 +54,10 @@ def parse_args() -> argparse.Namespace:
         "--input_file",
         metavar="",
         required=True,
-        help="Input gene list (.txt) file (one gene per line).",
+        help="Input gene list (.txt) file (one gene per line). Alternatively, "
+        "a GMT (.gmt) file or a directory of gene list files to run the "
+        "pipeline on each gene set, with one result directory per gene set "
+        "and a summary table (summary.tsv).",
     )
 
     parser.add_argument(
@@ -76,6 +96,17 @@ def parse_args() -> argparse.Namespace:
         f"similarities. {format_choices(config.ALL_GSCS)}",
     )
 
+    parser.add_argument(
+        "-p",
+        "--precision",
+        default="float64",
+        metavar="",
+        choices=config.PRECISIONS,
+        help="Precision of the network features, correction matrices, and pretrained weights to use. Reduced "
+        "precisions require the data to be converted first (python -m geneplexus.precision). "
+        f"{format_choices(config.PRECISIONS)}",
+    )
+
     parser.add_argument(
         "-s",
         "--small_edgelist_num_nodes",
@@ -85,6 +116,15 @@ def parse_args() -> argparse.Namespace:
         help="Number of nodes in the small edgelist.",
     )
 
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        default=1,
+        metavar="",
+        type=int,
+        help="Number of gene sets to process concurrently (using threads) when running on multiple gene sets.",
+    )
+
     parser.add_argument(
         "-dd",
         "--data_dir",
@@ -147,7 +187,7 @@ def parse_args() -> argparse.Namespace:
     return parser.parse_args()
 
 
-def run_pipeline(gp: GenePlexus, num_nodes: int, skip_mdl_sim: bool):
+def run_pipeline(gp: "GenePlexus", num_nodes: int, skip_mdl_sim: bool):
     """Run the full GenePlexus pipeline.
 
     Args:
@@ -159,15 +199,30 @@ def run_pipeline(gp: GenePlexus, num_nodes: int, skip_mdl_sim: bool):
 
     """
     gp.fit_and_predict()
+    run_analyses(gp, num_nodes, skip_mdl_sim)
+
+
+def run_analyses(gp: "GenePlexus", num_nodes: int, skip_mdl_sim: bool):
+    """Run the GenePlexus pipeline steps following the model fitting.
+
+    Args:
+        num_nodes: Number of top predicted genes to include in the induced
+            subgraph.
+        skip_mdl_sim: Whether or not to skip the computation of model
+            similarities with GO and DisGeNet. This option is not yet available
+            for custom networks.
+
+    """
     gp.make_small_edgelist(num_nodes=num_nodes)
     gp.alter_validation_df()
     if not skip_mdl_sim:
         gp.make_sim_dfs()
     else:
         logger.info("Skipping model similarity computation.")
+    logger.info(f"Run profile:\n{gp.profile.format()}")
 
 
-def df_to_tsv(df: pd.DataFrame, root: str, name: str):
+def df_to_tsv(df: "pd.DataFrame", root: str, name: str):
     """Save a dataframe as a tsv file.
 
     Args:
@@ -179,21 +234,82 @@ def df_to_tsv(df: pd.DataFrame, root: str, name: str):
     df.to_csv(osp.join(root, name), sep="\t", index=False)
 
 
-def save_results(gp, outdir, zip_output, overwrite, skip_mdl_sim):
-    """Save all results generated by the GenePlexus pipeline.
+def read_gene_sets(path: str, sep: str = "newline") -> Dict[str, List[str]]:
+    """Read multiple gene sets from a GMT file or a directory of gene lists.
+
+    Args:
+        path: Path to the GMT file, or to the directory of gene list files.
+            Each (non-hidden) file in the directory is a gene set named by
+            the file name without extension.
+        sep: Seperator between genes in the gene list files (see
+            :meth:`geneplexus.util.read_gene_list`).
+
+    """
+    if not osp.isdir(path):
+        return read_gmt(path)
+
+    gene_sets = {}
+    for fn in sorted(os.listdir(path)):
+        if fn.startswith(".") or not osp.isfile(osp.join(path, fn)):
+            continue
+        name = osp.splitext(fn)[0]
+        if name in gene_sets:
+            raise ValueError(f"Duplicated gene set {name!r} in {path}")
+        gene_sets[name] = read_gene_list(osp.join(path, fn), sep)
+    return gene_sets
+
+
+def run_gene_sets(
+    gp: "GenePlexus",
+    gene_sets: Dict[str, List[str]],
+    num_nodes: int,
+    skip_mdl_sim: bool,
+    jobs: int = 1,
+) -> Iterator[Tuple[str, Optional["GenePlexus"], Optional[Exception]]]:
+    """Run the full GenePlexus pipeline on multiple gene sets.
+
+    Each gene set is processed on a copy of the GenePlexus object (see
+    :meth:`geneplexus.GenePlexus.fit_and_predict_many`), so that the data files
+    are loaded once and shared by all gene sets.
+
+    Args:
+        gp: GenePlexus object to copy for each gene set.
+        gene_sets: Dictionary mapping gene set names to gene lists.
+        num_nodes: Number of top predicted genes to include in the induced
+            subgraph.
+        skip_mdl_sim: Whether or not to skip the computation of model
+            similarities with GO and DisGeNet.
+        jobs: Number of gene sets to process concurrently using threads.
+
+    Returns:
+        Iterator of (gene set name, GenePlexus object, error) in the order of
+        the input gene sets. The GenePlexus object is None if the pipeline
+        failed for the gene set, and the error is None otherwise.
+
+    """
+    results = gp.fit_and_predict_many(
+        gene_sets,
+        n_jobs=jobs,
+        callback=functools.partial(run_analyses, num_nodes=num_nodes, skip_mdl_sim=skip_mdl_sim),
+        return_errors=True,
+    )
+    for name, result in results:
+        if isinstance(result, Exception):
+            yield name, None, result
+        else:
+            yield name, result, None
+
+
+def write_results(gp: "GenePlexus", outdir: str, skip_mdl_sim: bool):
+    """Write the results of the GenePlexus pipeline to a directory.
 
     Args:
         outdir: Output directory.
-        zip_output: Whether or not to zip the output directory into a zip file.
-        overwrite: Whether or not to overwrite existing results.
         skip_mdl_sim: Whether or not to skip the computation of model
             similarities with GO and DisGeNet. This option is not yet available
             for custom networks.
 
     """
-    zip_outpath = _suffix_fn(f"{outdir}.zip", overwrite=overwrite)
-    outdir = _suffix_dir(outdir, overwrite=overwrite, mktmp=zip_output)
-
     np.savetxt(osp.join(outdir, "cross_validation.txt"), gp.avgps, fmt="%.18f")
     df_to_tsv(gp.df_convert_out, outdir, "df_convert_out.tsv")
     df_to_tsv(gp.df_probs, outdir, "df_probs.tsv")
@@ -203,9 +319,100 @@ def save_results(gp, outdir, zip_output, overwrite, skip_mdl_sim):
     if not skip_mdl_sim:
         df_to_tsv(gp.df_sim_GO, outdir, "df_sim_GO.tsv")
         df_to_tsv(gp.df_sim_Dis, outdir, "df_sim_Dis.tsv")
-
-    # Dump config, close file handler and move run log to result directory
     gp.dump_config(outdir)
+
+
+def save_results(gp, outdir, zip_output, overwrite, skip_mdl_sim):
+    """Save all results generated by the GenePlexus pipeline.
+
+    Args:
+        outdir: Output directory.
+        zip_output: Whether or not to zip the output directory into a zip file.
+        overwrite: Whether or not to overwrite existing results.
+        skip_mdl_sim: Whether or not to skip the computation of model
+            similarities with GO and DisGeNet. This option is not yet available
+            for custom networks.
+
+    """
+    zip_outpath = _suffix_fn(f"{outdir}.zip", overwrite=overwrite)
+    outdir = _suffix_dir(outdir, overwrite=overwrite, mktmp=zip_output)
+    write_results(gp, outdir, skip_mdl_sim)
+    _finalize_output(outdir, zip_outpath, zip_output)
+
+
+def save_batch_results(
+    results: Iterator[Tuple[str, Optional["GenePlexus"], Optional[Exception]]],
+    outdir: str,
+    zip_output: bool,
+    overwrite: bool,
+    skip_mdl_sim: bool,
+) -> int:
+    """Save the results of multiple gene sets as they are generated.
+
+    The results of each gene set are saved to a subdirectory of the output
+    directory, named after the gene set. A summary table (summary.tsv) lists
+    the result subdirectory, the gene counts, and the mean cross validation
+    score of each gene set, along with the error of the failed gene sets.
+
+    Args:
+        results: Iterator of (gene set name, GenePlexus object, error), see
+            :meth:`run_gene_sets`.
+        outdir: Output directory.
+        zip_output: Whether or not to zip the output directory into a zip file.
+        overwrite: Whether or not to overwrite existing results.
+        skip_mdl_sim: Whether or not to skip the computation of model
+            similarities with GO and DisGeNet.
+
+    Returns:
+        Number of failed gene sets.
+
+    """
+    zip_outpath = _suffix_fn(f"{outdir}.zip", overwrite=overwrite)
+    outdir = _suffix_dir(outdir, overwrite=overwrite, mktmp=zip_output)
+
+    summary: List[Dict[str, Any]] = []
+    for name, gp, error in results:
+        set_dir = _set_dirname(name, {row["Directory"] for row in summary})
+        row: Dict[str, Any] = {"Name": name, "Directory": set_dir, "Status": "done", "Error": ""}
+        if gp is not None:
+            write_results(gp, normexpand(osp.join(outdir, set_dir)), skip_mdl_sim)
+            row.update(
+                InputGenes=gp.input_count,
+                PositiveGenes=len(gp.pos_genes_in_net),
+                NegativeGenes=len(gp.negative_genes),
+                MeanCVScore=np.mean(gp.avgps),
+            )
+            logger.info(f"Results of gene set {name!r} saved to {set_dir}")
+        else:
+            row.update(Directory="", Status="failed", Error=f"{type(error).__name__}: {error}")
+            logger.error(f"Failed to run gene set {name!r}: {row['Error']}")
+        summary.append(row)
+
+    import pandas as pd
+
+    columns = ["Name", "Directory", "InputGenes", "PositiveGenes", "NegativeGenes", "MeanCVScore", "Status", "Error"]
+    df_summary = pd.DataFrame(summary, columns=columns)
+    df_summary = df_summary.astype({"InputGenes": "Int64", "PositiveGenes": "Int64", "NegativeGenes": "Int64"})
+    df_to_tsv(df_summary, outdir, "summary.tsv")
+    num_failed = sum(row["Status"] == "failed" for row in summary)
+    logger.info(f"Finished {len(summary)} gene sets ({num_failed} failed)")
+    _finalize_output(outdir, zip_outpath, zip_output)
+    return num_failed
+
+
+def _set_dirname(name: str, taken: set) -> str:
+    """Make a unique and file system safe directory name for a gene set."""
+    base = re.sub(r"[^\w.-]", "_", name).strip(".") or "gene_set"
+    dirname, idx = base, 0
+    while dirname in taken:
+        idx += 1
+        dirname = f"{base}_{idx}"
+    return dirname
+
+
+def _finalize_output(outdir: str, zip_outpath: str, zip_output: bool):
+    """Move run log to the result directory and optionally zip it."""
+    # Close file handler and move run log to result directory
     logger.removeHandler(FILE_HANDLER)
     FILE_HANDLER.flush()
     FILE_HANDLER.close()
@@ -233,6 +440,8 @@ def clear_data(args):
     """
     if args.clear_data:
         if args.data_dir is None:
+            from .geneplexus import GenePlexus
+
             shutil.rmtree(GenePlexus(log_level="CRITICAL").file_loc)
         else:
             data_dir = normexpand(args.data_dir)
@@ -290,6 +499,8 @@ def main():
 
     clear_data(args)
 
+    from .geneplexus import GenePlexus
+
     # Create geneplexus object and auto download data files
     gp = GenePlexus(
         args.data_dir,
@@ -298,13 +509,28 @@ def main():
         args.gsc,
         auto_download=True,
         log_level=log_level,
+        precision=args.precision,
     )
 
+    if osp.isdir(args.input_file) or args.input_file.lower().endswith(".gmt"):
+        # Run pipeline on each gene set and save results as they are ready
+        gene_sets = read_gene_sets(args.input_file, args.gene_list_delimiter)
+        logger.info(f"Running {len(gene_sets)} gene sets from {args.input_file} using {args.jobs} job(s)")
+        results = run_gene_sets(gp, gene_sets, args.small_edgelist_num_nodes, args.skip_mdl_sim, args.jobs)
+        num_failed = save_batch_results(
+            results,
+            normexpand(args.output_dir),
+            args.zip_output,
+            args.overwrite,
+            args.skip_mdl_sim,
+        )
+        if num_failed:
+            sys.exit(1)
+        return
+
     # Load input gene list
     gp.load_genes(read_gene_list(args.input_file, args.gene_list_delimiter))
 
-    # Save config
-
     # Run pipeline and save results
     run_pipeline(gp, args.small_edgelist_num_nodes, args.skip_mdl_sim)
     save_results(gp, normexpand(args.output_dir), args.zip_output, args.overwrite, args.skip_mdl_sim)
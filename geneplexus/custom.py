@@ -1,10 +1,288 @@
 """Helper functions for setting up custom networks and GSCs."""
+import csv
 import json
 import os.path as osp
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import Union
 
 import numpy as np
+import pandas as pd
+from numpy.lib.format import open_memmap
+from scipy.sparse import coo_matrix
+from scipy.sparse import csr_matrix
 
 from ._config import logger
+from ._config.config import EDGELIST_CHUNK_ROWS
+from ._config.config import FEATURE_CHUNK_BYTES
+from ._config.config import GSC_DATA_TYPE
+from .index import GSCIncidence
+from .index import NetworkIndex
+
+
+def _read_edgelist(edgelist_loc: str, sep: str, skiplines: int) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """Parse the edgelist in chunks of lines.
+
+    Yields:
+        The first nodes, the second nodes, and the weights (1 if not
+        specified) of the edges in a chunk of lines.
+
+    Raises:
+        ValueError: if the edgelist has more than three columns.
+
+    """
+    reader = pd.read_csv(
+        edgelist_loc,
+        sep=sep,
+        header=None,
+        skiprows=skiplines,
+        dtype=str,
+        na_filter=False,
+        quoting=csv.QUOTE_NONE,
+        chunksize=EDGELIST_CHUNK_ROWS,
+        engine="c" if len(sep) == 1 else "python",
+    )
+    for chunk in reader:
+        if chunk.shape[1] > 3:
+            raise ValueError("Too many columns in edgelist file")
+        node1 = chunk[0].str.strip().to_numpy(dtype=str)
+        node2 = chunk[1].str.strip().to_numpy(dtype=str)
+        weights = np.ones(len(chunk))
+        if chunk.shape[1] == 3:
+            weight_strs = chunk[2].str.strip()
+            has_weight = (weight_strs != "").to_numpy()
+            weights[has_weight] = weight_strs[has_weight].astype(float).to_numpy()
+        yield node1, node2, weights
+
+
+def _read_edgelist_sparse(
+    edgelist_loc: str,
+    sep: str,
+    skiplines: int,
+    nodelist: Optional[np.ndarray] = None,
+) -> Tuple[csr_matrix, np.ndarray]:
+    """Parse the edgelist into a symmetric sparse adjacency matrix.
+
+    Each chunk of lines is encoded into node codes with respect to the nodes
+    in the chunk, which are mapped to the final node ordering at the end. If
+    an edge is specified multiple times, the last one takes effect.
+
+    Args:
+        edgelist_loc: Location of the edgelist
+        sep: The separation used in the edgelist file
+        skiplines: The number of lines to skip for header
+        nodelist: The node ordering, use the sorted nodes in the edgelist if
+            not specified.
+
+    Returns:
+        The adjacency matrix and the node ordering.
+
+    """
+    chunk_nodes, chunk_codes, chunk_weights = [], [], []
+    for node1, node2, weights in _read_edgelist(edgelist_loc, sep, skiplines):
+        nodes, codes = np.unique(np.concatenate((node1, node2)), return_inverse=True)
+        chunk_nodes.append(nodes)
+        chunk_codes.append(codes.reshape(2, -1))
+        chunk_weights.append(weights)
+
+    if nodelist is None:
+        nodelist = np.unique(np.concatenate(chunk_nodes + [np.array([], dtype=str)]))
+    net_index = NetworkIndex(nodelist)
+
+    rows, cols = [], []
+    for nodes, codes in zip(chunk_nodes, chunk_codes):
+        node_rows = net_index.get_rows(nodes)
+        if (node_rows < 0).any():
+            missing = nodes[node_rows < 0].tolist()
+            raise KeyError(f"Nodes in Edgelist but not in NodeOrder file ({missing[:10]!r})")
+        rows.append(node_rows[codes[0]])
+        cols.append(node_rows[codes[1]])
+
+    # Symmetrize and keep the last value of duplicated entries
+    num_nodes = len(nodelist)
+    rows, cols = np.concatenate(rows + [np.array([], dtype=int)]), np.concatenate(cols + [np.array([], dtype=int)])
+    weights = np.concatenate(chunk_weights + [np.array([])])
+    sym_rows, sym_cols = np.concatenate((rows, cols)), np.concatenate((cols, rows))
+    sym_weights = np.concatenate((weights, weights))
+    order = np.arange(rows.size)
+    entries = sym_rows.astype(np.int64) * num_nodes + sym_cols
+    sorter = np.lexsort((np.concatenate((order, order)), entries))
+    is_last: np.ndarray = np.append(entries[sorter][1:] != entries[sorter][:-1], True)[: sorter.size]
+    last = sorter[is_last]
+    adj_mat = coo_matrix((sym_weights[last], (sym_rows[last], sym_cols[last])), shape=(num_nodes, num_nodes)).tocsr()
+
+    return adj_mat, nodelist
+
+
+def _save_dense(path: str, mat: csr_matrix):
+    """Save a sparse matrix as a dense npy file, writing one row block at a time."""
+    out = open_memmap(path, mode="w+", dtype=float, shape=mat.shape)
+    chunk_size = max(1, FEATURE_CHUNK_BYTES // max(1, 8 * mat.shape[1]))
+    for start in range(0, mat.shape[0], chunk_size):
+        out[start : start + chunk_size] = mat[start : start + chunk_size].toarray()
+    out.flush()
+    del out
+
+
+# State shared by the influence matrix workers, set by _init_influence_worker
+_influence_state: Dict[str, Any] = {}
+
+
+def _init_influence_worker(
+    trans_mat: csr_matrix,
+    path: str,
+    alpha: float,
+    tol: float,
+    max_iter: int,
+    top_k: Optional[int],
+):
+    _influence_state.update(trans_mat=trans_mat, path=path, alpha=alpha, tol=tol, max_iter=max_iter, top_k=top_k)
+
+
+def _make_influence_rows(start: int, stop: int):
+    """Compute a block of rows of the influence matrix and write it to the output file.
+
+    The rows ``start:stop`` of ``F = alpha * (I - (1 - alpha) * P)^-1`` are the
+    columns of ``F^T``, which are computed as the (truncated) Neumann series
+    ``alpha * sum_k ((1 - alpha) * P^T)^k E``, where ``E`` contains the
+    corresponding columns of the identity matrix.
+
+    """
+    trans_mat, alpha, tol = _influence_state["trans_mat"], _influence_state["alpha"], _influence_state["tol"]
+    num_nodes = trans_mat.shape[0]
+
+    term = np.zeros((num_nodes, stop - start))
+    term[np.arange(start, stop), np.arange(stop - start)] = alpha
+    block = term.copy()
+    for _ in range(_influence_state["max_iter"]):
+        term = trans_mat @ term
+        block += term
+        if np.abs(term).max() < tol:
+            break
+    else:
+        logger.warning(f"Influence matrix rows {start}:{stop} did not converge within {tol=}")
+    block = block.T
+
+    top_k = _influence_state["top_k"]
+    if top_k is not None and top_k < num_nodes:
+        drop = np.argpartition(block, num_nodes - top_k, axis=1)[:, : num_nodes - top_k]
+        np.put_along_axis(block, drop, 0, axis=1)
+
+    out = np.load(_influence_state["path"], mmap_mode="r+")
+    out[start:stop] = block
+    out.flush()
+
+
+def _make_influence_matrix(
+    adj_mat: csr_matrix,
+    path: str,
+    alpha: float,
+    tol: float = 1e-10,
+    max_iter: int = 1000,
+    top_k: Optional[int] = None,
+    n_jobs: int = 1,
+):
+    """Compute the random walk with restart influence matrix into an npy file.
+
+    The influence matrix is computed in blocks of rows from the sparse
+    column-normalized adjacency matrix (columns of isolated nodes are left as
+    zeros), without forming any other dense N x N matrix. The blocks are
+    written into the memory-mapped output file as they are computed.
+
+    Args:
+        adj_mat: Sparse adjacency matrix.
+        path: Path to the output npy file.
+        alpha: Restart parameter.
+        tol: Stop the series expansion of a block once its terms are all
+            below this tolerance.
+        max_iter: Maximum number of terms of the series expansion.
+        top_k: If set, then only keep the top k entries of each row and set
+            the rest to zero.
+        n_jobs: Number of processes computing blocks of rows in parallel.
+
+    """
+    num_nodes = adj_mat.shape[0]
+    degrees = np.asarray(adj_mat.sum(axis=0)).ravel()
+    inv_degrees = np.divide(1.0, degrees, out=np.zeros(num_nodes), where=degrees != 0)
+    # Transpose of the column-normalized adjacency matrix scaled by (1 - alpha)
+    trans_mat = csr_matrix(adj_mat.multiply(inv_degrees[None, :]).T * (1 - alpha))
+
+    open_memmap(path, mode="w+", dtype=float, shape=(num_nodes, num_nodes)).flush()
+    block_size = max(1, FEATURE_CHUNK_BYTES // max(1, 8 * num_nodes))
+    blocks = [(start, min(start + block_size, num_nodes)) for start in range(0, num_nodes, block_size)]
+    init_args = (trans_mat, path, alpha, tol, max_iter, top_k)
+
+    if n_jobs == 1:
+        _init_influence_worker(*init_args)
+        for start, stop in blocks:
+            _make_influence_rows(start, stop)
+        _influence_state.clear()
+        return
+
+    with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_influence_worker, initargs=init_args) as executor:
+        for future in [executor.submit(_make_influence_rows, start, stop) for start, stop in blocks]:
+            future.result()
+
+
+def _make_embedding(
+    adj_mat: csr_matrix,
+    path: str,
+    dim: int = 128,
+    window: int = 3,
+    n_iter: int = 7,
+    random_state: int = 0,
+):
+    """Compute a low-dimensional node embedding and save it as an npy file.
+
+    The embedding factorizes the diffusion operator ``f(S) = (S + ... +
+    S^window) / window`` of the symmetrically normalized adjacency matrix
+    ``S = D^-1/2 A D^-1/2``: given the top eigenpairs ``(l, U)`` of ``S``, the
+    embedding is ``U * sqrt(max(f(l), 0))``. The eigenpairs are computed using
+    randomized subspace iteration with the sparse matrix, so that no dense
+    N x N matrix is formed.
+
+    Args:
+        adj_mat: Sparse adjacency matrix.
+        path: Path to the output npy file.
+        dim: Embedding dimension, padded with zeros if exceeding the number
+            of nodes.
+        window: Number of random walk steps of the diffusion operator.
+        n_iter: Number of subspace iterations.
+        random_state: Random state of the initial subspace.
+
+    """
+    num_nodes = adj_mat.shape[0]
+    degrees = np.asarray(adj_mat.sum(axis=1)).ravel()
+    inv_sqrt_degrees = np.divide(1.0, np.sqrt(degrees), out=np.zeros(num_nodes), where=degrees > 0)
+    norm_mat = csr_matrix(adj_mat.multiply(inv_sqrt_degrees[:, None]).multiply(inv_sqrt_degrees[None, :]))
+
+    def shifted_op(x):
+        # (S + I) / 2 has eigenvalues in [0, 1], so the subspace iteration
+        # converges to the largest (rather than largest magnitude) eigenvalues
+        return (norm_mat @ x + x) / 2
+
+    rank = min(dim + 10, num_nodes)
+    q, _ = np.linalg.qr(shifted_op(np.random.default_rng(random_state).standard_normal((num_nodes, rank))))
+    for _ in range(n_iter):
+        q, _ = np.linalg.qr(shifted_op(q))
+    eigvals, eigvecs = np.linalg.eigh(q.T @ shifted_op(q))
+    top = np.argsort(eigvals)[::-1][:dim]
+    eigvals, eigvecs = 2 * eigvals[top] - 1, q @ eigvecs[:, top]
+
+    # Make the signs of the eigenvectors deterministic
+    signs = np.sign(eigvecs[np.abs(eigvecs).argmax(axis=0), np.arange(eigvecs.shape[1])])
+    eigvecs *= np.where(signs == 0, 1, signs)
+
+    diffusion = sum(eigvals**step for step in range(1, window + 1)) / window
+    embedding = np.zeros((num_nodes, dim))
+    embedding[:, : eigvecs.shape[1]] = eigvecs * np.sqrt(np.maximum(diffusion, 0))
+    np.save(path, embedding)
 
 
 def edgelist_to_nodeorder(
@@ -28,16 +306,12 @@ def edgelist_to_nodeorder(
 
     """
     logger.info("Making the NodeOrder File")
-    with open(edgelist_loc) as f:
-        nodeset = set()
-        for idx, line in enumerate(f):
-            if idx - skiplines < 0:
-                continue
-            else:
-                nodeset.update(line.strip().split(sep)[:2])
+    nodes = [np.array([], dtype=str)]
+    for node1, node2, _ in _read_edgelist(edgelist_loc, sep, skiplines):
+        nodes.append(np.unique(np.concatenate((node1, node2))))
     outfile = osp.join(data_dir, f"NodeOrder_{net_name}.txt")
     logger.info(f"Saving NodeOrder file to {outfile}")
-    np.savetxt(outfile, sorted(nodeset), fmt="%s")
+    np.savetxt(outfile, np.unique(np.concatenate(nodes)), fmt="%s")
 
 
 def edgelist_to_matrix(
@@ -48,8 +322,16 @@ def edgelist_to_matrix(
     alpha: float = 0.85,
     sep: str = "\t",
     skiplines: int = 0,
+    make_nodeorder: bool = False,
+    top_k: Optional[int] = None,
+    n_jobs: int = 1,
+    embedding_dim: int = 128,
 ):
-    """Convert :term:`edgelist` to an adjacency matrix or influence matrix.
+    """Convert :term:`edgelist` to an adjacency, influence, or embedding matrix.
+
+    The edgelist is parsed in chunks into a sparse adjacency matrix, and the
+    dense feature matrices are computed and written to disk one row block at a
+    time, without inverting dense matrices.
 
     Note:
         The NodeOrder file needs to be a single column text file. If not
@@ -59,61 +341,63 @@ def edgelist_to_matrix(
         edgelist_loc: Location of the edgelist
         data_dir: The directory to save the file
         net_name: The name of the network
-        features: Features for the networks (Adjacency or Influence, All)
+        features: Features for the networks (Adjacency, Influence, Embedding,
+            or All)
         alpha: Restart parameter.
         sep: The separation used in the edgelist file (default tab)
         skiplines: The number of lines to skip for header
+        make_nodeorder: If set to True, then also make the NodeOrder file
+            (same as :func:`edgelist_to_nodeorder`) while parsing the edgelist,
+            instead of loading an existing one.
+        top_k: If set, then only keep the top k entries of each row of the
+            influence matrix and set the rest to zero.
+        n_jobs: Number of processes for computing the influence matrix.
+        embedding_dim: Dimension of the node embedding.
 
     """
     if alpha < 0 or alpha > 1:
         raise ValueError(f"Restart parameter (alpha) must be between 0 and 1, got {alpha!r}")
 
-    # Load in the NodeOrder file and make node index map
+    # Load in the NodeOrder file, or make it from the nodes in the edgelist
     nodeorder_loc = osp.join(data_dir, f"NodeOrder_{net_name}.txt")
-    nodelist = np.loadtxt(nodeorder_loc, dtype=str)
-    node_to_ind = {j: i for i, j in enumerate(nodelist)}
+    nodelist: Optional[np.ndarray] = None if make_nodeorder else np.loadtxt(nodeorder_loc, dtype=str, ndmin=1)
 
     # Make adjacency matrix
     logger.info("Making the adjacency matrix")
-    adj_mat = np.zeros((len(nodelist), len(nodelist)), dtype=float)
-    with open(edgelist_loc) as f:
-        for idx, line in enumerate(f):
-            if idx - skiplines < 0:
-                continue
-            terms = line.strip().split(sep)
-            node1, node2 = terms[:2]
-            if len(terms) > 3:
-                raise ValueError("Too many columns in edgelist file")
-            if (node1 not in node_to_ind) or (node2 not in node_to_ind):
-                raise KeyError(f"Nodes in Edgelist but not in NodeOrder file ({node1!r} or {node2!r})")
-            i, j = node_to_ind[node1], node_to_ind[node2]
-            weight = 1.0 if len(terms) == 2 else terms[2]
-            adj_mat[i, j] = adj_mat[j, i] = weight
-
-    # Optionally make influence matrix
-    if (features == "Influence") or (features == "All"):
-        logger.info("Making the influence matrix")
-        adj_mat_norm = adj_mat / adj_mat.sum(axis=0)
-        id_mat = np.identity(len(nodelist))
-        F_mat = alpha * np.linalg.inv(id_mat - (1 - alpha) * adj_mat_norm)
+    adj_mat_sparse, nodelist = _read_edgelist_sparse(edgelist_loc, sep, skiplines, nodelist)
+    if make_nodeorder:
+        logger.info(f"Saving NodeOrder file to {nodeorder_loc}")
+        np.savetxt(nodeorder_loc, nodelist, fmt="%s")
 
     # Save the data
     logger.info("Saving the data")
     if (features == "Adjacency") or (features == "All"):
-        np.save(osp.join(data_dir, f"Data_Adjacency_{net_name}.npy"), adj_mat)
+        _save_dense(osp.join(data_dir, f"Data_Adjacency_{net_name}.npy"), adj_mat_sparse)
     if (features == "Influence") or (features == "All"):
-        np.save(osp.join(data_dir, f"Data_Influence_{net_name}.npy"), F_mat)
+        logger.info("Making the influence matrix")
+        influence_path = osp.join(data_dir, f"Data_Influence_{net_name}.npy")
+        _make_influence_matrix(adj_mat_sparse, influence_path, alpha, top_k=top_k, n_jobs=n_jobs)
+    if (features == "Embedding") or (features == "All"):
+        logger.info("Making the node embedding")
+        _make_embedding(adj_mat_sparse, osp.join(data_dir, f"Data_Embedding_{net_name}.npy"), embedding_dim)
 
 
 def subset_gsc_to_network(
     data_dir: str,
     net_name: str,
-    gsc_name: str,
+    gsc_name: Union[str, List[str]],
     max_size: int = 200,
     min_size: int = 10,
+    n_jobs: int = 1,
 ):
     """Subset :term:`GSC` to only include genes in the network.
 
+    The (term, gene) pairs of the whole GSC are intersected with the network
+    genes at once. Besides the JSON and the universe text files, the sparse
+    term by gene incidence matrix of the subsetted GSC is saved as
+    ``GSC_{gsc_name}_{net_name}_GoodSets.npz`` (see
+    :class:`geneplexus.index.GSCIncidence`).
+
     Note:
         Use the :meth:`geneplexus.download.download_select_data` function to
         get the preprocessed GO and DisGeNet files first.
@@ -121,28 +405,57 @@ def subset_gsc_to_network(
     Args:
         data_dir: The directory to save the file
         net_name: The name of the network
-        gsc_name: The name of the GSC
+        gsc_name: The name of the GSC, or a list of names to subset multiple
+            GSCs.
         max_size: Maximum geneset size.
-        max_size: Minimum geneset size.
+        min_size: Minimum geneset size.
+        n_jobs: Number of GSCs to subset concurrently using threads.
 
     """
-    logger.info("Subsetting the GSC (this may take a few minutes)")
+    if not isinstance(gsc_name, str):
+        with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+            futures = [
+                executor.submit(subset_gsc_to_network, data_dir, net_name, name, max_size, min_size)
+                for name in gsc_name
+            ]
+            for future in futures:
+                future.result()
+        return
+
+    logger.info(f"Subsetting the GSC {gsc_name}")
     # load in the NodeOrder file
     nodeorder_loc = osp.join(data_dir, f"NodeOrder_{net_name}.txt")
-    nodelist = np.loadtxt(nodeorder_loc, dtype=str)
+    nodelist = np.unique(np.loadtxt(nodeorder_loc, dtype=str, ndmin=1))
     # load the orginal GSC
     with open(osp.join(data_dir, f"GSCOriginal_{gsc_name}.json")) as handle:
         gsc_orig = json.load(handle)
-    # subset GSc based on network
-    universe_genes = np.array([])
-    gsc_subset = {}
-    for akey in gsc_orig:
-        org_genes = gsc_orig[akey]["Genes"]
-        genes_tmp = np.intersect1d(nodelist, org_genes)
-        if (len(genes_tmp) <= max_size) and (len(genes_tmp) >= min_size):
-            gsc_subset[akey] = {"Name": gsc_orig[akey]["Name"], "Genes": genes_tmp.tolist()}
-            universe_genes = np.union1d(universe_genes, genes_tmp)
+
+    # (term, gene) pairs of the GSC, with genes encoded by their position in
+    # the sorted network genes (or -1 if not in the network)
+    terms = list(gsc_orig)
+    gene_lists = [np.asarray(gsc_orig[akey]["Genes"], dtype=str) for akey in terms]
+    set_sizes = np.array([gene_list.size for gene_list in gene_lists], dtype=np.int64)
+    term_codes: np.ndarray = np.repeat(np.arange(len(terms)), set_sizes)
+    gene_codes = NetworkIndex(nodelist).get_rows(np.concatenate(gene_lists + [np.array([], dtype=str)]))
+
+    # Unique pairs of genes in the network, sorted by term and then gene
+    pairs = np.unique(term_codes[gene_codes >= 0] * max(1, nodelist.size) + gene_codes[gene_codes >= 0])
+    term_codes, gene_codes = np.divmod(pairs, max(1, nodelist.size))
+    subset_sizes = np.bincount(term_codes, minlength=len(terms))
+    offsets = np.concatenate(([0], np.cumsum(subset_sizes)))
+
+    # subset GSC based on network
+    kept = np.where((subset_sizes <= max_size) & (subset_sizes >= min_size))[0]
+    gsc_subset: GSC_DATA_TYPE = {}
+    for i in kept:
+        genes_tmp = nodelist[gene_codes[offsets[i] : offsets[i + 1]]]
+        gsc_subset[terms[i]] = {"Name": gsc_orig[terms[i]]["Name"], "Genes": genes_tmp}
+    universe_genes = nodelist[np.unique(gene_codes[np.isin(term_codes, kept)])]
+
     logger.info("Saving the data")
     with open(osp.join(data_dir, f"GSC_{gsc_name}_{net_name}_GoodSets.json"), "w") as f:
-        json.dump(gsc_subset, f, ensure_ascii=False, indent=4)
+        json.dump(gsc_subset, f, ensure_ascii=False, indent=4, default=np.ndarray.tolist)
     np.savetxt(osp.join(data_dir, f"GSC_{gsc_name}_{net_name}_universe.txt"), universe_genes, fmt="%s")
+    GSCIncidence.from_gsc(gsc_subset, universe_genes).save(
+        osp.join(data_dir, f"GSC_{gsc_name}_{net_name}_GoodSets.npz"),
+    )
@@ -1,25 +1,28 @@
 """Data download module."""
-import io
+import hashlib
+import os
 import os.path as osp
+import tempfile
 import time
 from concurrent.futures import ThreadPoolExecutor
-from itertools import repeat
 from threading import local
+from typing import Dict
 from typing import List
+from typing import Optional
 from typing import Tuple
+from typing import TYPE_CHECKING
 from typing import Union
 from urllib.parse import urljoin
 from zipfile import ZipFile
 
-import requests
-from requests.sessions import Session
-
 from . import util
 from ._config import logger
 from ._config.config import ALL_FEATURES
 from ._config.config import ALL_GSCS
 from ._config.config import ALL_NETWORKS
 from ._config.config import ALL_TASKS
+from ._config.config import DOWNLOAD_CHUNK_BYTES
+from ._config.config import DOWNLOAD_PROGRESS_INTERVAL
 from ._config.config import FEATURE_SELECTION_TYPE
 from ._config.config import FEATURE_TYPE
 from ._config.config import GSC_SELECTION_TYPE
@@ -35,6 +38,9 @@ from ._config.logger_util import file_handler_context
 from ._config.logger_util import stream_level_context
 from .exception import DownloadError
 
+if TYPE_CHECKING:
+    import requests
+
 thread_local = local()
 
 
@@ -48,6 +54,7 @@ def download_select_data(
     n_jobs: int = 10,
     retry: bool = True,
     log_level: LOG_LEVEL_TYPE = "INFO",
+    manifest: Optional[str] = None,
 ):
     """Select subset of data to download.
 
@@ -63,8 +70,14 @@ def download_select_data(
             list. Do all the GSC if set to "All".
         n_jobs: Number of concurrent downloading threads.
         retry: If set to True, then retry downloading any missing file.
+        log_level: Logging level.
+        manifest: Path to a checksum manifest in the ``md5sum`` format (see
+            :func:`read_manifest`). If set, then the MD5 checksum of each
+            downloaded zip file listed in the manifest is verified.
 
     """
+    checksums = None if manifest is None else read_manifest(manifest)
+
     # Similarities and NetworkGraph will assume downloaded MachineLearning
     tasks, networks, features, gscs = make_download_options_lists(tasks, networks, features, gscs)
     all_files_to_do = []
@@ -92,31 +105,129 @@ def download_select_data(
             logger.info(f"Total number of files to download: {len(files_to_download)}")
             logger.info(f"Start downloading data and saving to: {data_dir}")
             with file_handler_context(logger, log_path, "DEBUG"):
-                _download_from_url(data_dir, files_to_download, data_loc, n_jobs, retry)
+                _download_from_url(data_dir, files_to_download, data_loc, n_jobs, retry, checksums=checksums)
             logger.info("Download completed.")
 
 
-def _get_session() -> Session:
+def _get_session() -> "requests.Session":
+    # requests is imported on first download, keeping the import of the package fast
+    import requests
+
     if not hasattr(thread_local, "session"):
         thread_local.session = requests.Session()
         logger.debug(f"Acquired thread local session {thread_local.session!r}")
     return thread_local.session
 
 
-def _download_file(file: str, data_dir: str, data_loc: str):
+def read_manifest(path: str) -> Dict[str, str]:
+    """Read a checksum manifest in the ``md5sum`` format.
+
+    Each line contains the MD5 checksum and the name of a zip file, e.g.,
+    ``d41d8cd98f00b204e9800998ecf8427e  NodeOrder_BioGRID.txt.zip``.
+
+    Args:
+        path: Path to the manifest file.
+
+    Returns:
+        Dict[str, str]: Mapping from zip file name to MD5 checksum.
+
+    """
+    checksums = {}
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                checksum, name = line.split(maxsplit=1)
+                checksums[name.strip().lstrip("*")] = checksum.lower()
+    return checksums
+
+
+def _get_md5(path: str) -> str:
+    md5 = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_BYTES), b""):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+def _stream_to_file(r: "requests.Response", path: str, append: bool, url: str):
+    """Write the response body to a file chunk by chunk, reporting progress."""
+    start_size = osp.getsize(path) if append else 0
+    total_size = int(r.headers.get("Content-Length", 0)) + start_size
+    size, start_time = start_size, time.perf_counter()
+    last_report = start_time
+    with open(path, "ab" if append else "wb") as f:
+        for chunk in r.iter_content(chunk_size=DOWNLOAD_CHUNK_BYTES):
+            f.write(chunk)
+            size += len(chunk)
+            if time.perf_counter() - last_report > DOWNLOAD_PROGRESS_INTERVAL:
+                last_report = time.perf_counter()
+                speed = (size - start_size) / (last_report - start_time) / 1024**2
+                progress = f"{size / total_size:.0%}" if total_size else f"{size / 1024**2:.1f}MB"
+                logger.info(f"Downloading {url}: {progress} ({speed:.1f}MB/s)")
+
+    elapsed = time.perf_counter() - start_time
+    logger.debug(
+        f"Downloaded {(size - start_size) / 1024**2:.1f}MB in {elapsed:.1f}s "
+        f"({(size - start_size) / 1024**2 / max(elapsed, 1e-6):.1f}MB/s): {url=}",
+    )
+
+
+def _extract_zip(zip_path: str, data_dir: str):
+    """Extract the zip file, moving each member to the data directory atomically."""
+    with ZipFile(zip_path) as zf:
+        bad_file = zf.testzip()
+        if bad_file is not None:
+            raise DownloadError(f"Corrupted file {bad_file!r} in {zip_path} (CRC mismatch)")
+        with tempfile.TemporaryDirectory(dir=data_dir, prefix=".extract_") as tmpdir:
+            zf.extractall(tmpdir)
+            for root, _, files in os.walk(tmpdir):
+                for name in files:
+                    rel_path = osp.relpath(osp.join(root, name), tmpdir)
+                    os.makedirs(osp.dirname(osp.join(data_dir, rel_path)), exist_ok=True)
+                    os.replace(osp.join(root, name), osp.join(data_dir, rel_path))
+
+
+def _download_file(file: str, data_dir: str, data_loc: str, checksums: Optional[Dict[str, str]] = None):
+    """Download and extract a zip file.
+
+    The zip file is streamed to a ``.part`` file, which is resumed using HTTP
+    Range requests if the connection is dropped (also across calls). The
+    extracted files only appear in the data directory once the download is
+    complete and verified.
+
+    """
+    import requests
+
     session = _get_session()
 
-    url = urljoin(URL_DICT[data_loc], f"{file}.zip")
+    zip_name = f"{file}.zip"
+    url = urljoin(URL_DICT[data_loc], zip_name)
+    part_path = osp.join(data_dir, f"{zip_name}.part")
     logger.debug(f"Thread started: {url=}, {session=}")
 
     num_tries = 0
     while num_tries <= MAX_RETRY:
         num_tries += 1
-        with session.get(url) as r:
+        resume_from = osp.getsize(part_path) if osp.isfile(part_path) else 0
+        headers = {"Range": f"bytes={resume_from}-"} if resume_from else {}
+        with session.get(url, headers=headers, stream=True) as r:
             if r.ok:
                 logger.debug(f"Response ok ({r!r}): {url=}")
-                ZipFile(io.BytesIO(r.content)).extractall(data_dir)
-                break
+                # Server may ignore the range request and send the full file
+                append = resume_from > 0 and r.status_code == 206
+                if append:
+                    logger.info(f"Resuming download from {resume_from} bytes: {url=}")
+                elif resume_from:
+                    logger.info(f"Server does not support resuming, restarting: {url=}")
+                try:
+                    _stream_to_file(r, part_path, append, url)
+                except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError) as e:
+                    logger.warning(f"Connection dropped, resuming: {url=} ({e})")
+                    continue
+            elif r.status_code == 416:  # Range not satisfiable, restart
+                logger.warning(f"Unable to resume download, restarting: {url=}")
+                os.remove(part_path)
+                continue
             elif r.status_code == 429:  # Retry later
                 t = r.headers["Retry-after"]
                 logger.warning(f"Too many requests, waiting for {t} sec")
@@ -124,7 +235,20 @@ def _download_file(file: str, data_dir: str, data_loc: str):
                 continue
             else:
                 raise requests.exceptions.RequestException(r, url)
-        logger.critical("Session context closed, this should never happen!")
+
+        if checksums is not None and zip_name in checksums:
+            checksum = _get_md5(part_path)
+            if checksum != checksums[zip_name]:
+                os.remove(part_path)
+                # Logged here as well, since failures of the download threads are only logged at debug level
+                msg = f"Checksum mismatch for {url}: expected {checksums[zip_name]}, got {checksum}"
+                logger.warning(msg)
+                raise DownloadError(msg)
+            logger.debug(f"Checksum verified: {url=}")
+
+        _extract_zip(part_path, data_dir)
+        os.remove(part_path)
+        break
     else:
         raise DownloadError(f"Failed to download from {url} ({MAX_RETRY=})")
     logger.info(f"Downloaded {file}")
@@ -153,6 +277,7 @@ def _download_from_url(
     n_jobs: int = 10,
     retry: bool = True,
     retry_count: int = 0,
+    checksums: Optional[Dict[str, str]] = None,
 ):
     """Download file using the base url.
 
@@ -162,10 +287,14 @@ def _download_from_url(
         n_jobs: Number of concurrent downloading threads.
         retry: If set to True, then retry downloading any missing file.
         retry_count: (DO NOT MODIFY) Counting the number of retries.
+        checksums: Mapping from zip file name to MD5 checksum to verify.
 
     """
     with ThreadPoolExecutor(max_workers=n_jobs) as executor:
-        executor.map(_download_file, files_to_do, repeat(data_dir), repeat(data_loc))
+        futures = [executor.submit(_download_file, file, data_dir, data_loc, checksums) for file in files_to_do]
+        for file, future in zip(files_to_do, futures):
+            if future.exception() is not None:
+                logger.debug(f"Failed to download {file}: {future.exception()!r}")
 
     missed = _get_files_to_download(data_dir, files_to_do, silent=True)
     if missed and retry:
@@ -175,7 +304,7 @@ def _download_from_url(
         logger.warning(
             f"Failed to download the following files, retrying...{missed_str}",
         )
-        _download_from_url(data_dir, missed, data_loc, n_jobs, True, retry_count + 1)
+        _download_from_url(data_dir, missed, data_loc, n_jobs, True, retry_count + 1, checksums)
 
 
 def _make_download_options_list(
@@ -1,11 +1,22 @@
 """GenePlexus API."""
+import copy
+import functools
 import os
 import os.path as osp
 import warnings
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
+from typing import Callable
 from typing import Dict
+from typing import Iterator
 from typing import List
+from typing import Literal
 from typing import Optional
+from typing import overload
+from typing import Sequence
+from typing import Tuple
+from typing import Union
 
 import pystow
 import yaml
@@ -15,8 +26,29 @@ from . import util
 from ._config import config
 from ._config import logger
 from ._config.logger_util import set_stream_level
+from .cache import ResultCache
 from .download import download_select_data
 from .exception import CustomDataError
+from .profile import Profile
+
+# This module loads the heavy dependencies (scikit-learn, SciPy, and pandas via
+# geneplexus._geneplexus). It is only imported on first access of
+# geneplexus.GenePlexus (see geneplexus/__init__.py) and when the CLI runs the
+# pipeline, so that importing the package and the CLI stays fast.
+
+
+def _profile_stage(name: str) -> Callable:
+    """Record calls of a GenePlexus method as a stage of its profile."""
+
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.profile.stage(name):
+                return method(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorate
 
 
 class GenePlexus:
@@ -31,6 +63,9 @@ class GenePlexus:
         input_genes: Optional[List[str]] = None,
         auto_download: bool = False,
         log_level: config.LOG_LEVEL_TYPE = "WARNING",
+        mmap_mode: config.MMAP_MODE_TYPE = None,
+        result_cache: Optional[ResultCache] = None,
+        precision: config.PRECISION_TYPE = "float64",
     ):
         """Initialize the GenePlexus object.
 
@@ -45,6 +80,31 @@ class GenePlexus:
                 :meth:`load_genes` (default: :obj:`None`).
             auto_download: Automatically download necessary files if set.
             log_level: Logging level.
+            mmap_mode: Memory-map mode for loading the network features (see
+                :func:`numpy.load`). If set (e.g., ``"r"``), the feature matrix
+                is never fully copied into memory, and processes using the same
+                data files share it through the OS page cache. With ``"c"``
+                (copy-on-write), the features are writable and mapped anew for
+                each run instead of being cached. Load the whole feature matrix
+                into memory if not set.
+            result_cache: Cache of model training results. If set, then
+                :meth:`fit_and_predict` reuses the results of previous runs
+                with the same positive and negative genes, settings, and data
+                files instead of retraining. Only the model training is
+                cached, the other steps (e.g., :meth:`load_genes` and
+                :meth:`make_sim_dfs`) are rerun.
+            precision: Precision of the network features, correction matrices,
+                and pretrained weights to use. Reduced precisions ("float32",
+                "float16", or "int8") use the converted data files (see
+                :func:`geneplexus.precision.convert_data_precision`) and
+                compute in float32, using less memory at the cost of small
+                deviations from the float64 results (see
+                :func:`geneplexus.precision.compare_precision`).
+
+        :attr:`GenePlexus.profile` (:class:`~geneplexus.profile.Profile`)
+            Wall time, CPU time, peak memory increase, and bytes read of
+            each stage run on this object (e.g., ``"id_conversion"``,
+            ``"fit"``, ``"cv_fold"``, and data loads).
 
         """
         set_stream_level(logger, log_level)
@@ -55,7 +115,11 @@ class GenePlexus:
         self.net_type = net_type
         self.log_level = log_level
         self.auto_download = auto_download
+        self.mmap_mode = mmap_mode
+        self.result_cache = result_cache
+        self.precision = precision
         self.input_genes: List[str] = []
+        self.profile = Profile()
 
         self.check_custom()
 
@@ -77,6 +141,13 @@ class GenePlexus:
         if input_genes is not None:
             self.load_genes(input_genes)
 
+    def __copy__(self) -> "GenePlexus":
+        """Return a shallow copy with an independent profile."""
+        new = self.__class__.__new__(self.__class__)
+        new.__dict__.update(self.__dict__)
+        new.profile = copy.copy(self.profile)
+        return new
+
     @property
     def _params(self) -> List[str]:
         return [
@@ -86,12 +157,15 @@ class GenePlexus:
             "gsc",
             "auto_download",
             "log_level",
+            "mmap_mode",
+            "precision",
             "input_genes",
         ]
 
     def dump_config(self, outdir: str):
-        """Save parameters configuration to a config file."""
+        """Save parameters configuration and the run profile to a config file."""
         params_dict = {i: getattr(self, i) for i in self._params}
+        params_dict["profile"] = self.profile.stages
         path = osp.join(outdir, "config.yaml")
         with open(path, "w") as f:
             yaml.dump(params_dict, f)
@@ -143,6 +217,26 @@ class GenePlexus:
         util.check_param("feature", features, config.ALL_FEATURES)
         self._features = features
 
+    @property
+    def mmap_mode(self) -> config.MMAP_MODE_TYPE:
+        """Memory-map mode for loading the network features."""
+        return self._mmap_mode
+
+    @mmap_mode.setter
+    def mmap_mode(self, mmap_mode: config.MMAP_MODE_TYPE):
+        util.check_param("mmap mode", mmap_mode, config.MMAP_MODES)
+        self._mmap_mode = mmap_mode
+
+    @property
+    def precision(self) -> config.PRECISION_TYPE:
+        """Precision of the network features, correction matrices, and pretrained weights."""
+        return self._precision
+
+    @precision.setter
+    def precision(self, precision: config.PRECISION_TYPE):
+        util.check_param("precision", precision, config.PRECISIONS)
+        self._precision = precision
+
     @property
     def gsc(self) -> config.GSC_TYPE:
         """Geneset collection."""
@@ -191,6 +285,7 @@ class GenePlexus:
                 "set up using geneplexus.custom.subset_gsc_to_network first.",
             )
 
+    @_profile_stage("load_genes")
     def load_genes(self, input_genes: List[str]):
         """Load gene list, convert to Entrez, and set up positives/negatives.
 
@@ -234,11 +329,13 @@ class GenePlexus:
             Number of input genes.
 
         """
-        self.convert_ids, df_convert_out = _geneplexus._initial_id_convert(self.input_genes, self.file_loc)
-        self.df_convert_out, self.table_summary, self.input_count = _geneplexus._make_validation_df(
-            df_convert_out,
-            self.file_loc,
-        )
+        with self.profile.stage("id_conversion"):
+            self.convert_ids, df_convert_out = _geneplexus._initial_id_convert(self.input_genes, self.file_loc)
+        with self.profile.stage("validation_table"):
+            self.df_convert_out, self.table_summary, self.input_count = _geneplexus._make_validation_df(
+                df_convert_out,
+                self.file_loc,
+            )
         return self.df_convert_out
 
     def _get_pos_and_neg_genes(self):
@@ -255,19 +352,22 @@ class GenePlexus:
             the background gene set collection (GSC).
 
         """
-        self.pos_genes_in_net, self.genes_not_in_net, self.net_genes = _geneplexus._get_genes_in_network(
-            self.file_loc,
-            self.net_type,
-            self.convert_ids,
-        )
-        self.negative_genes = _geneplexus._get_negatives(
-            self.file_loc,
-            self.net_type,
-            self.gsc,
-            self.pos_genes_in_net,
-        )
+        with self.profile.stage("genes_in_network"):
+            self.pos_genes_in_net, self.genes_not_in_net, self.net_genes = _geneplexus._get_genes_in_network(
+                self.file_loc,
+                self.net_type,
+                self.convert_ids,
+            )
+        with self.profile.stage("negatives"):
+            self.negative_genes = _geneplexus._get_negatives(
+                self.file_loc,
+                self.net_type,
+                self.gsc,
+                self.pos_genes_in_net,
+            )
         return self.pos_genes_in_net, self.negative_genes, self.net_genes
 
+    @_profile_stage("fit_and_predict")
     def fit_and_predict(
         self,
         logreg_kwargs: Optional[Dict[str, Any]] = None,
@@ -276,6 +376,7 @@ class GenePlexus:
         null_val: float = -10,
         random_state: Optional[int] = 0,
         cross_validate: bool = True,
+        n_jobs: int = 1,
     ):
         """Fit a model and predict gene scores.
 
@@ -295,6 +396,9 @@ class GenePlexus:
                 evaluate the prediction performance on the gene set. If set to
                 ``False``, then skip cross validation and return null_val as cv
                 scores.
+            n_jobs: Number of threads for fitting the final model and the
+                cross validation models concurrently. Consider limiting the
+                number of BLAS threads (e.g., ``OMP_NUM_THREADS``) accordingly.
 
         :attr:`GenePlexus.mdl_weights` (array of float)
             Trained model parameters.
@@ -313,29 +417,195 @@ class GenePlexus:
             relevance of the gene to the input gene list).
 
         """
+        if n_jobs < 1:
+            raise ValueError(f"n_jobs must be a positive integer, got {n_jobs!r}")
+
+        # Results are only reproducible, and thus cached, with a fixed random state
+        result_key = None
+        if self.result_cache is not None and random_state is not None:
+            result_key = self._get_result_key(
+                logreg_kwargs=config.DEFAULT_LOGREG_KWARGS if logreg_kwargs is None else logreg_kwargs,
+                min_num_pos=min_num_pos,
+                num_folds=num_folds,
+                null_val=null_val,
+                random_state=random_state,
+                cross_validate=cross_validate,
+            )
+            result = self.result_cache.get(result_key)
+            if result is not None:
+                logger.info(f"Using cached results {result_key}")
+                self.mdl_weights, self.probs, self.avgps, self.df_probs = result
+                return self.mdl_weights, self.df_probs, self.avgps
+
         self.mdl_weights, self.probs, self.avgps = _geneplexus._run_sl(
             self.file_loc,
             self.net_type,
             self.features,
             self.pos_genes_in_net,
             self.negative_genes,
-            self.net_genes,
             logreg_kwargs=logreg_kwargs,
             min_num_pos=min_num_pos,
             num_folds=num_folds,
             null_val=null_val,
             random_state=random_state,
             cross_validate=cross_validate,
+            mmap_mode=self.mmap_mode,
+            n_jobs=n_jobs,
+            precision=self.precision,
         )
-        self.df_probs = _geneplexus._make_prob_df(
-            self.file_loc,
-            self.net_genes,
-            self.probs,
-            self.pos_genes_in_net,
-            self.negative_genes,
-        )
+        with self.profile.stage("prob_table"):
+            self.df_probs = _geneplexus._make_prob_df(
+                self.file_loc,
+                self.net_type,
+                self.probs,
+                self.pos_genes_in_net,
+                self.negative_genes,
+            )
+        if result_key is not None and self.result_cache is not None:
+            self.result_cache.put(result_key, (self.mdl_weights, self.probs, self.avgps, self.df_probs))
         return self.mdl_weights, self.df_probs, self.avgps
 
+    def _get_result_key(self, **settings) -> str:
+        """Return the result cache key of the model given the current genes.
+
+        The key covers the positive and negative genes, the data options and
+        the versions (size and modification time) of the data files used for
+        training and predicting, and the model settings.
+
+        """
+        file_names = [
+            osp.relpath(
+                util.get_gene_features_path(self.file_loc, self.features, self.net_type, self.precision),
+                self.file_loc,
+            ),
+            f"NodeOrder_{self.net_type}.txt",
+            "IDconversion_Homo-sapiens_Entrez-to-Symbol.json",
+            "IDconversion_Homo-sapiens_Entrez-to-Name.json",
+        ]
+        data_versions = {}
+        for file_name in file_names:
+            stat = os.stat(osp.join(self.file_loc, file_name))
+            data_versions[file_name] = [stat.st_size, stat.st_mtime_ns]
+
+        return ResultCache.make_key(
+            net_type=self.net_type,
+            features=self.features,
+            gsc=self.gsc,
+            precision=self.precision,
+            pos_genes=sorted(self.pos_genes_in_net),
+            negative_genes=sorted(self.negative_genes),
+            data_versions=data_versions,
+            **settings,
+        )
+
+    @overload
+    def fit_and_predict_many(
+        self,
+        gene_sets: Union[Dict[str, List[str]], Sequence[List[str]]],
+        n_jobs: int = ...,
+        callback: Optional[Callable[["GenePlexus"], Any]] = ...,
+        return_errors: Literal[False] = ...,
+        **kwargs,
+    ) -> Iterator[Tuple[str, "GenePlexus"]]:
+        ...
+
+    @overload
+    def fit_and_predict_many(
+        self,
+        gene_sets: Union[Dict[str, List[str]], Sequence[List[str]]],
+        n_jobs: int = ...,
+        callback: Optional[Callable[["GenePlexus"], Any]] = ...,
+        return_errors: bool = ...,
+        **kwargs,
+    ) -> Iterator[Tuple[str, Union["GenePlexus", Exception]]]:
+        ...
+
+    def fit_and_predict_many(
+        self,
+        gene_sets: Union[Dict[str, List[str]], Sequence[List[str]]],
+        n_jobs: int = 1,
+        callback: Optional[Callable[["GenePlexus"], Any]] = None,
+        return_errors: bool = False,
+        **kwargs,
+    ) -> Iterator[Tuple[str, Union["GenePlexus", Exception]]]:
+        """Fit models and predict gene scores for many gene sets.
+
+        Each gene set is processed on a copy of this GenePlexus object by
+        calling :meth:`load_genes` and :meth:`fit_and_predict`. The data files
+        (features, ID conversions, GSCs) are loaded once and shared by all
+        gene sets via :data:`geneplexus.cache.DATA_CACHE`.
+
+        Args:
+            gene_sets: Gene sets to process, either a dictionary mapping gene
+                set names to gene lists, or a sequence of gene lists (named by
+                their position in the sequence).
+            n_jobs: Number of gene sets to process concurrently using threads.
+            callback: Function called with the GenePlexus object of each gene
+                set after fitting, in the same thread, e.g., to also compute
+                the model similarities via :meth:`make_sim_dfs`.
+            return_errors: If set to True, then the error of a failed gene set
+                is generated in place of its GenePlexus object, instead of
+                being raised.
+            kwargs: Keyword arguments passed to :meth:`fit_and_predict`.
+
+        Returns:
+            Iterator of (gene set name, GenePlexus object) in the order of
+            the input gene sets. The results are generated as soon as they are
+            ready, and at most ``2 * n_jobs`` gene sets are processed ahead of
+            the consumer. Errors of a gene set are raised when its result is
+            reached, unless ``return_errors`` is set.
+
+        Example:
+            >>> for name, gp_set in gp.fit_and_predict_many(gene_sets, n_jobs=8):
+            ...     gp_set.df_probs.to_csv(f"{name}.csv")
+
+        """
+        # Validated here rather than in the generator, so invalid arguments are raised at the call
+        if n_jobs < 1:
+            raise ValueError(f"n_jobs must be a positive integer, got {n_jobs!r}")
+        return self._iter_fit_and_predict(gene_sets, n_jobs, callback, return_errors, kwargs)
+
+    def _iter_fit_and_predict(
+        self,
+        gene_sets: Union[Dict[str, List[str]], Sequence[List[str]]],
+        n_jobs: int,
+        callback: Optional[Callable[["GenePlexus"], Any]],
+        return_errors: bool,
+        kwargs: Dict[str, Any],
+    ) -> Iterator[Tuple[str, Union["GenePlexus", Exception]]]:
+        """Generate the results of :meth:`fit_and_predict_many`."""
+        items = gene_sets.items() if isinstance(gene_sets, dict) else enumerate(gene_sets)
+
+        def run(genes: List[str]) -> Union["GenePlexus", Exception]:
+            try:
+                gp = copy.copy(self)
+                gp.load_genes(genes)
+                gp.fit_and_predict(**kwargs)
+                if callback is not None:
+                    callback(gp)
+            except Exception as e:
+                if not return_errors:
+                    raise
+                return e
+            return gp
+
+        if n_jobs == 1:
+            for name, genes in items:
+                yield str(name), run(genes)
+            return
+
+        with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+            pending: deque = deque()
+            for name, genes in items:
+                pending.append((str(name), executor.submit(run, genes)))
+                if len(pending) >= 2 * n_jobs:
+                    name, future = pending.popleft()
+                    yield name, future.result()
+            while pending:
+                name, future = pending.popleft()
+                yield name, future.result()
+
+    @_profile_stage("similarity")
     def make_sim_dfs(self):
         """Compute similarities bewteen the input genes and GO or DisGeNet.
 
@@ -365,6 +635,12 @@ class GenePlexus:
             of the DO term), **Weights** (pretrained model weights),
             **PosGenes** (positive genes for this DO term).
 
+        Note:
+            :attr:`GenePlexus.weights_GO` and :attr:`GenePlexus.weights_Dis`
+            are read-only mappings (see
+            :class:`geneplexus.util.LazyPretrainedWeights`) that only load the
+            pretrained model weights file on first access.
+
         """
         self.df_sim_GO, self.df_sim_Dis, self.weights_GO, self.weights_Dis = _geneplexus._make_sim_dfs(
             self.file_loc,
@@ -372,9 +648,11 @@ class GenePlexus:
             self.gsc,
             self.net_type,
             self.features,
+            precision=self.precision,
         )
         return self.df_sim_GO, self.df_sim_Dis, self.weights_GO, self.weights_Dis
 
+    @_profile_stage("edgelist")
     def make_small_edgelist(self, num_nodes: int = 50):
         """Make a subgraph induced by the top predicted genes.
 
@@ -0,0 +1,832 @@
+"""Compact prebuilt data structures for fast, vectorized lookups."""
+import os
+import os.path as osp
+import shutil
+import uuid
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import TYPE_CHECKING
+from typing import Union
+
+import numpy as np
+
+from ._config.config import FEATURE_CHUNK_BYTES
+from ._config.config import GSC_DATA_TYPE
+from ._config.config import ID_CONVERSION_MAP_TYPE
+from ._config.config import MMAP_MODE_TYPE
+from ._config.config import PRETRAINED_DATA_TYPE
+
+if TYPE_CHECKING:
+    from scipy.sparse import csr_matrix
+
+
+def _encode(genes: Sequence[str]) -> np.ndarray:
+    """Encode gene IDs into a UTF-8 byte string array."""
+    return np.array([gene.encode("utf-8") for gene in genes], dtype=bytes)
+
+
+def _save_arrays_dir(path: str, arrays: Dict[str, np.ndarray]):
+    """Save arrays as npy files in a directory, replacing it if it exists.
+
+    The files are first written to a uniquely named temporary directory. An
+    existing directory is moved aside (and removed afterwards) right before
+    the temporary directory is renamed to the destination, so the destination
+    never holds a partially written set of files.
+
+    """
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    os.makedirs(tmp_path)
+    try:
+        for name, array in arrays.items():
+            np.save(osp.join(tmp_path, f"{name}.npy"), array)
+        old_path = None
+        if osp.isdir(path):
+            old_path = f"{path}.{uuid.uuid4().hex}.old"
+            os.replace(path, old_path)
+        try:
+            os.replace(tmp_path, path)
+        except OSError:
+            if old_path is not None:
+                os.replace(old_path, path)
+            raise
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+    if old_path is not None:
+        shutil.rmtree(old_path, ignore_errors=True)
+
+
+def _save_npz(path: str, arrays: Dict[str, Any]):
+    """Save arrays as a (uncompressed) npz file, replacing it if it exists.
+
+    The file is first written to a uniquely named temporary file in the same
+    directory and then renamed to the destination, so the destination never
+    holds a partially written file.
+
+    """
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if osp.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class IDConversionIndex:
+    """Sorted index mapping gene IDs of different types to Entrez IDs.
+
+    The source IDs (upper cased) are stored as a sorted byte string array and
+    looked up in batch via binary search. The Entrez IDs of the source ID at
+    position ``i`` are ``values[offsets[i]:offsets[i + 1]]``, and the ID type
+    the source ID was found in is ``src_types[type_codes[i]]``.
+
+    """
+
+    def __init__(
+        self,
+        keys: np.ndarray,
+        offsets: np.ndarray,
+        values: np.ndarray,
+        type_codes: np.ndarray,
+        src_types: Sequence[str],
+    ):
+        """Initialize the IDConversionIndex object.
+
+        Args:
+            keys: Sorted array of source gene IDs (UTF-8 encoded).
+            offsets: Start position of the Entrez IDs of each source gene ID,
+                with the total number of Entrez IDs appended at the end.
+            values: Concatenated Entrez IDs (UTF-8 encoded).
+            type_codes: Index into ``src_types`` for each source gene ID.
+            src_types: Source gene ID types.
+
+        """
+        self.keys = keys
+        self.offsets = offsets
+        self.values = values
+        self.type_codes = type_codes
+        self.src_types = list(src_types)
+
+    def __len__(self) -> int:
+        """Return the number of source gene IDs in the index."""
+        return self.keys.size
+
+    @property
+    def nbytes(self) -> int:
+        """Total bytes consumed by the index arrays."""
+        return self.keys.nbytes + self.offsets.nbytes + self.values.nbytes + self.type_codes.nbytes
+
+    @classmethod
+    def from_conversion_maps(cls, conversion_maps: Dict[str, ID_CONVERSION_MAP_TYPE]) -> "IDConversionIndex":
+        """Build the index from gene ID conversion mappings.
+
+        Args:
+            conversion_maps: Mapping from the source ID type to the
+                corresponding ID conversion mapping to Entrez (see
+                :func:`geneplexus.util.load_geneid_conversion`). When a gene ID
+                is present in multiple mappings, the first one takes priority.
+
+        Note:
+            Source IDs are converted to upper case.
+
+        """
+        merged: Dict[str, int] = {}
+        mapped: List[List[str]] = []
+        codes: List[int] = []
+        for code, conversion_map in enumerate(conversion_maps.values()):
+            conversion_map = {src.upper(): dst for src, dst in conversion_map.items()}
+            for src, dst in conversion_map.items():
+                if src not in merged:
+                    merged[src] = len(mapped)
+                    mapped.append(dst)
+                    codes.append(code)
+
+        keys = sorted(merged)
+        order = [merged[key] for key in keys]
+        lengths = np.array([len(mapped[i]) for i in order], dtype=np.int64)
+        offsets: np.ndarray = np.zeros(len(keys) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        values = _encode([gene for i in order for gene in mapped[i]])
+        type_codes = np.array(codes, dtype=np.int8)[order] if codes else np.array([], dtype=np.int8)
+
+        return cls(_encode(keys), offsets, values, type_codes, list(conversion_maps))
+
+    def save(self, path: str):
+        """Save the index as a (uncompressed) npz file."""
+        _save_npz(
+            path,
+            {
+                "keys": self.keys,
+                "offsets": self.offsets,
+                "values": self.values,
+                "type_codes": self.type_codes,
+                "src_types": np.array(self.src_types),
+            },
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "IDConversionIndex":
+        """Load the index saved by :meth:`save`."""
+        with np.load(path) as f:
+            return cls(f["keys"], f["offsets"], f["values"], f["type_codes"], f["src_types"].tolist())
+
+    def lookup(self, genes: Sequence[str]) -> np.ndarray:
+        """Return the index position of each gene, -1 if not found.
+
+        Args:
+            genes: Gene IDs (upper cased) to look up.
+
+        """
+        genes_enc = _encode(genes)
+        if self.keys.size == 0 or genes_enc.size == 0:
+            return np.full(genes_enc.size, -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self.keys, genes_enc), self.keys.size - 1)
+        return np.where(self.keys[pos] == genes_enc, pos, -1)
+
+    def convert(self, genes: Sequence[str]) -> List[Optional[List[str]]]:
+        """Convert a batch of genes to Entrez.
+
+        Args:
+            genes: Gene IDs (upper cased) to convert.
+
+        Returns:
+            List of the corresponding Entrez IDs of each gene, or None if the
+            gene cannot be mapped.
+
+        """
+        return [None if i < 0 else self._get_values(i) for i in self.lookup(genes)]
+
+    def get_src_type(self, gene: str) -> Optional[str]:
+        """Return the type of ID a gene was found in, None if not found."""
+        i = self.lookup([gene])[0]
+        return None if i < 0 else self.src_types[self.type_codes[i]]
+
+    def _get_values(self, i: int) -> List[str]:
+        return [val.decode("utf-8") for val in self.values[self.offsets[i] : self.offsets[i + 1]]]
+
+
+class NetworkIndex:
+    """Index mapping network genes to their rows in the network features.
+
+    The index is built once from the network node ordering (NodeOrder) and
+    maps batches of genes to rows via binary search over the sorted genes,
+    instead of scanning the full node ordering for each gene.
+
+    """
+
+    def __init__(self, genes: np.ndarray):
+        """Initialize the NetworkIndex object.
+
+        Args:
+            genes: Network genes, in the order of the feature matrix rows.
+
+        """
+        self.genes = genes
+        self._sorter = np.argsort(genes, kind="stable")
+        self._sorted_genes = genes[self._sorter]
+
+    def __len__(self) -> int:
+        """Return the number of genes in the network."""
+        return self.genes.size
+
+    @property
+    def nbytes(self) -> int:
+        """Total bytes consumed by the index arrays."""
+        return self.genes.nbytes + self._sorter.nbytes + self._sorted_genes.nbytes
+
+    def get_rows(self, genes: Sequence[str], missing_ok: bool = True) -> np.ndarray:
+        """Return the row of each gene in the network, -1 if not found.
+
+        Args:
+            genes: Genes to look up.
+            missing_ok: If set to False, then raise KeyError if any gene is
+                not in the network.
+
+        """
+        gene_array = np.asarray(genes, dtype=str)
+        rows: np.ndarray
+        if self.genes.size == 0 or gene_array.size == 0:
+            rows = np.full(gene_array.size, -1, dtype=np.int64)
+        else:
+            pos = np.minimum(np.searchsorted(self._sorted_genes, gene_array), self.genes.size - 1)
+            rows = np.where(self._sorted_genes[pos] == gene_array, self._sorter[pos], -1)
+
+        if not missing_ok and (rows < 0).any():
+            raise KeyError(f"Genes not in the network: {gene_array[rows < 0].tolist()}")
+
+        return rows
+
+    def contains(self, genes: Sequence[str]) -> np.ndarray:
+        """Return a mask indicating whether each gene is in the network."""
+        return self.get_rows(genes) >= 0
+
+    def get_mask(self, genes: Sequence[str]) -> np.ndarray:
+        """Return a mask over the network genes indicating selected genes.
+
+        Args:
+            genes: Selected genes, those that are not in the network are
+                ignored.
+
+        """
+        rows = self.get_rows(genes)
+        mask: np.ndarray = np.zeros(self.genes.size, dtype=bool)
+        mask[rows[rows >= 0]] = True
+        return mask
+
+
+class GSCIncidence:
+    """Sparse term by gene incidence matrix of a gene set collection (GSC).
+
+    The columns correspond to the sorted union of the GSC universe genes and
+    all genes annotated to any term, so that overlaps between all terms and a
+    gene set can be computed with a single sparse matrix-vector product.
+
+    """
+
+    def __init__(
+        self,
+        term_ids: np.ndarray,
+        term_names: np.ndarray,
+        set_sizes: np.ndarray,
+        genes: np.ndarray,
+        in_universe: np.ndarray,
+        universe_size: int,
+        matrix: "csr_matrix",
+    ):
+        """Initialize the GSCIncidence object.
+
+        Args:
+            term_ids: IDs of the terms (rows).
+            term_names: Names of the terms.
+            set_sizes: Number of genes annotated to each term.
+            genes: Sorted genes (columns).
+            in_universe: Mask indicating whether a gene is in the universe.
+            universe_size: Number of genes in the universe.
+            matrix: Binary term by gene incidence matrix.
+
+        """
+        self.term_ids = term_ids
+        self.term_names = term_names
+        self.set_sizes = set_sizes
+        self.genes = genes
+        self.in_universe = in_universe
+        self.universe_size = universe_size
+        self.matrix = matrix
+
+    def __len__(self) -> int:
+        """Return the number of terms in the GSC."""
+        return self.term_ids.size
+
+    @property
+    def nbytes(self) -> int:
+        """Total bytes consumed by the incidence matrix and its indexes."""
+        return (
+            self.term_ids.nbytes
+            + self.term_names.nbytes
+            + self.set_sizes.nbytes
+            + self.genes.nbytes
+            + self.in_universe.nbytes
+            + self.matrix.indptr.nbytes
+            + self.matrix.indices.nbytes
+            + self.matrix.data.nbytes
+        )
+
+    @classmethod
+    def from_gsc(cls, gsc: GSC_DATA_TYPE, universe: np.ndarray) -> "GSCIncidence":
+        """Build the incidence matrix from a gene set collection.
+
+        Args:
+            gsc: Gene set collection (see :func:`geneplexus.util.load_gsc`).
+            universe: Genes in the universe of the GSC.
+
+        """
+        universe = np.atleast_1d(np.asarray(universe, dtype=str))
+        gene_lists = [np.asarray(gsc[term]["Genes"], dtype=str) for term in gsc]
+        set_sizes = np.array([gene_list.size for gene_list in gene_lists], dtype=np.int64)
+        all_genes = np.concatenate([universe] + gene_lists)
+        genes, inverse = np.unique(all_genes, return_inverse=True)
+
+        cols = inverse[universe.size :]
+        rows: np.ndarray = np.repeat(np.arange(len(gene_lists)), set_sizes)
+        in_universe = np.zeros(genes.size, dtype=bool)
+        in_universe[inverse[: universe.size]] = True
+
+        return cls(
+            np.array(list(gsc), dtype=str),
+            np.array([gsc[term]["Name"] for term in gsc], dtype=str),
+            set_sizes,
+            genes,
+            in_universe,
+            universe.size,
+            _make_binary_csr(rows, cols, (len(gene_lists), genes.size)),
+        )
+
+    def save(self, path: str):
+        """Save the incidence matrix as a (uncompressed) npz file."""
+        _save_npz(
+            path,
+            {
+                "term_ids": self.term_ids,
+                "term_names": self.term_names,
+                "set_sizes": self.set_sizes,
+                "genes": self.genes,
+                "in_universe": self.in_universe,
+                "universe_size": self.universe_size,
+                "indptr": self.matrix.indptr,
+                "indices": self.matrix.indices,
+            },
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "GSCIncidence":
+        """Load the incidence matrix saved by :meth:`save`."""
+        from scipy.sparse import csr_matrix
+
+        with np.load(path) as f:
+            indices, indptr = f["indices"], f["indptr"]
+            matrix = csr_matrix(
+                (np.ones(indices.size, dtype=np.int32), indices, indptr),
+                shape=(indptr.size - 1, f["genes"].size),
+            )
+            return cls(
+                f["term_ids"],
+                f["term_names"],
+                f["set_sizes"],
+                f["genes"],
+                f["in_universe"],
+                int(f["universe_size"]),
+                matrix,
+            )
+
+    def get_gene_mask(self, genes: Sequence[str]) -> np.ndarray:
+        """Return a mask over the columns indicating selected genes."""
+        return np.isin(self.genes, np.asarray(genes, dtype=str))
+
+    def get_overlaps(self, gene_mask: np.ndarray) -> np.ndarray:
+        """Return the number of selected genes annotated to each term."""
+        return self.matrix @ gene_mask.astype(np.int32)
+
+    def get_annotated_mask(self, term_mask: np.ndarray) -> np.ndarray:
+        """Return a mask over the columns of genes annotated to any selected term."""
+        return (self.matrix.T @ term_mask.astype(np.int32)) > 0
+
+
+class ReducedPrecisionMatrix:
+    """Matrix stored in reduced precision and dequantized to float32 on access.
+
+    The values are stored as float32, float16, or int8. The int8 values are
+    symmetrically quantized per column, i.e., column ``j`` of the matrix is
+    ``values[:, j] * scales[j]`` with ``scales[j] = max(abs(column j)) / 127``.
+    Indexing returns the selected entries as float32, and matrix products are
+    computed in row blocks, so that the full matrix is never materialized in
+    float32. The arrays are saved as separate npy files in a directory, so the
+    values can be memory-mapped.
+
+    """
+
+    precisions = ["float32", "float16", "int8"]
+
+    def __init__(self, values: np.ndarray, scales: Optional[np.ndarray] = None):
+        """Initialize the ReducedPrecisionMatrix object.
+
+        Args:
+            values: Stored (possibly quantized) values.
+            scales: Column scales of the quantized values, unscaled if not set.
+
+        """
+        self.values = values
+        self.scales = scales
+
+    def __len__(self) -> int:
+        """Return the number of rows."""
+        return self.values.shape[0]
+
+    @property
+    def shape(self):
+        """Shape of the matrix."""
+        return self.values.shape
+
+    @property
+    def ndim(self) -> int:
+        """Number of dimensions of the matrix."""
+        return self.values.ndim
+
+    @property
+    def dtype(self) -> np.dtype:
+        """Data type of the dequantized values."""
+        return np.dtype(np.float32)
+
+    @property
+    def precision(self) -> str:
+        """Precision the values are stored in."""
+        return self.values.dtype.name
+
+    @property
+    def nbytes(self) -> int:
+        """Total bytes consumed by the in-memory (not memory-mapped) arrays."""
+        arrays = [self.values] if self.scales is None else [self.values, self.scales]
+        return sum(array.nbytes for array in arrays if not isinstance(array, np.memmap))
+
+    @classmethod
+    def from_array(cls, data: Union[np.ndarray, "ReducedPrecisionMatrix"], precision: str) -> "ReducedPrecisionMatrix":
+        """Reduce the precision of a (possibly memory-mapped or reduced precision) matrix.
+
+        Row blocks of the matrix are processed one at a time.
+
+        Args:
+            data: Matrix to reduce the precision of.
+            precision: Precision to store the values in ('float32', 'float16',
+                or 'int8').
+
+        """
+        if precision not in cls.precisions:
+            raise ValueError(f"Unknown reduced precision {precision!r}, available options are {cls.precisions}")
+
+        chunk_size = max(1, FEATURE_CHUNK_BYTES // max(1, data[:1].nbytes))
+        scales = None
+        if precision == "int8":
+            max_abs = np.zeros(data.shape[1])
+            for start in range(0, data.shape[0], chunk_size):
+                max_abs = np.maximum(max_abs, np.abs(data[start : start + chunk_size]).max(axis=0, initial=0))
+            scales = np.where(max_abs > 0, max_abs / 127, 1).astype(np.float32)
+
+        values = np.empty(data.shape, dtype=precision)
+        for start in range(0, data.shape[0], chunk_size):
+            chunk = np.asarray(data[start : start + chunk_size], dtype=float)
+            if scales is not None:
+                chunk = np.clip(np.rint(chunk / scales), -127, 127)
+            values[start : start + chunk_size] = chunk
+        return cls(values, scales)
+
+    def save(self, path: str):
+        """Save the arrays as npy files in a directory, replacing it if it exists."""
+        arrays = {"values": self.values}
+        if self.scales is not None:
+            arrays["scales"] = self.scales
+        _save_arrays_dir(path, arrays)
+
+    @classmethod
+    def load(cls, path: str, mmap_mode: MMAP_MODE_TYPE = "r") -> "ReducedPrecisionMatrix":
+        """Load the matrix saved by :meth:`save`, with the values memory-mapped by default."""
+        values = np.load(osp.join(path, "values.npy"), mmap_mode=mmap_mode)
+        scales_path = osp.join(path, "scales.npy")
+        return cls(values, np.load(scales_path) if osp.isfile(scales_path) else None)
+
+    def __getitem__(self, key) -> np.ndarray:
+        """Return the selected rows (and columns) as float32."""
+        rows, cols = key if isinstance(key, tuple) else (key, slice(None))
+        values: np.ndarray = self.values[rows, cols].astype(np.float32)
+        if self.scales is not None:
+            values *= self.scales[cols]
+        return values
+
+    def __matmul__(self, other: np.ndarray) -> np.ndarray:
+        """Multiply with a vector or a matrix in float32, one row block at a time."""
+        other = np.asarray(other, dtype=np.float32)
+        if self.scales is not None:
+            # Fold the column scales into the other operand
+            other = (self.scales * other.T).T
+        out = np.empty((self.shape[0],) + other.shape[1:], dtype=np.float32)
+        chunk_size = max(1, FEATURE_CHUNK_BYTES // max(1, 4 * self.shape[1]))
+        for start in range(0, self.shape[0], chunk_size):
+            out[start : start + chunk_size] = self.values[start : start + chunk_size].astype(np.float32) @ other
+        return out
+
+
+class PretrainedModels:
+    """Stacked weights of models pretrained on the terms of a gene set collection.
+
+    The weights are stored as a single row-normalized matrix (one row per
+    term), so that the cosine similarities between one or many models and all
+    pretrained models are computed with a single matrix product.
+
+    """
+
+    def __init__(
+        self,
+        term_ids: np.ndarray,
+        term_names: np.ndarray,
+        weights: Union[np.ndarray, ReducedPrecisionMatrix],
+    ):
+        """Initialize the PretrainedModels object.
+
+        Args:
+            term_ids: IDs of the terms (rows).
+            term_names: Names of the terms.
+            weights: Row-normalized model weights, possibly stored in reduced
+                precision.
+
+        """
+        self.term_ids = term_ids
+        self.term_names = term_names
+        self.weights = weights
+        self._term_to_row = {term: i for i, term in enumerate(term_ids.tolist())}
+
+    def __len__(self) -> int:
+        """Return the number of pretrained models."""
+        return self.term_ids.size
+
+    @property
+    def nbytes(self) -> int:
+        """Total bytes consumed by the weights and the term IDs and names."""
+        return self.term_ids.nbytes + self.term_names.nbytes + self.weights.nbytes
+
+    @classmethod
+    def from_pretrained_weights(cls, pretrained_weights: PRETRAINED_DATA_TYPE) -> "PretrainedModels":
+        """Stack pretrained model weights.
+
+        Args:
+            pretrained_weights: Pretrained model weights (see
+                :func:`geneplexus.util.load_pretrained_weights`).
+
+        """
+        terms = list(pretrained_weights)
+        weights = np.array([pretrained_weights[term]["Weights"] for term in terms], dtype=float)
+        if weights.size > 0:
+            weights /= np.linalg.norm(weights, axis=1, keepdims=True)
+        return cls(
+            np.array(terms, dtype=str),
+            np.array([pretrained_weights[term]["Name"] for term in terms], dtype=str),
+            weights,
+        )
+
+    def save(self, path: str):
+        """Save the stacked weights as a (uncompressed) npz file."""
+        arrays: Dict[str, Any] = {"term_ids": self.term_ids, "term_names": self.term_names}
+        if isinstance(self.weights, ReducedPrecisionMatrix):
+            arrays["weights"] = self.weights.values
+            if self.weights.scales is not None:
+                arrays["scales"] = self.weights.scales
+        else:
+            arrays["weights"] = self.weights
+        _save_npz(path, arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "PretrainedModels":
+        """Load the stacked weights saved by :meth:`save`."""
+        with np.load(path) as f:
+            weights = f["weights"]
+            if "scales" in f or weights.dtype != np.float64:
+                weights = ReducedPrecisionMatrix(weights, f["scales"] if "scales" in f else None)
+            return cls(f["term_ids"], f["term_names"], weights)
+
+    def get_rows(self, term_ids: Sequence[str]) -> np.ndarray:
+        """Return the rows of the given terms.
+
+        Raises:
+            KeyError: If any of the terms does not have a pretrained model.
+
+        """
+        return np.array([self._term_to_row[term] for term in term_ids], dtype=np.int64)
+
+
+class FeatureStats:
+    """Column means and scales for standardizing network features.
+
+    The statistics only depend on the feature matrix, so they are computed
+    once (in row blocks, without copying the feature matrix) and reused for
+    all models. Constant features are left unscaled, consistent with
+    :class:`sklearn.preprocessing.StandardScaler`.
+
+    """
+
+    def __init__(self, mean: np.ndarray, var: np.ndarray, n_samples: int):
+        """Initialize the FeatureStats object.
+
+        Args:
+            mean: Column means.
+            var: Column variances.
+            n_samples: Number of rows the statistics are computed over.
+
+        """
+        self.mean = mean
+        self.var = var
+        self.n_samples = n_samples
+
+        eps = np.finfo(np.float64).eps
+        is_constant = var <= n_samples * eps * var + (n_samples * mean * eps) ** 2
+        self.scale = np.where(is_constant, 1.0, np.sqrt(var))
+
+    @property
+    def shape(self):
+        """Shape of the feature matrix the statistics are computed over."""
+        return (self.n_samples, self.mean.size)
+
+    @property
+    def nbytes(self) -> int:
+        """Total bytes consumed by the statistics."""
+        return self.mean.nbytes + self.var.nbytes + self.scale.nbytes
+
+    @classmethod
+    def from_data(cls, data: Union[np.ndarray, ReducedPrecisionMatrix]) -> "FeatureStats":
+        """Compute the statistics of a (possibly memory-mapped or reduced precision) feature matrix.
+
+        Row blocks of the feature matrix are processed one at a time and
+        combined using the parallel algorithm by Chan et al.
+
+        """
+        n_samples, mean, m2 = 0, np.zeros(data.shape[1]), np.zeros(data.shape[1])
+        chunk_size = max(1, FEATURE_CHUNK_BYTES // max(1, data[:1].nbytes))
+        for start in range(0, data.shape[0], chunk_size):
+            chunk = np.asarray(data[start : start + chunk_size], dtype=float)
+            chunk_mean = chunk.mean(axis=0)
+            chunk_m2 = ((chunk - chunk_mean) ** 2).sum(axis=0)
+            delta = chunk_mean - mean
+            total = n_samples + chunk.shape[0]
+            mean = mean + delta * chunk.shape[0] / total
+            m2 = m2 + chunk_m2 + delta**2 * n_samples * chunk.shape[0] / total
+            n_samples = total
+        return cls(mean, m2 / max(1, n_samples), n_samples)
+
+    def save(self, path: str):
+        """Save the statistics as a (uncompressed) npz file."""
+        _save_npz(path, {"mean": self.mean, "var": self.var, "n_samples": self.n_samples})
+
+    @classmethod
+    def load(cls, path: str) -> "FeatureStats":
+        """Load the statistics saved by :meth:`save`."""
+        with np.load(path) as f:
+            return cls(f["mean"], f["var"], int(f["n_samples"]))
+
+    def transform(self, data: np.ndarray) -> np.ndarray:
+        """Standardize features."""
+        return (data - self.mean) / self.scale
+
+    def fold_into_linear_model(self, coef: np.ndarray, intercept: float):
+        """Fold the standardization into the parameters of a linear model.
+
+        Returns the coefficients and the intercept of the equivalent linear
+        model taking the unstandardized features as input, i.e.,
+        ``transform(x) @ coef + intercept == x @ new_coef + new_intercept``.
+
+        """
+        new_coef = coef / self.scale
+        return new_coef, intercept - self.mean @ new_coef
+
+
+class EdgeStore:
+    """Network edge list indexed by node for induced subgraph queries.
+
+    The nodes are stored as a sorted string array and the edges are referred to
+    by node codes (positions in the node array). The edges are grouped by
+    their first node in CSR format: the ids (i.e., line number in the edge
+    list file) of the edges whose first node is ``nodes[i]`` are
+    ``edge_ids[indptr[i]:indptr[i + 1]]``. All arrays are saved as separate
+    npy files, so the store can be memory-mapped.
+
+    """
+
+    _arrays = ["nodes", "indptr", "edge_ids", "node1", "node2", "weights"]
+
+    def __init__(
+        self,
+        nodes: np.ndarray,
+        indptr: np.ndarray,
+        edge_ids: np.ndarray,
+        node1: np.ndarray,
+        node2: np.ndarray,
+        weights: np.ndarray,
+    ):
+        """Initialize the EdgeStore object.
+
+        Args:
+            nodes: Sorted unique nodes.
+            indptr: CSR index pointers over the nodes.
+            edge_ids: Edge ids grouped by their first node.
+            node1: Code of the first node of each edge.
+            node2: Code of the second node of each edge.
+            weights: Weight of each edge.
+
+        """
+        self.nodes = nodes
+        self.indptr = indptr
+        self.edge_ids = edge_ids
+        self.node1 = node1
+        self.node2 = node2
+        self.weights = weights
+
+    def __len__(self) -> int:
+        """Return the number of edges."""
+        return self.node1.size
+
+    @property
+    def nbytes(self) -> int:
+        """Total bytes consumed by the in-memory (not memory-mapped) arrays."""
+        arrays = [getattr(self, name) for name in self._arrays]
+        return sum(array.nbytes for array in arrays if not isinstance(array, np.memmap))
+
+    @classmethod
+    def from_edgelist(cls, node1: np.ndarray, node2: np.ndarray, weights: np.ndarray) -> "EdgeStore":
+        """Build the edge store from the edge list columns.
+
+        Args:
+            node1: First node of each edge.
+            node2: Second node of each edge.
+            weights: Weight of each edge.
+
+        """
+        nodes, codes = np.unique(np.concatenate((node1, node2)).astype(str), return_inverse=True)
+        codes = codes.astype(np.int32)
+        node1_codes, node2_codes = codes[: len(node1)], codes[len(node1) :]
+        edge_ids = np.argsort(node1_codes, kind="stable")
+        indptr = np.zeros(nodes.size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(node1_codes, minlength=nodes.size), out=indptr[1:])
+        return cls(nodes, indptr, edge_ids, node1_codes, node2_codes, np.asarray(weights))
+
+    def save(self, path: str):
+        """Save the arrays as npy files in a directory, replacing it if it exists."""
+        _save_arrays_dir(path, {name: getattr(self, name) for name in self._arrays})
+
+    @classmethod
+    def load(cls, path: str, mmap_mode: MMAP_MODE_TYPE = "r") -> "EdgeStore":
+        """Load the edge store saved by :meth:`save`, memory-mapped by default."""
+        return cls(*(np.load(osp.join(path, f"{name}.npy"), mmap_mode=mmap_mode) for name in cls._arrays))
+
+    def get_induced_edges(self, genes: Sequence[str]) -> np.ndarray:
+        """Return the sorted ids of the edges between the selected genes.
+
+        Args:
+            genes: Selected genes, those that are not in the network are
+                ignored.
+
+        """
+        gene_array = np.asarray(genes, dtype=str)
+        if self.nodes.size == 0 or gene_array.size == 0:
+            return np.zeros(0, dtype=np.int64)
+
+        pos = np.minimum(np.searchsorted(self.nodes, gene_array), self.nodes.size - 1)
+        codes = np.unique(pos[self.nodes[pos] == gene_array])
+        node_mask: np.ndarray = np.zeros(self.nodes.size, dtype=bool)
+        node_mask[codes] = True
+
+        # Edges incident to the selected genes through their first nodes
+        candidates = [self.edge_ids[self.indptr[i] : self.indptr[i + 1]] for i in codes]
+        candidates = np.sort(np.concatenate(candidates + [np.zeros(0, dtype=np.int64)]))
+        return candidates[node_mask[self.node2[candidates]]]
+
+
+def _make_binary_csr(rows: np.ndarray, cols: np.ndarray, shape) -> "csr_matrix":
+    """Make a CSR matrix with ones at the (deduplicated) given positions."""
+    from scipy.sparse import csr_matrix
+
+    mat = csr_matrix((np.ones(rows.size, dtype=np.int32), (rows, cols)), shape=shape)
+    mat.sum_duplicates()
+    mat.data[:] = 1
+    return mat
+
+
+__all__ = [
+    "IDConversionIndex",
+    "NetworkIndex",
+    "GSCIncidence",
+    "ReducedPrecisionMatrix",
+    "PretrainedModels",
+    "FeatureStats",
+    "EdgeStore",
+]
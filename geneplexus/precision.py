@@ -0,0 +1,307 @@
+"""Convert data files to reduced precision and check the effect on results.
+
+The network features (``Data_*``), correction matrices
+(``CorrectionMatrix_*``), and pretrained model weights are stored in float64.
+Converting them to float32, float16, or int8 (per column scaled) reduces the
+memory used by each GenePlexus run by a factor of two, four, or eight,
+respectively. The converted files are written next to the original ones (see
+:func:`convert_data_precision`) and used by setting the ``precision`` option of
+:class:`~geneplexus.GenePlexus`, in which case the computations are done in
+float32. :func:`compare_precision` reports how much the gene ranks, cross
+validation scores, and model similarities change compared to float64.
+
+Example:
+    Convert the BioGRID data to float16, check the results on 10 randomly
+    selected GO terms, and run the pipeline on the converted data
+
+    >>> from geneplexus import GenePlexus, precision
+    >>> precision.convert_data_precision("path/to/data", "float16", "BioGRID")
+    >>> print(precision.compare_precision("path/to/data", "float16", "BioGRID"))
+    >>> gp = GenePlexus("path/to/data", "BioGRID", "Embedding", "GO", precision="float16")
+
+    or from the command line
+
+    .. code-block:: bash
+
+        python -m geneplexus.precision path/to/data --precision float16 --network BioGRID --check
+
+"""
+import argparse
+import os
+import os.path as osp
+from typing import cast
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+from scipy.stats import spearmanr
+
+from . import util
+from ._config import logger
+from ._config.config import ALL_FEATURES
+from ._config.config import ALL_GSCS
+from ._config.config import FEATURE_SELECTION_TYPE
+from ._config.config import FEATURE_TYPE
+from ._config.config import GSC_TYPE
+from ._config.config import LOG_LEVELS
+from ._config.config import NET_SELECTION_TYPE
+from ._config.config import NET_TYPE
+from ._config.config import PRECISION_TYPE
+from ._config.logger_util import set_stream_level
+from .geneplexus import GenePlexus
+from .index import PretrainedModels
+from .index import ReducedPrecisionMatrix
+from .util import format_choices
+from .util import normexpand
+
+REDUCED_PRECISIONS = ReducedPrecisionMatrix.precisions
+
+
+def convert_data_precision(
+    file_loc: str,
+    precision: PRECISION_TYPE,
+    networks: NET_SELECTION_TYPE = "All",
+    features: FEATURE_SELECTION_TYPE = "All",
+) -> List[Tuple[NET_TYPE, FEATURE_TYPE]]:
+    """Write reduced precision versions of the data files.
+
+    For each selected network and feature type, the following files (those
+    present in the data directory) are converted, skipping those that are
+    already converted and up to date.
+
+    * ``Data_{features}_{net_type}.npy`` to the
+      ``Data_{features}_{net_type}.{precision}`` directory (see
+      :class:`~geneplexus.index.ReducedPrecisionMatrix`), along with its
+      feature statistics ``DataStats_{features}_{net_type}.{precision}.npz``.
+    * ``CorrectionMatrix_{gsc}_{target_set}_{net_type}_{features}.npy`` to the
+      ``CorrectionMatrix_{gsc}_{target_set}_{net_type}_{features}.{precision}``
+      directory.
+    * ``PreTrainedWeights_{target_set}_{net_type}_{features}.json`` to
+      ``PreTrainedWeights_{target_set}_{net_type}_{features}.{precision}.npz``
+      (see :class:`~geneplexus.index.PretrainedModels`).
+
+    The feature matrices are processed in row blocks, so they are never fully
+    loaded in float64.
+
+    Args:
+        file_loc: Location of data files.
+        precision: Precision to convert to ('float32', 'float16', or 'int8').
+        networks: Networks to convert, all networks in the data directory
+            (including custom networks) if set to "All".
+        features: Types of features to convert.
+
+    Returns:
+        Networks and feature types whose features are converted.
+
+    """
+    util.check_param("precision", precision, REDUCED_PRECISIONS)
+    file_loc = normexpand(file_loc, create=False)
+    all_networks = [
+        net_type
+        for net_type in util.get_all_net_types(file_loc)
+        if osp.isfile(osp.join(file_loc, f"NodeOrder_{net_type}.txt"))
+    ]
+    converted = []
+    for net_type in cast(List[NET_TYPE], _make_selection_list(networks, all_networks)):
+        for feature in cast(List[FEATURE_TYPE], _make_selection_list(features, ALL_FEATURES)):
+            if _convert_matrix(file_loc, f"Data_{feature}_{net_type}", precision):
+                util.load_feature_stats(file_loc, feature, net_type, precision=precision)
+                converted.append((net_type, feature))
+            for target_set in cast(List[GSC_TYPE], ALL_GSCS):
+                _convert_pretrained_models(file_loc, target_set, net_type, feature, precision)
+                for gsc in ALL_GSCS:
+                    _convert_matrix(file_loc, f"CorrectionMatrix_{gsc}_{target_set}_{net_type}_{feature}", precision)
+
+    if not converted:
+        logger.warning(f"No network features found to convert in {file_loc}")
+    return converted
+
+
+def _make_selection_list(selection, all_options: List[str]) -> List[str]:
+    if selection == "All":
+        return list(all_options)
+    return [selection] if isinstance(selection, str) else list(selection)
+
+
+def _is_up_to_date(src_path: str, dst_path: str) -> bool:
+    return osp.exists(dst_path) and os.stat(dst_path).st_mtime_ns >= os.stat(src_path).st_mtime_ns
+
+
+def _convert_matrix(file_loc: str, name: str, precision: PRECISION_TYPE) -> bool:
+    """Convert a npy matrix file if present, return whether it is (already) converted."""
+    src_path = osp.join(file_loc, f"{name}.npy")
+    dst_path = osp.join(file_loc, f"{name}.{precision}")
+    if not osp.isfile(src_path):
+        logger.debug(f"Skipping missing file {src_path}")
+        return False
+    if not _is_up_to_date(src_path, dst_path):
+        data = np.load(src_path, mmap_mode="r")
+        ReducedPrecisionMatrix.from_array(data, precision).save(dst_path)
+        logger.info(f"Converted {src_path} to {dst_path}")
+    return True
+
+
+def _convert_pretrained_models(
+    file_loc: str,
+    target_set: GSC_TYPE,
+    net_type: NET_TYPE,
+    features: FEATURE_TYPE,
+    precision: PRECISION_TYPE,
+):
+    """Convert the stacked pretrained weights if present."""
+    name = f"PreTrainedWeights_{target_set}_{net_type}_{features}"
+    src_path = osp.join(file_loc, f"{name}.json")
+    dst_path = osp.join(file_loc, f"{name}.{precision}.npz")
+    if not osp.isfile(src_path):
+        logger.debug(f"Skipping missing file {src_path}")
+    elif not _is_up_to_date(src_path, dst_path):
+        pretrained_models = util.load_pretrained_models(file_loc, target_set, net_type, features)
+        PretrainedModels(
+            pretrained_models.term_ids,
+            pretrained_models.term_names,
+            ReducedPrecisionMatrix.from_array(pretrained_models.weights, precision),
+        ).save(dst_path)
+        logger.info(f"Converted {src_path} to {dst_path}")
+
+
+def compare_precision(
+    file_loc: str,
+    precision: PRECISION_TYPE,
+    net_type: NET_TYPE = "STRING",
+    features: FEATURE_TYPE = "Embedding",
+    gsc: GSC_TYPE = "GO",
+    gene_sets: Optional[Dict[str, List[str]]] = None,
+    num_gene_sets: int = 10,
+    top_k: int = 100,
+    random_state: int = 0,
+    n_jobs: int = 1,
+) -> pd.DataFrame:
+    """Compare the results using reduced precision data to those using float64.
+
+    The pipeline (:meth:`~geneplexus.GenePlexus.fit_and_predict` and
+    :meth:`~geneplexus.GenePlexus.make_sim_dfs`) is run on each gene set with
+    both precisions, the reduced precision data must be converted beforehand
+    (see :func:`convert_data_precision`).
+
+    Args:
+        file_loc: Location of data files.
+        precision: Reduced precision to compare.
+        net_type: Network used.
+        features: Type of features used.
+        gsc: Gene set collection used for generating negatives.
+        gene_sets: Dictionary mapping gene set names to gene lists. If not
+            set, then use ``num_gene_sets`` randomly selected terms of the
+            gene set collection.
+        num_gene_sets: Number of terms to select if ``gene_sets`` is not set.
+        top_k: Number of top ranked genes to compare.
+        random_state: Random state for selecting the terms and for the cross
+            validation.
+        n_jobs: Number of gene sets to process concurrently using threads.
+
+    Returns:
+        A table with one row per gene set and the columns **Name** (gene set
+        name), **RankCorrelation** (Spearman correlation between the gene
+        probabilities), **TopKOverlap** (fraction of the top ``top_k`` genes
+        in common), **MaxTopKRankChange** (largest rank change of the float64
+        top ``top_k`` genes), **MaxProbabilityDiff** (largest absolute
+        difference of gene probabilities), **MeanCVScore** (mean float64
+        cross validation score), **MaxCVScoreDiff** (largest absolute
+        difference of the cross validation scores), and
+        **SimilarityRankCorrelation** (smallest Spearman correlation between
+        the GO or DisGeNet model similarities).
+
+    """
+    util.check_param("precision", precision, REDUCED_PRECISIONS)
+    if gene_sets is None:
+        gsc_data = util.load_gsc(file_loc, gsc, net_type)
+        rng = np.random.default_rng(random_state)
+        terms = rng.choice(sorted(gsc_data), size=min(num_gene_sets, len(gsc_data)), replace=False)
+        gene_sets = {term: list(gsc_data[term]["Genes"]) for term in sorted(terms)}
+
+    results = {}
+    for prec in ["float64", precision]:
+        gp = GenePlexus(file_loc, net_type, features, gsc, log_level="WARNING", precision=prec)
+        results[prec] = dict(gp.fit_and_predict_many(gene_sets, n_jobs=n_jobs, random_state=random_state))
+        for gp_set in results[prec].values():
+            gp_set.make_sim_dfs()
+
+    rows = []
+    for name in gene_sets:
+        base, reduced = results["float64"][name], results[precision][name]
+        base_ranks = base.df_probs.set_index("Entrez")["Rank"]
+        reduced_ranks = reduced.df_probs.set_index("Entrez")["Rank"]
+        base_top = base.df_probs["Entrez"].to_numpy()[:top_k]
+        reduced_top = reduced.df_probs["Entrez"].to_numpy()[:top_k]
+        sim_corrs = [
+            spearmanr(
+                df_base["Similarity"].to_numpy(),
+                df_reduced.set_index("ID")["Similarity"][df_base["ID"]].to_numpy(),
+            ).correlation
+            for df_base, df_reduced in [(base.df_sim_GO, reduced.df_sim_GO), (base.df_sim_Dis, reduced.df_sim_Dis)]
+        ]
+        rows.append(
+            {
+                "Name": name,
+                "RankCorrelation": spearmanr(base.probs, reduced.probs).correlation,
+                "TopKOverlap": np.intersect1d(base_top, reduced_top).size / max(1, base_top.size),
+                "MaxTopKRankChange": np.abs(reduced_ranks[base_top].to_numpy() - base_ranks[base_top].to_numpy()).max(
+                    initial=0,
+                ),
+                "MaxProbabilityDiff": np.abs(np.asarray(base.probs) - np.asarray(reduced.probs)).max(),
+                "MeanCVScore": np.mean(base.avgps),
+                "MaxCVScoreDiff": np.abs(np.asarray(base.avgps) - np.asarray(reduced.avgps)).max(),
+                "SimilarityRankCorrelation": min(sim_corrs),
+            },
+        )
+    return pd.DataFrame(rows)
+
+
+def parse_args(args: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse arguments from command line."""
+    parser = argparse.ArgumentParser(
+        description="Convert GenePlexus data files to reduced precision.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("file_loc", help="Data directory containing the files to convert.")
+    parser.add_argument(
+        "-p",
+        "--precision",
+        required=True,
+        choices=REDUCED_PRECISIONS,
+        help=f"Precision to convert to. {format_choices(REDUCED_PRECISIONS)}",
+    )
+    parser.add_argument("-n", "--network", nargs="+", default=["All"], help="Networks to convert.")
+    parser.add_argument("-f", "--feature", nargs="+", default=["All"], help=format_choices(ALL_FEATURES))
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Compare the results on randomly selected terms to those using float64 after converting.",
+    )
+    parser.add_argument("-g", "--gsc", default="GO", help="Gene set collection of the terms to check on.")
+    parser.add_argument("--num-gene-sets", type=int, default=10, help="Number of terms to check on.")
+    parser.add_argument("-l", "--log_level", default="INFO", help=format_choices(LOG_LEVELS))
+    return parser.parse_args(args)
+
+
+def main(args: Optional[List[str]] = None):
+    """Command line interface for converting data to reduced precision."""
+    opts = parse_args(args)
+    set_stream_level(logger, opts.log_level)
+    converted = convert_data_precision(
+        opts.file_loc,
+        opts.precision,
+        networks=opts.network if opts.network != ["All"] else "All",
+        features=opts.feature if opts.feature != ["All"] else "All",
+    )
+    if opts.check:
+        for net_type, feature in converted:
+            df = compare_precision(opts.file_loc, opts.precision, net_type, feature, opts.gsc, None, opts.num_gene_sets)
+            print(f"{opts.precision} vs float64 results on {net_type} {feature}:\n{df.to_string(index=False)}")
+            print(f"Mean:\n{df.drop(columns='Name').mean().to_string()}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""Per-stage run time and resource usage profiling of GenePlexus runs.
+
+Each :class:`geneplexus.GenePlexus` object records the stages of its runs
+(ID conversion, data loads, model fitting, etc.) in a :class:`Profile`,
+available as :attr:`geneplexus.GenePlexus.profile`. The stages run within a
+:meth:`Profile.stage` context are attributed to that profile, including those
+run by library functions via :func:`stage` and those run in threads
+submitted with :func:`in_context`.
+
+Example:
+    >>> gp.fit_and_predict()
+    >>> print(gp.profile.format())
+    >>> gp.profile.summary()["fit"]["wall_time"]
+
+"""
+import contextvars
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextlib import nullcontext
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None  # type: ignore
+
+# Profile the stages of the current context are attributed to, and the depth
+# of the current stage in it
+_ACTIVE_PROFILE: "contextvars.ContextVar[Optional[Profile]]" = contextvars.ContextVar("profile", default=None)
+_DEPTH: "contextvars.ContextVar[int]" = contextvars.ContextVar("profile_depth", default=0)
+
+
+class Profile:
+    """Thread-safe record of the stages of GenePlexus runs.
+
+    Each stage is recorded as a dictionary with the following keys
+
+    * **name**: Name of the stage, e.g., ``"fit"`` or ``"load Data_Embedding_BioGRID.npy"``.
+    * **depth**: Nesting level of the stage, 0 for the top level stages.
+    * **start**: Start time of the stage in seconds since the profile was created.
+    * **wall_time**: Elapsed (wall clock) time in seconds.
+    * **cpu_time**: CPU time of the whole process (all threads) in seconds.
+    * **peak_rss_delta**: Increase of the peak resident set size of the
+      process in bytes, i.e., the memory the stage added on top of the
+      highest memory usage so far. None if not available on the platform.
+    * **bytes_read**: Number of bytes read by the process via read system
+      calls (memory-mapped reads are not counted). None if not available on
+      the platform (Linux only).
+
+    Note:
+        The CPU time, memory, and bytes read are measured for the whole
+        process, and thus include the work of other stages run concurrently
+        (e.g., cross validation folds fitted in parallel).
+
+    """
+
+    def __init__(self):
+        """Initialize the Profile object."""
+        self._lock = threading.Lock()
+        self._stages: List[Dict[str, Any]] = []
+        self._created = time.perf_counter()
+
+    def __copy__(self) -> "Profile":
+        """Return an independent profile with the stages recorded so far."""
+        new = Profile()
+        new._created = self._created
+        new._stages = self.stages
+        return new
+
+    def __len__(self) -> int:
+        """Return the number of recorded stages."""
+        return len(self._stages)
+
+    @property
+    def stages(self) -> List[Dict[str, Any]]:
+        """Recorded stages, ordered by their start times."""
+        with self._lock:
+            return sorted((dict(stage) for stage in self._stages), key=lambda stage: stage["start"])
+
+    def clear(self):
+        """Remove all recorded stages."""
+        with self._lock:
+            self._stages.clear()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Record a stage, and attribute stages run within it to this profile.
+
+        Args:
+            name: Name of the stage.
+
+        """
+        profile_token = _ACTIVE_PROFILE.set(self)
+        depth = _DEPTH.get() if profile_token.old_value is self else 0
+        depth_token = _DEPTH.set(depth + 1)
+        start = _get_usage()
+        try:
+            yield
+        finally:
+            end = _get_usage()
+            _DEPTH.reset(depth_token)
+            _ACTIVE_PROFILE.reset(profile_token)
+            self._record(name, depth, start, end)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Return the totals of the measurements of each stage name.
+
+        Returns:
+            Dictionary mapping stage names (in order of first occurrence) to
+            dictionaries with the number of times the stage was run
+            (**count**), and the sums of **wall_time**, **cpu_time**,
+            **peak_rss_delta** and **bytes_read** (None if not available).
+
+        """
+        totals: Dict[str, Dict[str, Any]] = {}
+        for stage in self.stages:
+            total = totals.setdefault(
+                stage["name"],
+                {"count": 0, "wall_time": 0.0, "cpu_time": 0.0, "peak_rss_delta": 0, "bytes_read": 0},
+            )
+            total["count"] += 1
+            for key in ["wall_time", "cpu_time", "peak_rss_delta", "bytes_read"]:
+                total[key] = None if total[key] is None or stage[key] is None else total[key] + stage[key]
+        return totals
+
+    def format(self) -> str:
+        """Return the recorded stages as a table, indented by their depths."""
+        stages = self.stages
+        names = ["  " * stage["depth"] + stage["name"] for stage in stages]
+        width = max(map(len, names), default=5)
+        lines = [f"{'stage':<{width}} {'wall (s)':>10} {'cpu (s)':>10} {'peak rss +(MB)':>14} {'read (MB)':>10}"]
+        for name, stage in zip(names, stages):
+            lines.append(
+                f"{name:<{width}} {stage['wall_time']:>10.4f} {stage['cpu_time']:>10.4f} "
+                f"{_format_mb(stage['peak_rss_delta']):>14} {_format_mb(stage['bytes_read']):>10}",
+            )
+        return "\n".join(lines)
+
+    def _record(self, name: str, depth: int, start: Dict[str, Any], end: Dict[str, Any]):
+        def delta(key: str) -> Any:
+            return None if start[key] is None or end[key] is None else end[key] - start[key]
+
+        stage = {
+            "name": name,
+            "depth": depth,
+            "start": start["wall_time"] - self._created,
+            "wall_time": delta("wall_time"),
+            "cpu_time": delta("cpu_time"),
+            "peak_rss_delta": delta("peak_rss"),
+            "bytes_read": delta("bytes_read"),
+        }
+        with self._lock:
+            self._stages.append(stage)
+
+
+def get_active_profile() -> Optional[Profile]:
+    """Return the profile the current stages are attributed to, if any."""
+    return _ACTIVE_PROFILE.get()
+
+
+def stage(name: str):
+    """Record a stage in the active profile, do nothing if there is none.
+
+    Args:
+        name: Name of the stage.
+
+    """
+    profile = _ACTIVE_PROFILE.get()
+    return nullcontext() if profile is None else profile.stage(name)
+
+
+def in_context(func: Callable, stage_name: Optional[str] = None) -> Callable:
+    """Wrap a function to run in a copy of the current context.
+
+    Use it to attribute stages run in other threads to the active profile,
+    e.g., ``executor.submit(in_context(func), *args)``.
+
+    Args:
+        func: Function to wrap.
+        stage_name: If set, then record each call of the function as a stage
+            with this name.
+
+    """
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        if stage_name is None:
+            return func(*args, **kwargs)
+        with stage(stage_name):
+            return func(*args, **kwargs)
+
+    def wrapper(*args, **kwargs):
+        return context.run(run, *args, **kwargs)
+
+    return wrapper
+
+
+def _get_usage() -> Dict[str, Any]:
+    return {
+        "wall_time": time.perf_counter(),
+        "cpu_time": time.process_time(),
+        "peak_rss": _get_peak_rss(),
+        "bytes_read": _get_bytes_read(),
+    }
+
+
+def _get_peak_rss() -> Optional[int]:
+    """Return the peak resident set size of the process in bytes."""
+    if resource is None:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS, kilobytes otherwise
+    return peak_rss if sys.platform == "darwin" else peak_rss * 1024
+
+
+def _get_bytes_read() -> Optional[int]:
+    """Return the number of bytes read by the process so far."""
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                if line.startswith("rchar:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _format_mb(nbytes: Optional[int]) -> str:
+    return "n/a" if nbytes is None else f"{nbytes / 1024**2:.1f}"
+
+
+__all__ = ["Profile", "get_active_profile", "in_context", "stage"]
@@ -0,0 +1,323 @@
+"""Generate synthetic data for offline testing and scaling studies.
+
+The synthetic data directory contains all the files needed to run the
+GenePlexus pipeline (including the CLI with auto download) on the selected
+networks and features, with the same names and formats as the preprocessed
+data files. The network features and the filtered gene set collections are
+built from the synthetic edgelists and original gene set collections using
+:mod:`geneplexus.custom`, the same way as for custom networks.
+
+Example:
+    Generate a data directory with a 5000 node BioGRID network and run the
+    pipeline on it
+
+    >>> from geneplexus import GenePlexus, synthetic
+    >>> synthetic.make_synthetic_data("path/to/data", num_nodes=5000)
+    >>> gp = GenePlexus("path/to/data", "BioGRID", "Embedding", "GO")
+
+    or generate a data directory with networks twice as large as those in an
+    existing data directory from the command line
+
+    .. code-block:: bash
+
+        python -m geneplexus.synthetic path/to/data --scale-from ~/.data/geneplexus --scale 2
+
+"""
+import argparse
+import json
+import os.path as osp
+import zlib
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+
+import numpy as np
+
+from . import custom
+from ._config import logger
+from ._config.config import ALL_FEATURES
+from ._config.config import ALL_GSCS
+from ._config.config import ALL_NETWORKS
+from ._config.config import FEATURE_SELECTION_TYPE
+from ._config.config import FEATURE_TYPE
+from ._config.config import LOG_LEVELS
+from ._config.config import NET_SELECTION_TYPE
+from ._config.config import NET_TYPE
+from ._config.logger_util import set_stream_level
+from .download import make_download_options_lists
+from .util import format_choices
+from .util import normexpand
+
+
+def make_synthetic_data(
+    file_loc: str,
+    num_nodes: int = 2000,
+    networks: NET_SELECTION_TYPE = "BioGRID",
+    features: FEATURE_SELECTION_TYPE = "All",
+    embedding_dim: int = 128,
+    num_terms: int = 500,
+    avg_degree: float = 20,
+    alpha: float = 0.85,
+    random_state: int = 0,
+):
+    """Write a complete synthetic data directory.
+
+    The genes are random Entrez-like IDs. Each network has ``num_nodes`` genes
+    drawn from a pool of ``2 * num_nodes`` genes, and edges drawn with a long
+    tailed degree distribution. The GO and DisGeNet gene set collections each
+    have ``num_terms`` terms of 5 to 400 genes (before filtering) drawn from
+    the same pool, and the pretrained model weights are random. The ID
+    conversion maps each gene to the symbol ``SYM{gene}`` and to ENSG, ENSP,
+    and ENST IDs derived from the Entrez ID.
+
+    Note:
+        The Adjacency and Influence features are dense ``num_nodes`` by
+        ``num_nodes`` matrices.
+
+    Args:
+        file_loc: Directory to write the data files to.
+        num_nodes: Number of genes in each network.
+        networks: Networks to generate, accept multiple selection as a list.
+            Generate all networks if set to "All". The NodeOrder files of the
+            other networks are generated as well, as they are used for the ID
+            conversion.
+        features: Network features to generate, accept multiple selection as
+            a list. Generate all features if set to "All".
+        embedding_dim: Dimension of the Embedding features.
+        num_terms: Number of terms in each gene set collection before
+            filtering.
+        avg_degree: Average node degree of the networks, i.e., the edge
+            density of the networks is ``avg_degree / (num_nodes - 1)``.
+        alpha: Restart parameter of the Influence features.
+        random_state: Random seed.
+
+    """
+    _, networks, features, _ = make_download_options_lists("All", networks, features, "All")
+    file_loc = normexpand(file_loc)
+
+    # Genes in any of the networks and the GSCs, not all in a given network
+    rng = _get_rng(random_state, "genes")
+    all_genes = np.sort(rng.choice(50 * num_nodes, 2 * num_nodes, replace=False) + 1).astype(str)
+    logger.info(f"Generating synthetic ID conversion for {all_genes.size:,} genes")
+    _make_id_conversion(file_loc, all_genes)
+    for gsc in ALL_GSCS:
+        _make_original_gsc(file_loc, gsc, all_genes, num_terms, _get_rng(random_state, gsc))
+
+    for net_type in ALL_NETWORKS:
+        genes = np.sort(_get_rng(random_state, net_type).choice(all_genes, num_nodes, replace=False))
+        np.savetxt(osp.join(file_loc, f"NodeOrder_{net_type}.txt"), genes, fmt="%s")
+        if net_type not in networks:
+            continue
+
+        logger.info(f"Generating synthetic {net_type} network with {num_nodes:,} nodes")
+        rng = _get_rng(random_state, net_type, "edges")
+        edgelist_loc = _make_edgelist(file_loc, net_type, genes, avg_degree, rng)
+        for feature in features:
+            custom.edgelist_to_matrix(
+                edgelist_loc,
+                file_loc,
+                net_type,
+                feature,
+                alpha=alpha,
+                embedding_dim=embedding_dim,
+            )
+        custom.subset_gsc_to_network(file_loc, net_type, ALL_GSCS, min_size=5)
+        for feature in features:
+            dim = embedding_dim if feature == "Embedding" else num_nodes
+            _make_pretrained(file_loc, net_type, feature, dim, _get_rng(random_state, net_type, feature))
+    logger.info(f"Synthetic data saved to {file_loc}")
+
+
+def get_data_sizes(file_loc: str, net_type: NET_TYPE) -> Dict[str, Any]:
+    """Get the sizes of the data files of a network to mimic.
+
+    Args:
+        file_loc: Location of the data files.
+        net_type: Network to get the sizes of.
+
+    Returns:
+        The ``num_nodes``, and if the corresponding files exist, the
+        ``embedding_dim``, ``num_terms`` (of the original GO gene set
+        collection), and ``avg_degree`` arguments of
+        :func:`make_synthetic_data`.
+
+    """
+    sizes: Dict[str, Any] = {}
+    with open(osp.join(file_loc, f"NodeOrder_{net_type}.txt")) as f:
+        sizes["num_nodes"] = sum(1 for line in f if line.strip())
+
+    embedding_path = osp.join(file_loc, f"Data_Embedding_{net_type}.npy")
+    if osp.isfile(embedding_path):
+        sizes["embedding_dim"] = np.load(embedding_path, mmap_mode="r").shape[1]
+
+    gsc_path = osp.join(file_loc, "GSCOriginal_GO.json")
+    if osp.isfile(gsc_path):
+        with open(gsc_path) as f:
+            sizes["num_terms"] = len(json.load(f))
+
+    edgelist_path = osp.join(file_loc, f"Edgelist_{net_type}.edg")
+    if osp.isfile(edgelist_path):
+        with open(edgelist_path) as f:
+            num_edges = sum(1 for line in f if line.strip())
+        sizes["avg_degree"] = 2 * num_edges / sizes["num_nodes"]
+
+    return sizes
+
+
+def _get_rng(random_state: int, *names: str) -> np.random.Generator:
+    """Get a random generator for the named data.
+
+    Each data file has its own random stream, so that it does not depend on
+    the selection of the other data files to generate.
+
+    """
+    return np.random.default_rng([random_state, *(zlib.crc32(name.encode()) for name in names)])
+
+
+def _make_id_conversion(file_loc: str, genes: np.ndarray):
+    """Write the ID conversion files of the genes."""
+    ensembl_ids = {src: [f"{src}{int(gene):011d}" for gene in genes] for src in ["ENSG", "ENSP", "ENST"]}
+    id_conversion = {
+        "Entrez-to-Symbol": {gene: [f"SYM{gene}"] for gene in genes},
+        "Symbol-to-Entrez": {f"SYM{gene}": [gene] for gene in genes},
+        "Entrez-to-Name": {gene: [f"synthetic gene {gene}"] for gene in genes},
+        "Entrez-to-ENSG": {gene: [ensg] for gene, ensg in zip(genes, ensembl_ids["ENSG"])},
+    }
+    for src, ids in ensembl_ids.items():
+        id_conversion[f"{src}-to-Entrez"] = {ensembl_id: [gene] for gene, ensembl_id in zip(genes, ids)}
+
+    for name, mapping in id_conversion.items():
+        with open(osp.join(file_loc, f"IDconversion_Homo-sapiens_{name}.json"), "w") as f:
+            json.dump(mapping, f)
+
+
+def _make_original_gsc(
+    file_loc: str,
+    gsc: str,
+    genes: np.ndarray,
+    num_terms: int,
+    rng: np.random.Generator,
+):
+    """Write the original GSC, with log-uniformly distributed term sizes."""
+    sizes = np.exp(rng.uniform(np.log(5), np.log(400), num_terms)).astype(int).clip(max=genes.size)
+    gsc_orig = {
+        f"{gsc}:{i:07d}": {
+            "Name": f"synthetic {gsc} term {i}",
+            "Genes": rng.choice(genes, size, replace=False).tolist(),
+        }
+        for i, size in enumerate(sizes)
+    }
+    with open(osp.join(file_loc, f"GSCOriginal_{gsc}.json"), "w") as f:
+        json.dump(gsc_orig, f)
+
+
+def _make_edgelist(
+    file_loc: str,
+    net_type: NET_TYPE,
+    genes: np.ndarray,
+    avg_degree: float,
+    rng: np.random.Generator,
+) -> str:
+    """Write the edgelist of a network, weighted except for BioGRID."""
+    # Endpoints drawn with Pareto distributed propensities give a long tailed
+    # degree distribution; self loops and duplicated edges are removed
+    propensities = rng.pareto(2, genes.size) + 1
+    edges = rng.choice(genes.size, size=(int(genes.size * avg_degree / 2), 2), p=propensities / propensities.sum())
+    edges = np.unique(np.sort(edges[edges[:, 0] != edges[:, 1]], axis=1), axis=0)
+
+    edgelist = np.column_stack((genes[edges[:, 0]], genes[edges[:, 1]]))
+    if net_type != "BioGRID":
+        edgelist = np.column_stack((edgelist, np.char.mod("%.3f", rng.uniform(0.01, 1, len(edges)))))
+    edgelist_loc = osp.join(file_loc, f"Edgelist_{net_type}.edg")
+    np.savetxt(edgelist_loc, edgelist, fmt="%s", delimiter="\t")
+    return edgelist_loc
+
+
+def _make_pretrained(
+    file_loc: str,
+    net_type: NET_TYPE,
+    features: FEATURE_TYPE,
+    dim: int,
+    rng: np.random.Generator,
+):
+    """Write the pretrained weights and the correction matrices.
+
+    The pretrained models are those of the terms in the filtered GSCs, and the
+    correction matrices are the cosine similarities between them.
+
+    """
+    weights = {}
+    for gsc in ALL_GSCS:
+        with open(osp.join(file_loc, f"GSC_{gsc}_{net_type}_GoodSets.json")) as f:
+            goodsets = json.load(f)
+        weights[gsc] = rng.normal(size=(len(goodsets), dim))
+        weights[gsc] /= np.linalg.norm(weights[gsc], axis=1, keepdims=True)
+        pretrained = {
+            term: {
+                "Name": goodsets[term]["Name"],
+                "Weights": term_weights.tolist(),
+                "PosGenes": goodsets[term]["Genes"],
+            }
+            for term, term_weights in zip(goodsets, weights[gsc])
+        }
+        with open(osp.join(file_loc, f"PreTrainedWeights_{gsc}_{net_type}_{features}.json"), "w") as f:
+            json.dump(pretrained, f)
+        np.savetxt(osp.join(file_loc, f"CorrectionMatrixOrder_{gsc}_{net_type}.txt"), list(goodsets), fmt="%s")
+
+    for gsc in ALL_GSCS:
+        for target_set in ALL_GSCS:
+            path = osp.join(file_loc, f"CorrectionMatrix_{gsc}_{target_set}_{net_type}_{features}.npy")
+            np.save(path, weights[gsc] @ weights[target_set].T)
+
+
+def parse_args(args: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse arguments from command line."""
+    parser = argparse.ArgumentParser(
+        description="Generate a synthetic GenePlexus data directory.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("file_loc", help="Directory to write the data files to.")
+    parser.add_argument("-n", "--network", nargs="+", default=["BioGRID"], help=format_choices(ALL_NETWORKS))
+    parser.add_argument("-f", "--feature", nargs="+", default=["All"], help=format_choices(ALL_FEATURES))
+    parser.add_argument("--num-nodes", type=int, default=2000, help="Number of genes in each network.")
+    parser.add_argument("--embedding-dim", type=int, default=128, help="Dimension of the Embedding features.")
+    parser.add_argument("--num-terms", type=int, default=500, help="Number of terms in each GSC.")
+    parser.add_argument("--avg-degree", type=float, default=20, help="Average node degree of the networks.")
+    parser.add_argument("--random-state", type=int, default=0, help="Random seed.")
+    parser.add_argument(
+        "--scale-from",
+        default=None,
+        help="Data directory to take the sizes of the first network from (see get_data_sizes), overriding the "
+        "size options above.",
+    )
+    parser.add_argument("--scale", type=float, default=1, help="Factor to scale the number of nodes by.")
+    parser.add_argument("-l", "--log_level", default="INFO", help=format_choices(LOG_LEVELS))
+    return parser.parse_args(args)
+
+
+def main(args: Optional[List[str]] = None):
+    """Command line interface for generating synthetic data."""
+    opts = parse_args(args)
+    set_stream_level(logger, opts.log_level)
+    sizes = {
+        "num_nodes": opts.num_nodes,
+        "embedding_dim": opts.embedding_dim,
+        "num_terms": opts.num_terms,
+        "avg_degree": opts.avg_degree,
+    }
+    if opts.scale_from is not None:
+        sizes.update(get_data_sizes(normexpand(opts.scale_from, create=False), opts.network[0]))
+    sizes["num_nodes"] = int(sizes["num_nodes"] * opts.scale)
+    logger.info(f"Synthetic data sizes: {sizes}")
+    make_synthetic_data(
+        opts.file_loc,
+        networks=opts.network if opts.network != ["All"] else "All",
+        features=opts.feature if opts.feature != ["All"] else "All",
+        random_state=opts.random_state,
+        **sizes,
+    )
+
+
+if __name__ == "__main__":
+    main()
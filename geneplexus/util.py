@@ -5,15 +5,29 @@ import os
 import os.path as osp
 from threading import Thread
 from typing import Any
+from typing import Callable
+from typing import cast
 from typing import Dict
 from typing import Generator
+from typing import Iterator
 from typing import List
 from typing import Literal
+from typing import Mapping
 from typing import Optional
+from typing import Union
 
 import numpy as np
 
 from . import config
+from ._config import logger
+from .cache import DATA_CACHE
+from .index import EdgeStore
+from .index import FeatureStats
+from .index import GSCIncidence
+from .index import IDConversionIndex
+from .index import NetworkIndex
+from .index import PretrainedModels
+from .index import ReducedPrecisionMatrix
 
 
 def get_all_gscs(file_loc: Optional[str]) -> List[str]:
@@ -170,6 +184,37 @@ def read_gene_list(
     return [gene.strip("'") for gene in open(path).read().split(sep)]
 
 
+def read_gmt(path: str) -> Dict[str, List[str]]:
+    """Read gene sets from a GMT file.
+
+    Each line of a GMT file is a tab separated gene set with the gene set name
+    in the first column, a description in the second column, and the genes in
+    the remaining columns.
+
+    Args:
+        path: Path to the GMT file.
+
+    Returns:
+        Dictionary mapping gene set names to gene lists, in the order of the
+        file.
+
+    Raises:
+        ValueError: If a gene set name appears more than once.
+
+    """
+    gene_sets: Dict[str, List[str]] = {}
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            fields = line.rstrip("\r\n").split("\t")
+            name = fields[0].strip()
+            if name in gene_sets:
+                raise ValueError(f"Duplicated gene set {name!r} in {path}")
+            gene_sets[name] = [gene.strip() for gene in fields[2:] if gene.strip()]
+    return gene_sets
+
+
 def _load_json_file(file_loc: str, file_name: str) -> Dict[str, Any]:
     """Load JSON into dictionary.
 
@@ -177,10 +222,19 @@ def _load_json_file(file_loc: str, file_name: str) -> Dict[str, Any]:
         file_loc: Location of data files.
         file_name: Name of the file.
 
+    Note:
+        The loaded dictionary is cached and shared (see
+        :data:`geneplexus.cache.DATA_CACHE`), do not modify it in place.
+
     """
     file_path = osp.join(file_loc, file_name)
     check_file(file_path)
-    return json.load(open(file_path, "rb"))
+
+    def load():
+        with open(file_path, "rb") as f:
+            return json.load(f)
+
+    return DATA_CACHE.get(file_path, load, "json")
 
 
 def load_geneid_conversion(
@@ -205,11 +259,100 @@ def load_geneid_conversion(
     conversion_map = _load_json_file(file_loc, file_name)
 
     if upper:
-        conversion_map = {src.upper(): dst for src, dst in conversion_map.items()}
+        conversion_map = DATA_CACHE.get(
+            osp.join(file_loc, file_name),
+            lambda: {src.upper(): dst for src, dst in conversion_map.items()},
+            "json",
+            "upper",
+        )
 
     return conversion_map
 
 
+def _save_prebuilt(obj: Any, path: str, description: str):
+    """Save a prebuilt data structure next to its source files if possible."""
+    try:
+        obj.save(path)
+        logger.info(f"{description} saved to {path}")
+    except OSError as e:
+        logger.warning(f"Unable to save {description}, only keeping it in memory ({e})")
+
+
+def _load_prebuilt(
+    path: str,
+    src_paths: List[str],
+    build: Callable[[], Any],
+    load: Callable[[str], Any],
+) -> Any:
+    """Load a prebuilt data structure, build it if missing, outdated, or unreadable.
+
+    Args:
+        path: Path to the prebuilt file.
+        src_paths: Paths to the source files the prebuilt file is built from.
+        build: Function that builds (and saves) the data structure.
+        load: Function that loads the data structure from the prebuilt file.
+
+    """
+    for src_path in src_paths:
+        check_file(src_path)
+
+    src_mtimes = [os.stat(src_path).st_mtime_ns for src_path in src_paths]
+
+    def load_or_build():
+        if osp.exists(path) and os.stat(path).st_mtime_ns >= max(src_mtimes):
+            try:
+                return load(path)
+            except Exception as e:
+                logger.warning(f"Unable to load {path}, rebuilding it ({e})")
+        return build()
+
+    # Cache by the source files, so the cached object stays valid after the
+    # prebuilt file is (re)built
+    return DATA_CACHE.get(src_paths[0], load_or_build, "prebuilt", *src_mtimes[1:])
+
+
+def build_id_conversion_index(file_loc: str) -> IDConversionIndex:
+    """Build the gene ID conversion index from the ID conversion files.
+
+    The index combines the conversions from all gene ID types to Entrez
+    (ENSG, Symbol, ENSP, and ENST, in order of priority) and is saved to
+    ``IDconversion_Homo-sapiens_index.npz`` under the data directory if
+    possible.
+
+    Args:
+        file_loc: Directory containig the ID conversion files.
+
+    """
+    conversion_maps: Dict[str, config.ID_CONVERSION_MAP_TYPE] = {
+        src_id_type: load_geneid_conversion(file_loc, src_id_type, "Entrez")
+        for src_id_type in config.ID_CONVERSION_SRC_TYPES
+    }
+    id_index = IDConversionIndex.from_conversion_maps(conversion_maps)
+    _save_prebuilt(id_index, osp.join(file_loc, config.ID_CONVERSION_INDEX_FILENAME), "Gene ID conversion index")
+    return id_index
+
+
+def load_id_conversion_index(file_loc: str) -> IDConversionIndex:
+    """Load the gene ID conversion index.
+
+    The index is built using :func:`build_id_conversion_index` if it does not
+    exist or is older than any of the ID conversion files.
+
+    Args:
+        file_loc: Directory containig the ID conversion files.
+
+    """
+    return _load_prebuilt(
+        osp.join(file_loc, config.ID_CONVERSION_INDEX_FILENAME),
+        [
+            osp.join(file_loc, f"IDconversion_Homo-sapiens_{src_id_type}-to-Entrez.json")
+            for src_id_type in config.ID_CONVERSION_SRC_TYPES
+        ],
+        lambda: build_id_conversion_index(file_loc),
+        IDConversionIndex.load,
+    )
+
+
 def load_gsc(
     file_loc: str,
     gsc: config.GSC_TYPE,
@@ -227,6 +370,57 @@ def load_gsc(
     return _load_json_file(file_loc, file_name)
 
 
+def build_gsc_incidence(
+    file_loc: str,
+    gsc: config.GSC_TYPE,
+    net_type: config.NET_TYPE,
+) -> GSCIncidence:
+    """Build the sparse term by gene incidence matrix of a gene set collection.
+
+    The incidence matrix is built from the network specific GSC and universe
+    files, and is saved to ``GSC_{gsc}_{net_type}_GoodSets.npz`` under the
+    data directory if possible.
+
+    Args:
+        file_loc: Location of data files.
+        gsc: Gene set collection.
+        net_type: Network used.
+
+    """
+    gsc_incidence = GSCIncidence.from_gsc(
+        load_gsc(file_loc, gsc, net_type), load_genes_universe(file_loc, gsc, net_type)
+    )
+    _save_prebuilt(gsc_incidence, osp.join(file_loc, f"GSC_{gsc}_{net_type}_GoodSets.npz"), "GSC incidence matrix")
+    return gsc_incidence
+
+
+def load_gsc_incidence(
+    file_loc: str,
+    gsc: config.GSC_TYPE,
+    net_type: config.NET_TYPE,
+) -> GSCIncidence:
+    """Load the sparse term by gene incidence matrix of a gene set collection.
+
+    The incidence matrix is built using :func:`build_gsc_incidence` if it does
+    not exist or is older than the GSC or the universe file.
+
+    Args:
+        file_loc: Location of data files.
+        gsc: Gene set collection.
+        net_type: Network used.
+
+    """
+    return _load_prebuilt(
+        osp.join(file_loc, f"GSC_{gsc}_{net_type}_GoodSets.npz"),
+        [
+            osp.join(file_loc, f"GSC_{gsc}_{net_type}_GoodSets.json"),
+            osp.join(file_loc, f"GSC_{gsc}_{net_type}_universe.txt"),
+        ],
+        lambda: build_gsc_incidence(file_loc, gsc, net_type),
+        GSCIncidence.load,
+    )
+
+
 def load_pretrained_weights(
     file_loc: str,
     target_set: config.GSC_TYPE,
@@ -246,10 +440,174 @@ def load_pretrained_weights(
     return _load_json_file(file_loc, file_name)
 
 
+class LazyPretrainedWeights(Mapping[str, Any]):
+    """Pretrained model dictionary that is loaded on first access.
+
+    Behaves like the dictionary returned by :func:`load_pretrained_weights`,
+    but the (large) JSON file is only parsed once the weights are used, e.g.,
+    when converted to a dictionary via ``dict(weights)``.
+
+    """
+
+    def __init__(
+        self,
+        file_loc: str,
+        target_set: config.GSC_TYPE,
+        net_type: config.NET_TYPE,
+        features: config.FEATURE_TYPE,
+    ):
+        """Initialize the LazyPretrainedWeights object.
+
+        Args:
+            file_loc: Location of data files.
+            target_set: Target gene set collection.
+            net_type: Network used.
+            features: Type of features used.
+
+        """
+        self.file_loc = file_loc
+        self.target_set = target_set
+        self.net_type = net_type
+        self.features = features
+
+    def _load(self) -> config.PRETRAINED_DATA_TYPE:
+        return load_pretrained_weights(self.file_loc, self.target_set, self.net_type, self.features)
+
+    def __getitem__(self, term: str) -> Any:
+        """Return the pretrained model of a term."""
+        return self._load()[term]
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over the terms."""
+        return iter(self._load())
+
+    def __len__(self) -> int:
+        """Return the number of pretrained models."""
+        return len(self._load())
+
+    def __repr__(self) -> str:
+        """Return the string representation (without loading the weights)."""
+        return f"{self.__class__.__name__}({self.target_set!r}, {self.net_type!r}, {self.features!r})"
+
+
+def build_pretrained_models(
+    file_loc: str,
+    target_set: config.GSC_TYPE,
+    net_type: config.NET_TYPE,
+    features: config.FEATURE_TYPE,
+) -> PretrainedModels:
+    """Build the stacked (row-normalized) pretrained model weights.
+
+    The stacked weights are saved to
+    ``PreTrainedWeights_{target_set}_{net_type}_{features}.npz`` under the
+    data directory if possible.
+
+    Args:
+        file_loc: Location of data files.
+        target_set: Target gene set collection.
+        net_type: Network used.
+        features: Type of features used.
+
+    """
+    pretrained_models = PretrainedModels.from_pretrained_weights(
+        load_pretrained_weights(file_loc, target_set, net_type, features),
+    )
+    path = osp.join(file_loc, f"PreTrainedWeights_{target_set}_{net_type}_{features}.npz")
+    _save_prebuilt(pretrained_models, path, "Stacked pretrained weights")
+    return pretrained_models
+
+
+def load_pretrained_models(
+    file_loc: str,
+    target_set: config.GSC_TYPE,
+    net_type: config.NET_TYPE,
+    features: config.FEATURE_TYPE,
+    precision: config.PRECISION_TYPE = "float64",
+) -> PretrainedModels:
+    """Load the stacked (row-normalized) pretrained model weights.
+
+    The stacked weights are built using :func:`build_pretrained_models` if
+    they do not exist or are older than the pretrained weights file.
+
+    Args:
+        file_loc: Location of data files.
+        target_set: Target gene set collection.
+        net_type: Network used.
+        features: Type of features used.
+        precision: Precision of the weights. Reduced precision weights are
+            loaded from ``PreTrainedWeights_{target_set}_{net_type}_{features}.{precision}.npz``
+            (see :func:`geneplexus.precision.convert_data_precision`).
+
+    """
+    file_name = f"PreTrainedWeights_{target_set}_{net_type}_{features}"
+    check_param("precision", precision, config.PRECISIONS)
+    if precision != "float64":
+        file_path = osp.join(file_loc, f"{file_name}.{precision}.npz")
+        _check_reduced_file(file_path, precision)
+        return DATA_CACHE.get(file_path, lambda: PretrainedModels.load(file_path), "reduced")
+
+    return _load_prebuilt(
+        osp.join(file_loc, f"{file_name}.npz"),
+        [osp.join(file_loc, f"{file_name}.json")],
+        lambda: build_pretrained_models(file_loc, target_set, net_type, features),
+        PretrainedModels.load,
+    )
+
+
+def _check_reduced_file(path: str, precision: config.PRECISION_TYPE):
+    """Check existence of a reduced precision data file (or directory).
+
+    Raises:
+        FileNotFoundError: if the data has not been converted to the precision.
+
+    """
+    if not osp.exists(path):
+        raise FileNotFoundError(
+            f"{path} (convert the data to {precision} first, see geneplexus.precision.convert_data_precision)",
+        )
+
+
+def _load_reduced_matrix(
+    file_loc: str,
+    file_name: str,
+    precision: config.PRECISION_TYPE,
+    mmap_mode: config.MMAP_MODE_TYPE = None,
+) -> ReducedPrecisionMatrix:
+    """Check reduced precision matrix existence and load.
+
+    Args:
+        file_loc: Location of data files.
+        file_name: Name of the original (float64) npy file.
+        precision: Reduced precision of the matrix.
+        mmap_mode: Memory-map mode for loading the matrix values (see
+            :func:`numpy.load`), load into memory if not set.
+
+    """
+    path = osp.join(file_loc, f"{osp.splitext(file_name)[0]}.{precision}")
+    _check_reduced_file(path, precision)
+    check_param("mmap mode", mmap_mode, config.MMAP_MODES)
+    return DATA_CACHE.get(path, lambda: ReducedPrecisionMatrix.load(path, mmap_mode=mmap_mode), "reduced", mmap_mode)
+
+
+def _load_dequantized_matrix(file_loc: str, file_name: str, precision: config.PRECISION_TYPE) -> np.ndarray:
+    """Check reduced precision matrix existence and load as a float32 array.
+
+    Args:
+        file_loc: Location of data files.
+        file_name: Name of the original (float64) npy file.
+        precision: Reduced precision of the matrix.
+
+    """
+    path = osp.join(file_loc, f"{osp.splitext(file_name)[0]}.{precision}")
+    _check_reduced_file(path, precision)
+    return DATA_CACHE.get(path, lambda: ReducedPrecisionMatrix.load(path, mmap_mode=None)[:], "dequantized")
+
+
 def _load_np_file(
     file_loc: str,
     file_name: str,
     load_method: Literal["npy", "txt"],
+    mmap_mode: config.MMAP_MODE_TYPE = None,
 ) -> np.ndarray:
     """Check np file existence and load.
 
@@ -257,15 +615,27 @@ def _load_np_file(
         file_loc: Location of data files.
         file_name: Name of the file.
         load_method: How to load the file ('npy' or 'txt').
+        mmap_mode: Memory-map mode for loading 'npy' files (see
+            :func:`numpy.load`), load into memory if not set.
+
+    Note:
+        The loaded array is cached and shared (see
+        :data:`geneplexus.cache.DATA_CACHE`), and is thus set to read-only.
+        Copy-on-write memory-maps (``mmap_mode="c"``) are the exception: they
+        are mapped anew on each call, so they can be modified without
+        affecting the file or other callers.
 
     """
     file_path = osp.join(file_loc, file_name)
     check_file(file_path)
 
     if load_method == "npy":
-        return np.load(file_path)
+        check_param("mmap mode", mmap_mode, config.MMAP_MODES)
+        if mmap_mode == "c":
+            return np.load(file_path, mmap_mode=mmap_mode)
+        return DATA_CACHE.get(file_path, lambda: np.load(file_path, mmap_mode=mmap_mode), load_method, mmap_mode)
     elif load_method == "txt":
-        return np.loadtxt(file_path, dtype=str)
+        return DATA_CACHE.get(file_path, lambda: np.loadtxt(file_path, dtype=str), load_method)
     else:
         raise ValueError(f"Unknwon load method: {load_method!r}")
 
@@ -282,6 +652,47 @@ def load_node_order(file_loc: str, net_type: config.NET_TYPE) -> np.ndarray:
     return _load_np_file(file_loc, file_name, load_method="txt")
 
 
+def load_network_index(file_loc: str, net_type: config.NET_TYPE) -> NetworkIndex:
+    """Load the gene to row index of a network.
+
+    Args:
+        file_loc: Location of data files.
+        net_type: Network used.
+
+    """
+    file_name = f"NodeOrder_{net_type}.txt"
+    node_order = load_node_order(file_loc, net_type)
+    return DATA_CACHE.get(osp.join(file_loc, file_name), lambda: NetworkIndex(node_order), "index")
+
+
+def load_network_gene_names(
+    file_loc: str,
+    net_type: config.NET_TYPE,
+    dst_id_type: Literal["Symbol", "Name"],
+) -> np.ndarray:
+    """Load the Symbol or Name of each network gene.
+
+    The returned array is aligned with the network node ordering (NodeOrder),
+    see :func:`mapgene` for how the Entrez IDs are mapped.
+
+    Args:
+        file_loc: Location of data files.
+        net_type: Network used.
+        dst_id_type: Representation of the genes to load.
+
+    """
+    node_order_path = osp.join(file_loc, f"NodeOrder_{net_type}.txt")
+    node_order = load_node_order(file_loc, net_type)
+    conversion_map = load_geneid_conversion(file_loc, "Entrez", dst_id_type)
+    return DATA_CACHE.get(
+        osp.join(file_loc, f"IDconversion_Homo-sapiens_Entrez-to-{dst_id_type}.json"),
+        lambda: np.array([mapgene(gene, conversion_map) for gene in node_order], dtype=str),
+        "network",
+        node_order_path,
+        os.stat(node_order_path).st_mtime_ns,
+    )
+
+
 def load_genes_universe(
     file_loc: str,
     gsc: config.GSC_TYPE,
@@ -303,17 +714,170 @@ def load_gene_features(
     file_loc: str,
     features: config.FEATURE_TYPE,
     net_type: config.NET_TYPE,
-) -> np.ndarray:
+    mmap_mode: config.MMAP_MODE_TYPE = None,
+    precision: config.PRECISION_TYPE = "float64",
+) -> Union[np.ndarray, ReducedPrecisionMatrix]:
     """Load gene features.
 
     Args:
         file_loc: Location of data files.
         net_type: Network used.
         features: Type of features used.
+        mmap_mode: If set, memory-map the feature file instead of reading it
+            into memory (see :func:`numpy.load`).
+        precision: Precision of the features. Reduced precision features are
+            loaded from the ``Data_{features}_{net_type}.{precision}``
+            directory as a :class:`~geneplexus.index.ReducedPrecisionMatrix`
+            (see :func:`geneplexus.precision.convert_data_precision`).
 
     """
     file_name = f"Data_{features}_{net_type}.npy"
-    return _load_np_file(file_loc, file_name, load_method="npy")
+    check_param("precision", precision, config.PRECISIONS)
+    if precision != "float64":
+        return _load_reduced_matrix(file_loc, file_name, precision, mmap_mode=mmap_mode)
+    return _load_np_file(file_loc, file_name, load_method="npy", mmap_mode=mmap_mode)
+
+
+def get_gene_features_path(
+    file_loc: str,
+    features: config.FEATURE_TYPE,
+    net_type: config.NET_TYPE,
+    precision: config.PRECISION_TYPE = "float64",
+) -> str:
+    """Return the path to the (values) file of the gene features of a precision.
+
+    Args:
+        file_loc: Location of data files.
+        features: Type of features used.
+        net_type: Network used.
+        precision: Precision of the features.
+
+    """
+    if precision == "float64":
+        return osp.join(file_loc, f"Data_{features}_{net_type}.npy")
+    return osp.join(file_loc, f"Data_{features}_{net_type}.{precision}", "values.npy")
+
+
+def _get_feature_stats_path(
+    file_loc: str,
+    features: config.FEATURE_TYPE,
+    net_type: config.NET_TYPE,
+    precision: config.PRECISION_TYPE,
+) -> str:
+    """Return the path to the feature statistics of the gene features of a precision."""
+    if precision == "float64":
+        return osp.join(file_loc, f"DataStats_{features}_{net_type}.npz")
+    return osp.join(file_loc, f"DataStats_{features}_{net_type}.{precision}.npz")
+
+
+def build_feature_stats(
+    file_loc: str,
+    features: config.FEATURE_TYPE,
+    net_type: config.NET_TYPE,
+    precision: config.PRECISION_TYPE = "float64",
+) -> FeatureStats:
+    """Compute the standardization statistics of the gene features.
+
+    The feature file is memory-mapped and processed in row blocks. The
+    statistics are saved to ``DataStats_{features}_{net_type}.npz`` (or
+    ``DataStats_{features}_{net_type}.{precision}.npz`` for reduced precision
+    features) under the data directory if possible.
+
+    Args:
+        file_loc: Location of data files.
+        features: Type of features used.
+        net_type: Network used.
+        precision: Precision of the features.
+
+    """
+    if precision == "float64":
+        data = np.load(get_gene_features_path(file_loc, features, net_type), mmap_mode="r")
+    else:
+        data = ReducedPrecisionMatrix.load(osp.join(file_loc, f"Data_{features}_{net_type}.{precision}"))
+    feature_stats = FeatureStats.from_data(data)
+    path = _get_feature_stats_path(file_loc, features, net_type, precision)
+    _save_prebuilt(feature_stats, path, "Feature statistics")
+    return feature_stats
+
+
+def load_feature_stats(
+    file_loc: str,
+    features: config.FEATURE_TYPE,
+    net_type: config.NET_TYPE,
+    precision: config.PRECISION_TYPE = "float64",
+) -> FeatureStats:
+    """Load the standardization statistics of the gene features.
+
+    The statistics are computed using :func:`build_feature_stats` if they do
+    not exist or are older than the feature file.
+
+    Args:
+        file_loc: Location of data files.
+        features: Type of features used.
+        net_type: Network used.
+        precision: Precision of the features.
+
+    """
+    check_param("precision", precision, config.PRECISIONS)
+    data_path = get_gene_features_path(file_loc, features, net_type, precision)
+    if precision != "float64":
+        _check_reduced_file(data_path, precision)
+    return _load_prebuilt(
+        _get_feature_stats_path(file_loc, features, net_type, precision),
+        [data_path],
+        lambda: build_feature_stats(file_loc, features, net_type, precision),
+        FeatureStats.load,
+    )
+
+
+def build_edge_store(file_loc: str, net_type: config.NET_TYPE) -> EdgeStore:
+    """Build the indexed edge store from the network edge list.
+
+    The edge store is saved to the ``EdgelistIndex_{net_type}`` directory
+    under the data directory if possible. The edges of BioGRID (unweighted)
+    are assigned unit weights.
+
+    Args:
+        file_loc: Location of data files.
+        net_type: Network used.
+
+    """
+    import pandas as pd
+
+    file_path = osp.join(file_loc, f"Edgelist_{net_type}.edg")
+    if net_type == "BioGRID":
+        df_edge = pd.read_csv(file_path, sep="\t", header=None, names=["Node1", "Node2"])
+        df_edge["Weight"] = 1
+    else:
+        df_edge = pd.read_csv(file_path, sep="\t", header=None, names=["Node1", "Node2", "Weight"])
+    df_edge = df_edge.astype({"Node1": str, "Node2": str})
+
+    edge_store = EdgeStore.from_edgelist(
+        df_edge["Node1"].to_numpy(dtype=str),
+        df_edge["Node2"].to_numpy(dtype=str),
+        df_edge["Weight"].to_numpy(),
+    )
+    _save_prebuilt(edge_store, osp.join(file_loc, f"EdgelistIndex_{net_type}"), "Edge store")
+    return edge_store
+
+
+def load_edge_store(file_loc: str, net_type: config.NET_TYPE) -> EdgeStore:
+    """Load the indexed (memory-mapped) edge store of a network.
+
+    The edge store is built using :func:`build_edge_store` if it does not
+    exist or is older than the edge list file.
+
+    Args:
+        file_loc: Location of data files.
+        net_type: Network used.
+
+    """
+    return _load_prebuilt(
+        osp.join(file_loc, f"EdgelistIndex_{net_type}"),
+        [osp.join(file_loc, f"Edgelist_{net_type}.edg")],
+        lambda: build_edge_store(file_loc, net_type),
+        EdgeStore.load,
+    )
 
 
 def load_correction_order(
@@ -339,6 +903,7 @@ def load_correction_mat(
     target_set: config.GSC_TYPE,
     net_type: config.NET_TYPE,
     features: config.FEATURE_TYPE,
+    precision: config.PRECISION_TYPE = "float64",
 ) -> np.ndarray:
     """Load correction matrix.
 
@@ -348,7 +913,78 @@ def load_correction_mat(
         target_set: Target gene set collection.
         net_type: Network used.
         features: Type of features used.
+        precision: Precision of the correction matrix. Reduced precision
+            matrices are loaded from the
+            ``CorrectionMatrix_{gsc}_{target_set}_{net_type}_{features}.{precision}``
+            directory and dequantized to float32 (see
+            :func:`geneplexus.precision.convert_data_precision`).
 
     """
     file_name = f"CorrectionMatrix_{gsc}_{target_set}_{net_type}_{features}.npy"
+    check_param("precision", precision, config.PRECISIONS)
+    if precision != "float64":
+        return _load_dequantized_matrix(file_loc, file_name, precision)
     return _load_np_file(file_loc, file_name, load_method="npy")
+
+
+def preload_data(
+    file_loc: str,
+    net_types: List[config.NET_TYPE],
+    features: List[config.FEATURE_TYPE],
+    gscs: List[config.GSC_TYPE],
+    mmap_mode: config.MMAP_MODE_TYPE = None,
+    precision: config.PRECISION_TYPE = "float64",
+):
+    """Load all data used by the GenePlexus pipeline into the data cache.
+
+    Subsequent GenePlexus runs with any combination of the preloaded networks,
+    features, and GSCs only do the work specific to the input gene set. All
+    preloaded data must fit within the budget of
+    :data:`geneplexus.cache.DATA_CACHE` to stay resident.
+
+    Args:
+        file_loc: Location of data files.
+        net_types: Networks to preload.
+        features: Types of features to preload.
+        gscs: Gene set collections to preload (for negative selection).
+        mmap_mode: Memory-map mode the gene features will be loaded with.
+        precision: Precision of the gene features, correction matrices, and
+            pretrained weights to preload.
+
+    Raises:
+        FileNotFoundError: if any of the data files does not exist.
+
+    """
+    evictions = DATA_CACHE.stats()["evictions"] or 0
+
+    load_id_conversion_index(file_loc)
+    load_geneid_conversion(file_loc, "Entrez", "Symbol")
+    for net_type in cast(List[config.NET_TYPE], get_all_net_types(file_loc)):
+        if osp.isfile(osp.join(file_loc, f"NodeOrder_{net_type}.txt")):
+            load_node_order(file_loc, net_type)
+
+    for net_type in net_types:
+        logger.info(f"Preloading data for {net_type}")
+        load_network_index(file_loc, net_type)
+        load_network_gene_names(file_loc, net_type, "Symbol")
+        load_network_gene_names(file_loc, net_type, "Name")
+        load_edge_store(file_loc, net_type)
+        for gsc in gscs:
+            load_gsc_incidence(file_loc, gsc, net_type)
+        for feature in features:
+            load_gene_features(file_loc, feature, net_type, mmap_mode=mmap_mode, precision=precision)
+            load_feature_stats(file_loc, feature, net_type, precision=precision)
+            for target_set in cast(List[config.GSC_TYPE], config.ALL_GSCS):
+                load_pretrained_models(file_loc, target_set, net_type, feature, precision=precision)
+                load_correction_order(file_loc, target_set, net_type)
+                for gsc in gscs:
+                    load_correction_mat(file_loc, gsc, target_set, net_type, feature, precision=precision)
+
+    stats = DATA_CACHE.stats()
+    num_bytes = stats["bytes"] or 0
+    logger.info(f"Preloaded data cache: {stats['entries']} entries, {num_bytes / 1024**2:.1f} MB")
+    if (stats["evictions"] or 0) > evictions:
+        logger.warning(
+            f"Preloaded data exceeds the data cache budget ({stats['max_bytes']} bytes), some data will be reloaded "
+            "on use. Increase the budget via geneplexus.cache.DATA_CACHE.set_max_bytes.",
+        )
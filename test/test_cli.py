@@ -1,5 +1,8 @@
 import os
 
+import pandas as pd
+import pytest
+
 import geneplexus.cli
 
 
@@ -30,3 +33,86 @@ def test_save_results(mocker, tmpdir):
     )
 
     assert not os.path.isfile(geneplexus.cli.TMP_LOG_PATH)
+
+
+def test_read_gene_sets(tmpdir):
+    gmt_path = os.path.join(tmpdir, "gene_sets.gmt")
+    with open(gmt_path, "w") as f:
+        f.write("set1\tdescription\tA\tB\tC\n\nset2\tdescription\tD\t\tE\n")
+    assert geneplexus.cli.read_gene_sets(gmt_path) == {"set1": ["A", "B", "C"], "set2": ["D", "E"]}
+
+    gene_list_dir = os.path.join(tmpdir, "gene_lists")
+    os.mkdir(gene_list_dir)
+    for name, genes in [("set2.txt", "D\nE"), ("set1.txt", "A\nB\nC"), (".hidden", "F")]:
+        with open(os.path.join(gene_list_dir, name), "w") as f:
+            f.write(genes)
+    gene_sets = geneplexus.cli.read_gene_sets(gene_list_dir)
+    assert list(gene_sets) == ["set1", "set2"]
+    assert gene_sets == {"set1": ["A", "B", "C"], "set2": ["D", "E"]}
+
+    with open(gmt_path, "a") as f:
+        f.write("set1\tdescription\tF\n")
+    with pytest.raises(ValueError):
+        geneplexus.cli.read_gene_sets(gmt_path)
+
+
+def test_save_batch_results(mocker, tmpdir):
+    write_results = mocker.patch("geneplexus.cli.write_results")
+    mocker.patch("geneplexus.cli._finalize_output")
+
+    gp = PatchGP()
+    gp.input_count = 3
+    gp.pos_genes_in_net = ["A", "B"]
+    gp.negative_genes = ["C", "D", "E"]
+    gp.avgps = [1.0, 2.0, 3.0]
+    results = [
+        ("GO:0000001", gp, None),
+        ("GO/0000001", gp, None),
+        ("empty", None, ValueError("no genes")),
+    ]
+
+    num_failed = geneplexus.cli.save_batch_results(
+        iter(results),
+        outdir=str(tmpdir),
+        zip_output=False,
+        overwrite=True,
+        skip_mdl_sim=True,
+    )
+    assert num_failed == 1
+    assert [call.args[1] for call in write_results.call_args_list] == [
+        os.path.join(tmpdir, "GO_0000001"),
+        os.path.join(tmpdir, "GO_0000001_1"),
+    ]
+
+    df_summary = pd.read_csv(os.path.join(tmpdir, "summary.tsv"), sep="\t", keep_default_na=False)
+    assert df_summary["Name"].tolist() == ["GO:0000001", "GO/0000001", "empty"]
+    assert df_summary["Directory"].tolist() == ["GO_0000001", "GO_0000001_1", ""]
+    assert df_summary["PositiveGenes"].tolist() == ["2", "2", ""]
+    assert df_summary["MeanCVScore"].tolist() == ["2.0", "2.0", ""]
+    assert df_summary["Status"].tolist() == ["done", "done", "failed"]
+    assert df_summary["Error"].tolist() == ["", "", "ValueError: no genes"]
+
+
+def test_run_gene_sets(mocker):
+    run_analyses = mocker.patch("geneplexus.cli.run_analyses")
+
+    class LoadGenesGP(PatchGP):
+        fit_and_predict_many = geneplexus.GenePlexus.fit_and_predict_many
+        _iter_fit_and_predict = geneplexus.GenePlexus._iter_fit_and_predict
+
+        def load_genes(self, genes):
+            if not genes:
+                raise ValueError("no genes")
+            self.input_genes = genes
+
+        def fit_and_predict(self):
+            return
+
+    gene_sets = {f"set{i}": [str(j) for j in range(i)] for i in range(10)}
+    results = list(geneplexus.cli.run_gene_sets(LoadGenesGP(), gene_sets, 50, True, jobs=3))
+    assert [name for name, _, _ in results] == list(gene_sets)
+    assert results[0][1] is None and isinstance(results[0][2], ValueError)
+    for name, gp, error in results[1:]:
+        assert error is None
+        assert gp.input_genes == gene_sets[name]
+    assert run_analyses.call_count == 9
@@ -5,6 +5,7 @@ import pathlib
 import shutil
 import tempfile
 import unittest
+from unittest import mock
 
 import numpy as np
 import pytest
@@ -45,6 +46,7 @@ class TestCustom(unittest.TestCase):
         cls.nodeorder_path = osp.join(pytest.DATADIR, "NodeOrder_custom.txt")
         cls.adj_path = osp.join(pytest.DATADIR, "Data_Adjacency_custom.npy")
         cls.gsc_path = osp.join(pytest.DATADIR, "GSC_GO_custom_GoodSets.json")
+        cls.gsc_incidence_path = osp.join(pytest.DATADIR, "GSC_GO_custom_GoodSets.npz")
         np.savetxt(cls.nodeorder_path, NODEORDER, fmt="%s")
 
     @classmethod
@@ -53,6 +55,7 @@ class TestCustom(unittest.TestCase):
         os.remove(cls.nodeorder_path)
         os.remove(cls.adj_path)
         os.remove(cls.gsc_path)
+        os.remove(cls.gsc_incidence_path)
 
     @parameterized.expand(
         [
@@ -111,6 +114,141 @@ class TestCustom(unittest.TestCase):
         )
 
 
+class TestCustomNetwork(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        np.savetxt(osp.join(self.tmpdir, "NodeOrder_custom.txt"), NODEORDER, fmt="%s")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    @parameterized.expand(
+        [
+            (EDGELIST_UNWEIGHTED_LOC, ADJMAT_UNWEIGHTED),
+            (EDGELIST_WEIGHTED_LOC, ADJMAT_WEIGHTED),
+        ],
+    )
+    def test_edgelist_to_matrix_make_nodeorder(self, edgelist_loc, adjmat):
+        geneplexus.custom.edgelist_to_matrix(
+            edgelist_loc,
+            self.tmpdir,
+            "custom",
+            "Adjacency",
+            make_nodeorder=True,
+        )
+        nodeorder = np.loadtxt(osp.join(self.tmpdir, "NodeOrder_custom.txt"), dtype=str).tolist()
+        self.assertEqual(nodeorder, NODEORDER)
+        self.assertEqual(np.load(osp.join(self.tmpdir, "Data_Adjacency_custom.npy")).tolist(), adjmat)
+
+    @parameterized.expand(
+        [
+            (EDGELIST_UNWEIGHTED_LOC, ADJMAT_UNWEIGHTED, 0.85),
+            (EDGELIST_WEIGHTED_LOC, ADJMAT_WEIGHTED, 0.5),
+        ],
+    )
+    def test_edgelist_to_matrix_influence(self, edgelist_loc, adjmat, alpha):
+        adjmat = np.array(adjmat)
+        expected = alpha * np.linalg.inv(np.identity(len(adjmat)) - (1 - alpha) * adjmat / adjmat.sum(axis=0))
+        influence_path = osp.join(self.tmpdir, "Data_Influence_custom.npy")
+
+        geneplexus.custom.edgelist_to_matrix(
+            edgelist_loc, self.tmpdir, "custom", "Influence", alpha, make_nodeorder=True
+        )
+        self.assertTrue(np.allclose(np.load(influence_path), expected))
+
+        # Parse the edgelist in chunks of two lines, and compute one row of the influence matrix at a time
+        with mock.patch("geneplexus.custom.EDGELIST_CHUNK_ROWS", 2), mock.patch(
+            "geneplexus.custom.FEATURE_CHUNK_BYTES", 1
+        ):
+            geneplexus.custom.edgelist_to_matrix(edgelist_loc, self.tmpdir, "custom", "Influence", alpha)
+        self.assertTrue(np.allclose(np.load(influence_path), expected))
+
+        geneplexus.custom.edgelist_to_matrix(
+            edgelist_loc,
+            self.tmpdir,
+            "custom",
+            "Influence",
+            alpha,
+            top_k=2,
+            n_jobs=2,
+        )
+        influence = np.load(influence_path)
+        self.assertEqual((influence != 0).sum(axis=1).tolist(), [2] * len(adjmat))
+        self.assertTrue(np.allclose(np.sort(influence, axis=1)[:, -2:], np.sort(expected, axis=1)[:, -2:]))
+
+    def test_edgelist_to_matrix_embedding(self):
+        embedding_path = osp.join(self.tmpdir, "Data_Embedding_custom.npy")
+        geneplexus.custom.edgelist_to_matrix(
+            EDGELIST_WEIGHTED_LOC,
+            self.tmpdir,
+            "custom",
+            "Embedding",
+            make_nodeorder=True,
+            embedding_dim=4,
+        )
+        embedding = np.load(embedding_path)
+        self.assertEqual(embedding.shape, (6, 4))
+
+        # Embedding factorizes the diffusion operator of the normalized adjacency
+        adjmat = np.array(ADJMAT_WEIGHTED)
+        inv_sqrt_degrees = 1 / np.sqrt(adjmat.sum(axis=1))
+        norm_adjmat = adjmat * np.outer(inv_sqrt_degrees, inv_sqrt_degrees)
+        eigvals, eigvecs = np.linalg.eigh(norm_adjmat)
+        top = np.argsort(eigvals)[::-1][:4]
+        diffusion = (eigvals[top] + eigvals[top] ** 2 + eigvals[top] ** 3) / 3
+        expected = eigvecs[:, top] * np.sqrt(np.maximum(diffusion, 0))
+        self.assertTrue(np.allclose(embedding @ embedding.T, expected @ expected.T))
+
+        # Zero padded if the dimension exceeds the number of nodes
+        geneplexus.custom.edgelist_to_matrix(
+            EDGELIST_WEIGHTED_LOC, self.tmpdir, "custom", "Embedding", embedding_dim=10
+        )
+        padded_embedding = np.load(embedding_path)
+        self.assertEqual(padded_embedding.shape, (6, 10))
+        self.assertTrue(np.allclose(padded_embedding @ padded_embedding.T, expected @ expected.T))
+
+    def test_edgelist_to_matrix_errors(self):
+        edgelist_loc = osp.join(self.tmpdir, "custom_error.edg")
+        with open(edgelist_loc, "w") as f:
+            f.write("156\t408\t0.4\t1\n")
+        with self.assertRaises(ValueError):
+            geneplexus.custom.edgelist_to_matrix(edgelist_loc, self.tmpdir, "custom", "Adjacency")
+
+        with open(edgelist_loc, "w") as f:
+            f.write("156\t408\n156\t1000\n")
+        with self.assertRaises(KeyError) as e:
+            geneplexus.custom.edgelist_to_matrix(edgelist_loc, self.tmpdir, "custom", "Adjacency")
+        self.assertIn("'1000'", str(e.exception))
+
+    def test_subset_gsc_to_network_incidence(self):
+        gsc_orig = {
+            "T1": {"Name": "kept", "Genes": ["156", "408", "9999", "1213"]},
+            "T2": {"Name": "too small", "Genes": ["6714", "9999"]},
+            "T3": {"Name": "too large", "Genes": NODEORDER},
+            "T4": {"Name": "duplicated genes", "Genes": ["4734", "408", "4734"]},
+        }
+        with open(osp.join(self.tmpdir, "GSCOriginal_GO.json"), "w") as f:
+            json.dump(gsc_orig, f)
+        geneplexus.custom.subset_gsc_to_network(self.tmpdir, "custom", ["GO"], max_size=5, min_size=2, n_jobs=2)
+
+        expected_goodsets = {
+            "T1": {"Name": "kept", "Genes": ["1213", "156", "408"]},
+            "T4": {"Name": "duplicated genes", "Genes": ["408", "4734"]},
+        }
+        with open(osp.join(self.tmpdir, "GSC_GO_custom_GoodSets.json")) as f:
+            goodsets = json.load(f)
+        universe = np.loadtxt(osp.join(self.tmpdir, "GSC_GO_custom_universe.txt"), dtype=str, ndmin=1)
+        self.assertEqual(goodsets, expected_goodsets)
+        self.assertEqual(list(goodsets), list(expected_goodsets))
+        self.assertEqual(universe.tolist(), ["1213", "156", "408", "4734"])
+
+        gsc_incidence = geneplexus.index.GSCIncidence.load(osp.join(self.tmpdir, "GSC_GO_custom_GoodSets.npz"))
+        expected = geneplexus.index.GSCIncidence.from_gsc(goodsets, universe)
+        self.assertEqual(gsc_incidence.term_ids.tolist(), expected.term_ids.tolist())
+        self.assertEqual(gsc_incidence.genes.tolist(), expected.genes.tolist())
+        self.assertEqual((gsc_incidence.matrix != expected.matrix).nnz, 0)
+
+
 class TestCustomGenePlexus(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
@@ -1,4 +1,11 @@
+import hashlib
+import http.server
+import io
+import os
+import os.path as osp
+import threading
 from urllib.parse import urljoin
+from zipfile import ZipFile
 
 import pytest
 
@@ -18,3 +25,98 @@ def test_retries(requests_mock, tmpdir):
         with pytest.raises(DownloadError) as excinfo:
             download._download_from_url(tmpdir, pytest.FILENAMES, "Zenodo")
     assert str(excinfo.value) == "Failed to download all required files (MAX_RETRY=10)"
+
+
+class RangeRequestHandler(http.server.BaseHTTPRequestHandler):
+    """Serve files from memory, supporting range requests and dropped connections."""
+
+    files = {}
+    requests = []
+    drop_after = None  # drop the connection of the next response after this many bytes
+
+    def do_GET(self):
+        name = self.path.lstrip("/")
+        range_header = self.headers.get("Range")
+        type(self).requests.append((name, range_header))
+        if name not in self.files:
+            self.send_error(404)
+            return
+
+        content = self.files[name]
+        start = int(range_header.split("=")[1].rstrip("-")) if range_header else 0
+        self.send_response(206 if range_header else 200)
+        self.send_header("Content-Length", str(len(content) - start))
+        self.end_headers()
+
+        drop_after, type(self).drop_after = self.drop_after, None
+        self.wfile.write(content[start:] if drop_after is None else content[start : start + drop_after])
+        self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), RangeRequestHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setitem(URL_DICT, "Local", f"http://127.0.0.1:{httpd.server_address[1]}/")
+    monkeypatch.setattr(RangeRequestHandler, "files", {})
+    monkeypatch.setattr(RangeRequestHandler, "requests", [])
+    yield RangeRequestHandler
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def make_zip(filename, content):
+    buf = io.BytesIO()
+    with ZipFile(buf, "w") as zf:
+        zf.writestr(filename, content)
+    return buf.getvalue()
+
+
+def test_download_file(server, tmpdir):
+    server.files["NodeOrder_BioGRID.txt.zip"] = make_zip("NodeOrder_BioGRID.txt", "1\n2\n3\n")
+    download._download_file("NodeOrder_BioGRID.txt", tmpdir, "Local")
+    assert open(osp.join(tmpdir, "NodeOrder_BioGRID.txt")).read() == "1\n2\n3\n"
+    assert os.listdir(tmpdir) == ["NodeOrder_BioGRID.txt"]
+
+
+def test_download_file_resume(server, tmpdir, monkeypatch):
+    monkeypatch.setattr(download, "DOWNLOAD_CHUNK_BYTES", 1000)
+    content = os.urandom(100000)
+    zip_content = make_zip("Data_Embedding_BioGRID.npy", content)
+    server.files["Data_Embedding_BioGRID.npy.zip"] = zip_content
+
+    # Dropped connection is resumed from the partially downloaded file
+    server.drop_after = 30000
+    with log_level_context(logger, "CRITICAL"):
+        download._download_file("Data_Embedding_BioGRID.npy", tmpdir, "Local")
+    assert open(osp.join(tmpdir, "Data_Embedding_BioGRID.npy"), "rb").read() == content
+    assert server.requests == [
+        ("Data_Embedding_BioGRID.npy.zip", None),
+        ("Data_Embedding_BioGRID.npy.zip", "bytes=30000-"),
+    ]
+    assert os.listdir(tmpdir) == ["Data_Embedding_BioGRID.npy"]
+
+
+def test_download_file_checksum(server, tmpdir, caplog):
+    zip_content = make_zip("NodeOrder_BioGRID.txt", "1\n2\n3\n")
+    server.files["NodeOrder_BioGRID.txt.zip"] = zip_content
+
+    manifest_path = osp.join(tmpdir, "manifest.md5")
+    with open(manifest_path, "w") as f:
+        f.write(f"{hashlib.md5(zip_content).hexdigest()}  NodeOrder_BioGRID.txt.zip\n")
+        f.write(f"{hashlib.md5(b'other').hexdigest()} *NodeOrder_STRING.txt.zip\n")
+    checksums = download.read_manifest(manifest_path)
+    assert checksums["NodeOrder_STRING.txt.zip"] == hashlib.md5(b"other").hexdigest()
+
+    download._download_file("NodeOrder_BioGRID.txt", tmpdir, "Local", checksums)
+    assert osp.isfile(osp.join(tmpdir, "NodeOrder_BioGRID.txt"))
+
+    server.files["NodeOrder_STRING.txt.zip"] = zip_content
+    with pytest.raises(DownloadError, match="Checksum mismatch"):
+        download._download_file("NodeOrder_STRING.txt", tmpdir, "Local", checksums)
+    assert any(r.levelname == "WARNING" and "Checksum mismatch" in r.message for r in caplog.records)
+    assert sorted(os.listdir(tmpdir)) == ["NodeOrder_BioGRID.txt", "manifest.md5"]
@@ -1,7 +1,9 @@
 import numpy as np
 import pytest
+from scipy.spatial.distance import cosine
 
 import geneplexus
+from geneplexus import _geneplexus
 
 
 @pytest.mark.usefixtures("data")
@@ -20,7 +22,7 @@ def test_run_sl(gp, caplog, mocker, min_num_pos, num_folds, null_val, cross_vali
     # Use random 5 dimensional vectors as features to speed up test
     mocker.patch(
         "geneplexus.util.load_gene_features",
-        lambda x, y, z: np.random.random((30000, 5)),
+        lambda *args, **kwargs: np.random.random((len(gp.net_genes), 5)),
     )
 
     gp.fit_and_predict(
@@ -41,3 +43,112 @@ def test_run_sl(gp, caplog, mocker, min_num_pos, num_folds, null_val, cross_vali
         assert "Performing cross validation." in caplog.text
 
     assert len(gp.avgps) == num_folds
+
+
+@pytest.mark.usefixtures("data")
+def test_run_sl_n_jobs(gp, mocker):
+    features = np.random.default_rng(0).random((len(gp.net_genes), 5))
+    mocker.patch("geneplexus.util.load_gene_features", lambda *args, **kwargs: features)
+
+    mdl_weights, df_probs, avgps = gp.fit_and_predict(min_num_pos=1, num_folds=3)
+    mdl_weights_par, df_probs_par, avgps_par = gp.fit_and_predict(min_num_pos=1, num_folds=3, n_jobs=4)
+    assert np.array_equal(mdl_weights, mdl_weights_par)
+    assert df_probs.equals(df_probs_par)
+    assert avgps == avgps_par
+
+    with pytest.raises(ValueError):
+        gp.fit_and_predict(n_jobs=0)
+
+
+@pytest.mark.usefixtures("data")
+def test_fit_and_predict_many(gp, mocker):
+    features = np.random.default_rng(0).random((len(gp.net_genes), 5))
+    mocker.patch("geneplexus.util.load_gene_features", lambda *args, **kwargs: features)
+
+    gene_sets = {"first": gp.input_genes[::2], "second": gp.input_genes[1::2], "all": gp.input_genes}
+    results = list(gp.fit_and_predict_many(gene_sets, n_jobs=2, cross_validate=False))
+    assert [name for name, _ in results] == list(gene_sets)
+
+    for name, gp_set in results:
+        assert gp_set is not gp
+        gp.load_genes(gene_sets[name])
+        gp.fit_and_predict(cross_validate=False)
+        assert gp_set.input_genes == gp.input_genes
+        assert np.allclose(gp_set.probs, gp.probs)
+        assert gp_set.df_probs.equals(gp.df_probs)
+
+    names = [name for name, _ in gp.fit_and_predict_many(list(gene_sets.values()), cross_validate=False)]
+    assert names == ["0", "1", "2"]
+
+    def callback(gp_set):
+        if len(gp_set.input_genes) < len(gp.input_genes):
+            raise ValueError("subset")
+        gp_set.make_small_edgelist(num_nodes=10)
+
+    results = dict(gp.fit_and_predict_many(gene_sets, callback=callback, return_errors=True, cross_validate=False))
+    assert isinstance(results["first"], ValueError) and isinstance(results["second"], ValueError)
+    assert results["all"].df_edge is not None
+    with pytest.raises(ValueError):
+        list(gp.fit_and_predict_many(gene_sets, callback=callback, cross_validate=False))
+    with pytest.raises(ValueError):
+        gp.fit_and_predict_many(gene_sets, n_jobs=0)
+
+
+@pytest.mark.usefixtures("data")
+def test_preload_data(gp):
+    geneplexus.cache.DATA_CACHE.clear()
+    geneplexus.util.preload_data(pytest.DATADIR, ["BioGRID"], ["Embedding"], ["GO"])
+    misses = geneplexus.cache.DATA_CACHE.stats()["misses"]
+    assert misses > 0
+
+    # The whole pipeline runs without loading any data
+    gp.load_genes(gp.input_genes)
+    gp.fit_and_predict(cross_validate=False)
+    gp.make_sim_dfs()
+    gp.make_small_edgelist()
+    assert geneplexus.cache.DATA_CACHE.stats()["misses"] == misses
+
+
+@pytest.mark.usefixtures("data")
+def test_result_cache(gp, mocker):
+    gp.result_cache = geneplexus.cache.ResultCache()
+    try:
+        mdl_weights, df_probs, avgps = gp.fit_and_predict(cross_validate=False)
+        run_sl = mocker.spy(geneplexus._geneplexus, "_run_sl")
+        mdl_weights_cached, df_probs_cached, avgps_cached = gp.fit_and_predict(cross_validate=False)
+        assert run_sl.call_count == 0
+        assert np.array_equal(mdl_weights, mdl_weights_cached)
+        assert df_probs.equals(df_probs_cached)
+        assert avgps == avgps_cached
+
+        gp.fit_and_predict(cross_validate=False, null_val=-20)
+        gp.fit_and_predict(cross_validate=False, random_state=None)
+        assert run_sl.call_count == 2
+        assert gp.result_cache.stats()["hits"] == 1
+    finally:
+        gp.result_cache = None
+
+
+def test_compute_model_similarities():
+    rng = np.random.default_rng(0)
+    pretrained_weights = rng.random((20, 5))
+    pretrained_weights /= np.linalg.norm(pretrained_weights, axis=1, keepdims=True)
+    cor_mat = rng.random((30, 20))
+    mdl_weights = rng.random((3, 5))
+
+    # Similarities computed one model and one term at a time
+    expected = []
+    for weights in mdl_weights:
+        last_row = np.array([1 - cosine(pretrained, weights) for pretrained in pretrained_weights])
+        cor_mat_ext = np.concatenate((cor_mat, last_row[None, :]), axis=0)
+        zq = np.maximum(0, (last_row - np.mean(last_row)) / np.std(last_row))
+        zs = np.maximum(0, (last_row - np.mean(cor_mat_ext, axis=0)) / np.std(cor_mat_ext, axis=0))
+        expected.append(np.sqrt(zq**2 + zs**2))
+
+    z = _geneplexus._compute_model_similarities(pretrained_weights, cor_mat, mdl_weights)
+    assert z.shape == (3, 20)
+    assert np.allclose(z, expected)
+
+    z = _geneplexus._compute_model_similarities(pretrained_weights, cor_mat, mdl_weights[1])
+    assert z.shape == (20,)
+    assert np.allclose(z, expected[1])
@@ -0,0 +1,110 @@
+import os.path as osp
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from parameterized import parameterized
+
+import geneplexus
+from geneplexus import precision
+from geneplexus import synthetic
+from geneplexus import util
+from geneplexus.index import ReducedPrecisionMatrix
+
+
+class TestReducedPrecisionMatrix(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.data = np.random.default_rng(0).normal(size=(50, 8))
+        self.data[:, 3] = 0
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    @parameterized.expand([("float32", 1e-6), ("float16", 1e-3), ("int8", 1e-2)])
+    def test_reduced_precision_matrix(self, prec, rtol):
+        mat = ReducedPrecisionMatrix.from_array(self.data, prec)
+        self.assertEqual(mat.precision, prec)
+        self.assertEqual(mat.shape, self.data.shape)
+        self.assertEqual(mat[:].dtype, np.float32)
+        max_error = rtol * np.abs(self.data).max()
+        np.testing.assert_allclose(mat[:], self.data, atol=max_error)
+        np.testing.assert_allclose(mat[[3, 1], 2:5], self.data[[3, 1], 2:5], atol=max_error)
+        np.testing.assert_allclose(mat[4], self.data[4], atol=max_error)
+
+        vec = np.arange(8.0)
+        np.testing.assert_allclose(mat @ vec, mat[:] @ vec, rtol=1e-5, atol=1e-5)
+
+        path = osp.join(self.tmpdir, f"mat.{prec}")
+        mat.save(path)
+        loaded = ReducedPrecisionMatrix.load(path)
+        self.assertIsInstance(loaded.values, np.memmap)
+        self.assertEqual(loaded.nbytes, 0 if mat.scales is None else mat.scales.nbytes)
+        np.testing.assert_array_equal(loaded[:], mat[:])
+
+    def test_unknown_precision(self):
+        with self.assertRaises(ValueError):
+            ReducedPrecisionMatrix.from_array(self.data, "float64")
+
+
+class TestPrecision(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.mkdtemp()
+        synthetic.make_synthetic_data(
+            cls.tmpdir,
+            num_nodes=300,
+            features="Embedding",
+            embedding_dim=16,
+            num_terms=100,
+            avg_degree=10,
+        )
+        cls.genes = np.loadtxt(osp.join(cls.tmpdir, "NodeOrder_BioGRID.txt"), dtype=str)[:30].tolist()
+        cls.converted = precision.convert_data_precision(cls.tmpdir, "int8", "BioGRID")
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmpdir)
+
+    def test_convert(self):
+        self.assertEqual(self.converted, [("BioGRID", "Embedding")])
+        for file_name in [
+            "Data_Embedding_BioGRID.int8",
+            "DataStats_Embedding_BioGRID.int8.npz",
+            "CorrectionMatrix_GO_DisGeNet_BioGRID_Embedding.int8",
+            "PreTrainedWeights_GO_BioGRID_Embedding.int8.npz",
+        ]:
+            with self.subTest(file_name=file_name):
+                self.assertTrue(osp.exists(osp.join(self.tmpdir, file_name)))
+
+        data = util.load_gene_features(self.tmpdir, "Embedding", "BioGRID", precision="int8")
+        self.assertIsInstance(data, ReducedPrecisionMatrix)
+        self.assertEqual(data.values.dtype, np.int8)
+        cor_mat = util.load_correction_mat(self.tmpdir, "GO", "GO", "BioGRID", "Embedding", precision="int8")
+        self.assertEqual(cor_mat.dtype, np.float32)
+        pretrained_models = util.load_pretrained_models(self.tmpdir, "GO", "BioGRID", "Embedding", precision="int8")
+        self.assertIsInstance(pretrained_models.weights, ReducedPrecisionMatrix)
+
+        with self.assertRaisesRegex(FileNotFoundError, "convert_data_precision"):
+            util.load_gene_features(self.tmpdir, "Embedding", "BioGRID", precision="float16")
+
+    def test_pipeline(self):
+        results = {}
+        for prec in ["float64", "int8"]:
+            gp = geneplexus.GenePlexus(self.tmpdir, "BioGRID", "Embedding", "GO", precision=prec)
+            gp.load_genes(self.genes)
+            gp.fit_and_predict()
+            gp.make_sim_dfs()
+            results[prec] = gp
+        np.testing.assert_allclose(results["int8"].probs, results["float64"].probs, atol=0.05)
+        self.assertNotEqual(results["int8"]._get_result_key(), results["float64"]._get_result_key())
+
+        with self.assertRaises(ValueError):
+            geneplexus.GenePlexus(self.tmpdir, "BioGRID", "Embedding", "GO", precision="float8")
+
+    def test_compare_precision(self):
+        df = precision.compare_precision(self.tmpdir, "int8", "BioGRID", "Embedding", num_gene_sets=2, top_k=20)
+        self.assertEqual(len(df), 2)
+        self.assertTrue((df["RankCorrelation"] > 0.95).all())
+        self.assertTrue((df["TopKOverlap"] > 0.5).all())
@@ -0,0 +1,135 @@
+import copy
+import os.path as osp
+import shutil
+import tempfile
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import yaml
+
+import geneplexus
+from geneplexus import profile
+from geneplexus import synthetic
+from geneplexus.cache import DATA_CACHE
+
+
+class TestProfile(unittest.TestCase):
+    def test_stages(self):
+        prof = profile.Profile()
+        with profile.stage("ignored"):
+            pass
+        with prof.stage("outer"):
+            time.sleep(0.01)
+            with profile.stage("inner"):
+                pass
+            with prof.stage("inner"):
+                pass
+        with prof.stage("outer"):
+            pass
+
+        self.assertEqual(
+            [(stage["name"], stage["depth"]) for stage in prof.stages],
+            [
+                ("outer", 0),
+                ("inner", 1),
+                ("inner", 1),
+                ("outer", 0),
+            ],
+        )
+        self.assertGreaterEqual(prof.stages[0]["wall_time"], 0.01)
+        self.assertIsNone(profile.get_active_profile())
+
+        summary = prof.summary()
+        self.assertEqual(list(summary), ["outer", "inner"])
+        self.assertEqual(summary["inner"]["count"], 2)
+        self.assertAlmostEqual(summary["outer"]["wall_time"], prof.stages[0]["wall_time"] + prof.stages[3]["wall_time"])
+        self.assertEqual(len(prof.format().splitlines()), 5)
+
+    def test_in_context(self):
+        prof = profile.Profile()
+        with prof.stage("outer"):
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                futures = [executor.submit(profile.in_context(sum, "sum"), [i, 1]) for i in range(3)]
+        self.assertEqual([future.result() for future in futures], [1, 2, 3])
+        self.assertEqual(
+            sorted((stage["name"], stage["depth"]) for stage in prof.stages),
+            [
+                ("outer", 0),
+                ("sum", 1),
+                ("sum", 1),
+                ("sum", 1),
+            ],
+        )
+
+    def test_copy(self):
+        prof = profile.Profile()
+        with prof.stage("first"):
+            pass
+        prof_copy = copy.copy(prof)
+        with prof_copy.stage("second"):
+            pass
+        self.assertEqual([stage["name"] for stage in prof.stages], ["first"])
+        self.assertEqual([stage["name"] for stage in prof_copy.stages], ["first", "second"])
+
+
+class TestGenePlexusProfile(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.mkdtemp()
+        synthetic.make_synthetic_data(
+            cls.tmpdir,
+            num_nodes=300,
+            features="Embedding",
+            embedding_dim=16,
+            num_terms=100,
+            avg_degree=10,
+        )
+        cls.genes = np.loadtxt(osp.join(cls.tmpdir, "NodeOrder_BioGRID.txt"), dtype=str)[:30].tolist()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmpdir)
+
+    def test_pipeline(self):
+        DATA_CACHE.clear()
+        gp = geneplexus.GenePlexus(self.tmpdir, "BioGRID", "Embedding", "GO")
+        gp.load_genes(self.genes)
+        gp.fit_and_predict(n_jobs=2)
+        gp.make_sim_dfs()
+        gp.make_small_edgelist()
+
+        summary = gp.profile.summary()
+        for name, count in [
+            ("load_genes", 1),
+            ("id_conversion", 1),
+            ("validation_table", 1),
+            ("negatives", 1),
+            ("fit_and_predict", 1),
+            ("scaling", 1),
+            ("fit", 1),
+            ("cv_fold", 3),
+            ("predict", 1),
+            ("prob_table", 1),
+            ("similarity", 1),
+            ("edgelist", 1),
+            ("load Data_Embedding_BioGRID.npy (npy)", 1),
+        ]:
+            with self.subTest(name=name):
+                self.assertEqual(summary[name]["count"], count)
+        depths = {stage["name"]: stage["depth"] for stage in gp.profile.stages}
+        self.assertEqual(depths["fit_and_predict"], 0)
+        self.assertEqual(depths["cv_fold"], 1)
+
+        gp.dump_config(self.tmpdir)
+        with open(osp.join(self.tmpdir, "config.yaml")) as f:
+            self.assertEqual(yaml.safe_load(f)["profile"], gp.profile.stages)
+
+    def test_fit_and_predict_many(self):
+        gp = geneplexus.GenePlexus(self.tmpdir, "BioGRID", "Embedding", "GO")
+        results = dict(gp.fit_and_predict_many({"a": self.genes[:20], "b": self.genes[10:]}, n_jobs=2))
+        self.assertEqual(len(gp.profile), 0)
+        for gp_set in results.values():
+            stages = [stage["name"] for stage in gp_set.profile.stages if stage["depth"] == 0]
+            self.assertEqual(stages, ["load_genes", "fit_and_predict"])
@@ -0,0 +1,35 @@
+import subprocess
+import sys
+
+import pytest
+
+# Maximum time (in seconds) for importing the CLI in a fresh interpreter,
+# tracked to keep the startup of short CLI invocations fast
+STARTUP_TIME_BUDGET = 0.5
+
+HEAVY_MODULES = ["pandas", "pystow", "requests", "scipy", "sklearn", "yaml"]
+
+
+def run_python(code: str) -> str:
+    return subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout
+
+
+@pytest.mark.parametrize("module", ["geneplexus", "geneplexus.cli"])
+def test_no_heavy_imports(module):
+    code = f"import sys, {module}; print(' '.join(sorted(set(m.split('.')[0] for m in sys.modules))))"
+    loaded = run_python(code).split()
+    assert [module for module in HEAVY_MODULES if module in loaded] == []
+
+
+def test_lazy_attributes():
+    code = "import geneplexus; print(geneplexus.GenePlexus.__name__, geneplexus.util.__name__)"
+    assert run_python(code).split() == ["GenePlexus", "geneplexus.util"]
+    with pytest.raises(subprocess.CalledProcessError):
+        run_python("import geneplexus; geneplexus.not_a_module")
+
+
+def test_startup_time():
+    code = "import time; start = time.perf_counter(); import geneplexus.cli; print(time.perf_counter() - start)"
+    # Best of a few runs, to be robust to other processes
+    elapsed = min(float(run_python(code)) for _ in range(3))
+    assert elapsed < STARTUP_TIME_BUDGET, f"Importing the CLI took {elapsed:.3f}s (budget {STARTUP_TIME_BUDGET}s)"
@@ -0,0 +1,165 @@
+import json
+import os.path as osp
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+from parameterized import parameterized
+
+import geneplexus
+from geneplexus import download
+from geneplexus import synthetic
+
+
+class TestSynthetic(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.mkdtemp()
+        cls.data_dir = osp.join(cls.tmpdir, "data")
+        synthetic.make_synthetic_data(
+            cls.data_dir,
+            num_nodes=300,
+            features=["Adjacency", "Embedding"],
+            embedding_dim=16,
+            num_terms=100,
+            avg_degree=10,
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmpdir)
+
+    def test_complete(self):
+        files = set(download.get_id_conversion_filenames())
+        files.update(download.get_original_gscs_filenames())
+        files.update(download.get_network_filenames(["BioGRID"]))
+        files.update(
+            download.get_machine_learning_filenames(["BioGRID"], ["Adjacency", "Embedding"], ["GO", "DisGeNet"])
+        )
+        files.update(download.get_similarities_filenames(["BioGRID"], ["Adjacency", "Embedding"], ["GO", "DisGeNet"]))
+        self.assertEqual(download._get_files_to_download(self.data_dir, sorted(files)), [])
+        self.assertFalse(osp.exists(osp.join(self.data_dir, "Data_Influence_BioGRID.npy")))
+        self.assertFalse(osp.exists(osp.join(self.data_dir, "Edgelist_STRING.edg")))
+
+    def test_consistency(self):
+        nodes = np.loadtxt(osp.join(self.data_dir, "NodeOrder_BioGRID.txt"), dtype=str)
+        self.assertEqual(nodes.size, 300)
+        self.assertEqual(np.load(osp.join(self.data_dir, "Data_Adjacency_BioGRID.npy")).shape, (300, 300))
+        self.assertEqual(np.load(osp.join(self.data_dir, "Data_Embedding_BioGRID.npy")).shape, (300, 16))
+
+        edges = np.loadtxt(osp.join(self.data_dir, "Edgelist_BioGRID.edg"), dtype=str)
+        self.assertEqual(edges.shape[1], 2)
+        self.assertTrue(np.isin(edges, nodes).all())
+
+        orders = {}
+        for gsc in ["GO", "DisGeNet"]:
+            with open(osp.join(self.data_dir, f"GSC_{gsc}_BioGRID_GoodSets.json")) as f:
+                goodsets = json.load(f)
+            self.assertGreater(len(goodsets), 0)
+            for term in goodsets.values():
+                self.assertTrue(5 <= len(term["Genes"]) <= 200)
+                self.assertTrue(np.isin(term["Genes"], nodes).all())
+
+            orders[gsc] = np.loadtxt(osp.join(self.data_dir, f"CorrectionMatrixOrder_{gsc}_BioGRID.txt"), dtype=str)
+            for features, dim in [("Adjacency", 300), ("Embedding", 16)]:
+                with open(osp.join(self.data_dir, f"PreTrainedWeights_{gsc}_BioGRID_{features}.json")) as f:
+                    pretrained_weights = json.load(f)
+                self.assertEqual(list(pretrained_weights), orders[gsc].tolist())
+                self.assertEqual({len(model["Weights"]) for model in pretrained_weights.values()}, {dim})
+
+        for features in ["Adjacency", "Embedding"]:
+            for gsc in ["GO", "DisGeNet"]:
+                for target_set in ["GO", "DisGeNet"]:
+                    cor_mat = np.load(
+                        osp.join(self.data_dir, f"CorrectionMatrix_{gsc}_{target_set}_BioGRID_{features}.npy")
+                    )
+                    self.assertEqual(cor_mat.shape, (orders[gsc].size, orders[target_set].size))
+
+    @parameterized.expand([("Adjacency",), ("Embedding",)])
+    def test_pipeline(self, features):
+        nodes = np.loadtxt(osp.join(self.data_dir, "NodeOrder_BioGRID.txt"), dtype=str)
+        input_genes = nodes[:10].tolist() + [f"SYM{gene}" for gene in nodes[10:20]]
+        input_genes += [f"ENSG{int(gene):011d}" for gene in nodes[20:30]]
+
+        gp = geneplexus.GenePlexus(self.data_dir, "BioGRID", features, "GO")
+        gp.load_genes(input_genes)
+        self.assertEqual(sorted(gp.pos_genes_in_net), sorted(nodes[:30]))
+        gp.fit_and_predict()
+        self.assertEqual(gp.df_probs.shape[0], 300)
+        self.assertTrue(np.isfinite(gp.avgps).all())
+        gp.make_sim_dfs()
+        self.assertGreater(gp.df_sim_GO.shape[0], 0)
+        self.assertGreater(gp.df_sim_Dis.shape[0], 0)
+        self.assertEqual(
+            dict(gp.weights_GO),
+            geneplexus.util.load_pretrained_weights(self.data_dir, "GO", "BioGRID", features),
+        )
+        self.assertEqual(len(gp.weights_Dis), gp.df_sim_Dis.shape[0])
+        gp.make_small_edgelist(num_nodes=50)
+        self.assertGreater(gp.df_edge.shape[0], 0)
+        gp.alter_validation_df()
+
+    def test_deterministic(self):
+        data_dir = osp.join(self.tmpdir, "data_deterministic")
+        synthetic.make_synthetic_data(
+            data_dir,
+            num_nodes=300,
+            features="Embedding",
+            embedding_dim=16,
+            num_terms=100,
+            avg_degree=10,
+        )
+        for fn in [
+            "NodeOrder_BioGRID.txt",
+            "Edgelist_BioGRID.edg",
+            "GSC_GO_BioGRID_GoodSets.json",
+            "PreTrainedWeights_DisGeNet_BioGRID_Embedding.json",
+            "IDconversion_Homo-sapiens_Symbol-to-Entrez.json",
+        ]:
+            with open(osp.join(self.data_dir, fn)) as f1, open(osp.join(data_dir, fn)) as f2:
+                self.assertEqual(f1.read(), f2.read(), fn)
+        self.assertTrue(
+            np.array_equal(
+                np.load(osp.join(self.data_dir, "Data_Embedding_BioGRID.npy")),
+                np.load(osp.join(data_dir, "Data_Embedding_BioGRID.npy")),
+            ),
+        )
+
+    def test_weighted_network(self):
+        data_dir = osp.join(self.tmpdir, "data_weighted")
+        synthetic.make_synthetic_data(
+            data_dir,
+            num_nodes=300,
+            networks="STRING",
+            features="Embedding",
+            embedding_dim=16,
+            num_terms=100,
+            avg_degree=10,
+        )
+        edges = np.loadtxt(osp.join(data_dir, "Edgelist_STRING.edg"), dtype=str)
+        self.assertEqual(edges.shape[1], 3)
+        self.assertTrue(((edges[:, 2].astype(float) > 0) & (edges[:, 2].astype(float) <= 1)).all())
+        self.assertFalse(osp.exists(osp.join(data_dir, "Edgelist_BioGRID.edg")))
+
+        # The files shared with the BioGRID data do not depend on the selection
+        for fn in ["NodeOrder_BioGRID.txt", "NodeOrder_STRING.txt", "GSCOriginal_GO.json"]:
+            with open(osp.join(self.data_dir, fn)) as f1, open(osp.join(data_dir, fn)) as f2:
+                self.assertEqual(f1.read(), f2.read(), fn)
+
+    def test_scale_from(self):
+        self.assertEqual(
+            synthetic.get_data_sizes(self.data_dir, "BioGRID"),
+            {
+                "num_nodes": 300,
+                "embedding_dim": 16,
+                "num_terms": 100,
+                "avg_degree": 2 * np.loadtxt(osp.join(self.data_dir, "Edgelist_BioGRID.edg"), dtype=str).shape[0] / 300,
+            },
+        )
+
+        data_dir = osp.join(self.tmpdir, "data_scaled")
+        synthetic.main([data_dir, "--scale-from", self.data_dir, "--scale", "2", "-f", "Embedding", "-n", "BioGRID"])
+        self.assertEqual(np.load(osp.join(data_dir, "Data_Embedding_BioGRID.npy")).shape, (600, 16))
+        with open(osp.join(data_dir, "GSCOriginal_GO.json")) as f:
+            self.assertEqual(len(json.load(f)), 100)
@@ -1,15 +1,31 @@
+import json
+import os
 import os.path as osp
 import pathlib
+import pickle
 import shutil
 import tempfile
 import time
 import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
 
+import numpy as np
+import pandas as pd
 import pytest
 from parameterized import parameterized
+from sklearn.preprocessing import StandardScaler
 
 from geneplexus import config
 from geneplexus import util
+from geneplexus.cache import DataCache
+from geneplexus.cache import ResultCache
+from geneplexus.index import EdgeStore
+from geneplexus.index import FeatureStats
+from geneplexus.index import GSCIncidence
+from geneplexus.index import IDConversionIndex
+from geneplexus.index import NetworkIndex
+from geneplexus.index import PretrainedModels
 
 
 class TestReadGeneList(unittest.TestCase):
@@ -72,6 +88,448 @@ class TestNetGSCGetters(unittest.TestCase):
         )
 
 
+class TestDataCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = osp.join(self.tmpdir, "arr.npy")
+        np.save(self.path, np.arange(10, dtype=float))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_hit_and_miss(self):
+        cache = DataCache()
+        arr1 = cache.get(self.path, lambda: np.load(self.path))
+        arr2 = cache.get(self.path, lambda: np.load(self.path))
+        self.assertIs(arr1, arr2)
+        self.assertFalse(arr1.flags.writeable)
+
+        stats = cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["entries"], 1)
+        self.assertEqual(stats["bytes"], arr1.nbytes)
+
+    def test_extra_key(self):
+        cache = DataCache()
+        arr1 = cache.get(self.path, lambda: np.load(self.path), "a")
+        arr2 = cache.get(self.path, lambda: np.load(self.path) * 2, "b")
+        self.assertEqual((arr1 * 2).tolist(), arr2.tolist())
+        self.assertEqual(cache.stats()["entries"], 2)
+
+    def test_invalidate_on_modify(self):
+        cache = DataCache()
+        cache.get(self.path, lambda: np.load(self.path))
+
+        np.save(self.path, np.arange(20, dtype=float))
+        mtime = os.stat(self.path).st_mtime_ns + 1_000_000_000
+        os.utime(self.path, ns=(mtime, mtime))
+
+        arr = cache.get(self.path, lambda: np.load(self.path))
+        self.assertEqual(arr.tolist(), list(range(20)))
+        self.assertEqual(cache.stats()["misses"], 2)
+        self.assertEqual(cache.stats()["entries"], 1)
+        self.assertEqual(cache.stats()["bytes"], arr.nbytes)
+
+    def test_eviction(self):
+        cache = DataCache(max_bytes=200)
+        cache.get(self.path, lambda: np.load(self.path), "a")  # 80 bytes
+        cache.get(self.path, lambda: np.load(self.path), "b")  # 80 bytes
+        cache.get(self.path, lambda: np.load(self.path), "a")  # hit, "b" is now least recently used
+        cache.get(self.path, lambda: np.load(self.path), "c")  # evicts "b"
+        cache.get(self.path, lambda: np.load(self.path), "a")
+        stats = cache.stats()
+        self.assertEqual(stats["evictions"], 1)
+        self.assertEqual(stats["entries"], 2)
+        self.assertEqual(stats["hits"], 2)
+
+        cache.set_max_bytes(0)
+        self.assertEqual(cache.stats()["entries"], 0)
+        self.assertEqual(cache.stats()["bytes"], 0)
+
+    def test_loader_error(self):
+        cache = DataCache()
+
+        def fail():
+            raise ValueError("corrupted file")
+
+        with self.assertRaises(ValueError):
+            cache.get(self.path, fail)
+        self.assertEqual(cache._load_locks, {})
+        self.assertEqual(cache.get(self.path, lambda: np.load(self.path)).tolist(), list(range(10)))
+
+    def test_concurrent_loads(self):
+        cache = DataCache()
+        num_loads = []
+
+        def load():
+            num_loads.append(1)
+            time.sleep(0.05)
+            return np.load(self.path)
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(lambda _: cache.get(self.path, load), range(8)))
+        self.assertEqual(len(num_loads), 1)
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual(cache._load_locks, {})
+
+    def test_dict_nbytes(self):
+        path = osp.join(self.tmpdir, "data.json")
+        with open(path, "w") as f:
+            json.dump({str(i): {"Name": f"term {i}", "Genes": list(map(str, range(20)))} for i in range(100)}, f)
+
+        def load():
+            with open(path) as f:
+                return json.load(f)
+
+        cache = DataCache()
+        cache.get(path, load)
+        self.assertGreater(cache.stats()["bytes"], 2 * os.stat(path).st_size)
+
+    def test_loader_cached(self):
+        np.savetxt(osp.join(self.tmpdir, "NodeOrder_customnet.txt"), ["1", "2"], fmt="%s")
+        node_order1 = util.load_node_order(self.tmpdir, "customnet")
+        node_order2 = util.load_node_order(self.tmpdir, "customnet")
+        self.assertIs(node_order1, node_order2)
+        self.assertEqual(node_order1.tolist(), ["1", "2"])
+
+    def test_load_gene_features_mmap(self):
+        data = np.random.random((5, 3))
+        np.save(osp.join(self.tmpdir, "Data_Embedding_customnet.npy"), data)
+
+        data_mmap = util.load_gene_features(self.tmpdir, "Embedding", "customnet", mmap_mode="r")
+        self.assertIsInstance(data_mmap, np.memmap)
+        self.assertEqual(data_mmap.tolist(), data.tolist())
+
+        data_loaded = util.load_gene_features(self.tmpdir, "Embedding", "customnet")
+        self.assertNotIsInstance(data_loaded, np.memmap)
+        self.assertEqual(data_loaded.tolist(), data.tolist())
+
+        # Copy-on-write maps are writable and private to each caller
+        data_cow = util.load_gene_features(self.tmpdir, "Embedding", "customnet", mmap_mode="c")
+        self.assertIsInstance(data_cow, np.memmap)
+        data_cow[0] = 0
+        self.assertEqual(data_mmap.tolist(), data.tolist())
+        data_cow2 = util.load_gene_features(self.tmpdir, "Embedding", "customnet", mmap_mode="c")
+        self.assertEqual(data_cow2.tolist(), data.tolist())
+
+        with self.assertRaises(ValueError):
+            util.load_gene_features(self.tmpdir, "Embedding", "customnet", mmap_mode="w+")
+
+    def test_load_network_gene_names(self):
+        np.savetxt(osp.join(self.tmpdir, "NodeOrder_customnet.txt"), ["1", "2", "3"], fmt="%s")
+        with open(osp.join(self.tmpdir, "IDconversion_Homo-sapiens_Entrez-to-Symbol.json"), "w") as f:
+            json.dump({"3": ["C"], "1": ["A", "AA"]}, f)
+
+        symbols = util.load_network_gene_names(self.tmpdir, "customnet", "Symbol")
+        self.assertEqual(symbols.tolist(), ["A/AA", "N/A", "C"])
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_make_key(self):
+        key = ResultCache.make_key(a=1, b={"x": [1, 2], "y": "z"})
+        self.assertEqual(key, ResultCache.make_key(b={"y": "z", "x": [1, 2]}, a=1))
+        self.assertNotEqual(key, ResultCache.make_key(a=2, b={"x": [1, 2], "y": "z"}))
+        self.assertEqual(len(key), 64)
+
+    def test_memory(self):
+        result_cache = ResultCache()
+        self.assertIsNone(result_cache.get("a"))
+        result_cache.put("a", {"probs": np.arange(3)})
+        result = result_cache.get("a")
+        self.assertEqual(result["probs"].tolist(), [0, 1, 2])
+
+        # Modifying a returned result does not affect the cached result
+        result["probs"][0] = 10
+        self.assertEqual(result_cache.get("a")["probs"].tolist(), [0, 1, 2])
+
+        stats = result_cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["entries"]), (2, 1, 1))
+        self.assertAlmostEqual(stats["hit_rate"], 2 / 3)
+
+    def test_serialization(self):
+        df = pd.DataFrame({"Entrez": ["1", "2"], "Probability": [0.5, 0.25], "Rank": [1, 2]})
+        result = (np.arange(3.0), np.float64(0.5), [1, None, "a"], {"df": df, "nan": float("nan")})
+        result_cache = ResultCache()
+        result_cache.put("a", result)
+        cached = result_cache.get("a")
+        self.assertIsInstance(cached, tuple)
+        self.assertEqual(cached[0].tolist(), [0.0, 1.0, 2.0])
+        self.assertIsInstance(cached[1], np.float64)
+        self.assertEqual(cached[2], [1, None, "a"])
+        self.assertTrue(cached[3]["df"].equals(df))
+        self.assertTrue(np.isnan(cached[3]["nan"]))
+
+        with self.assertRaises(TypeError):
+            result_cache.put("b", object())
+        with self.assertRaises(TypeError):
+            result_cache.put("b", np.array([object()]))
+
+    def test_memory_eviction(self):
+        result_cache = ResultCache(max_bytes=20000)
+        for key in "abc":
+            result_cache.put(key, np.zeros(1000))
+        self.assertEqual(result_cache.stats()["entries"], 2)
+        self.assertIsNone(result_cache.get("a"))
+        self.assertIsNotNone(result_cache.get("c"))
+
+    def test_disk(self):
+        result_cache = ResultCache(cache_dir=self.tmpdir)
+        result_cache.put("a", [1, 2])
+        self.assertTrue(osp.isfile(osp.join(self.tmpdir, "a.npz")))
+
+        # Results on disk are shared by cache instances
+        result_cache = ResultCache(cache_dir=self.tmpdir)
+        self.assertEqual(result_cache.get("a"), [1, 2])
+        self.assertEqual(result_cache.stats()["disk_hits"], 1)
+        self.assertEqual(result_cache.get("a"), [1, 2])
+        self.assertEqual(result_cache.stats()["disk_hits"], 1)
+
+        # Invalid (e.g., pickled) results on disk are ignored
+        with open(osp.join(self.tmpdir, "b.npz"), "wb") as f:
+            pickle.dump([3, 4], f)
+        self.assertIsNone(result_cache.get("b"))
+
+        result_cache.clear()
+        self.assertEqual(os.listdir(self.tmpdir), [])
+        self.assertIsNone(result_cache.get("a"))
+
+    def test_disk_eviction(self):
+        result_cache = ResultCache(max_bytes=0, cache_dir=self.tmpdir, max_disk_bytes=20000)
+        for i, key in enumerate("abc"):
+            result_cache.put(key, np.zeros(1000))
+            os.utime(osp.join(self.tmpdir, f"{key}.npz"), (i, i))
+        self.assertEqual(sorted(os.listdir(self.tmpdir)), ["b.npz", "c.npz"])
+        self.assertEqual(result_cache.stats()["entries"], 0)
+
+
+class TestIDConversionIndex(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.mkdtemp()
+        conversion_maps = {
+            "ENSG": {"ENSG01": ["1"], "Shared": ["2"]},
+            "Symbol": {"abc": ["3"], "SHARED": ["4"], "Multi": ["5", "6"]},
+            "ENSP": {"ENSP01": ["7"]},
+            "ENST": {"ENST01": ["8"]},
+        }
+        for src_id_type, conversion_map in conversion_maps.items():
+            path = osp.join(cls.tmpdir, f"IDconversion_Homo-sapiens_{src_id_type}-to-Entrez.json")
+            with open(path, "w") as f:
+                json.dump(conversion_map, f)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmpdir)
+
+    def test_convert(self):
+        id_index = util.load_id_conversion_index(self.tmpdir)
+        self.assertTrue(osp.isfile(osp.join(self.tmpdir, config.ID_CONVERSION_INDEX_FILENAME)))
+        self.assertEqual(len(id_index), 6)
+        self.assertEqual(
+            id_index.convert(["ENSG01", "SHARED", "ABC", "MULTI", "ENSP01", "ENST01", "abc", "NONE"]),
+            [["1"], ["2"], ["3"], ["5", "6"], ["7"], ["8"], None, None],
+        )
+        self.assertEqual(id_index.get_src_type("SHARED"), "ENSG")
+        self.assertEqual(id_index.get_src_type("MULTI"), "Symbol")
+        self.assertIsNone(id_index.get_src_type("NONE"))
+
+    def test_load_saved(self):
+        util.build_id_conversion_index(self.tmpdir)
+        id_index = IDConversionIndex.load(osp.join(self.tmpdir, config.ID_CONVERSION_INDEX_FILENAME))
+        self.assertEqual(id_index.convert(["ENST01", "NONE"]), [["8"], None])
+        self.assertEqual(id_index.src_types, config.ID_CONVERSION_SRC_TYPES)
+
+    def test_rebuild_outdated(self):
+        tmpdir = osp.join(self.tmpdir, "outdated")
+        shutil.copytree(self.tmpdir, tmpdir, ignore=shutil.ignore_patterns("outdated", "*.npz"))
+        self.assertEqual(util.load_id_conversion_index(tmpdir).convert(["NEW"]), [None])
+
+        # Updating any of the conversion files (not only the ENSG one) must invalidate the index
+        path = osp.join(tmpdir, "IDconversion_Homo-sapiens_Symbol-to-Entrez.json")
+        with open(path, "w") as f:
+            json.dump({"new": ["9"]}, f)
+        index_mtime = os.stat(osp.join(tmpdir, config.ID_CONVERSION_INDEX_FILENAME)).st_mtime_ns
+        os.utime(path, ns=(index_mtime + 10**9, index_mtime + 10**9))
+        self.assertEqual(util.load_id_conversion_index(tmpdir).convert(["NEW", "ABC"]), [["9"], None])
+
+    def test_rebuild_unreadable(self):
+        tmpdir = osp.join(self.tmpdir, "unreadable")
+        shutil.copytree(self.tmpdir, tmpdir, ignore=shutil.ignore_patterns("unreadable", "*.npz"))
+        index_path = osp.join(tmpdir, config.ID_CONVERSION_INDEX_FILENAME)
+        with open(index_path, "wb") as f:
+            f.write(b"PK\x03\x04 partially written")
+        with self.assertLogs("geneplexus", level="WARNING"):
+            id_index = util.load_id_conversion_index(tmpdir)
+        self.assertEqual(id_index.convert(["ENST01"]), [["8"]])
+        self.assertEqual(IDConversionIndex.load(index_path).convert(["ENST01"]), [["8"]])
+        self.assertFalse([name for name in os.listdir(tmpdir) if name.endswith(".tmp")])
+
+
+class TestNetworkIndex(unittest.TestCase):
+    def setUp(self):
+        self.net_index = NetworkIndex(np.array(["30", "10", "20", "5"]))
+
+    def test_get_rows(self):
+        self.assertEqual(self.net_index.get_rows(["5", "10", "1", "30"]).tolist(), [3, 1, -1, 0])
+        self.assertEqual(self.net_index.get_rows([]).tolist(), [])
+        with self.assertRaises(KeyError):
+            self.net_index.get_rows(["5", "1"], missing_ok=False)
+
+    def test_contains(self):
+        self.assertEqual(self.net_index.contains(["5", "6"]).tolist(), [True, False])
+
+    def test_get_mask(self):
+        self.assertEqual(self.net_index.get_mask(["10", "5", "6"]).tolist(), [False, True, False, True])
+
+
+class TestGSCIncidence(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.mkdtemp()
+        gsc = {
+            "T1": {"Name": "Term 1", "Genes": ["1", "2", "3"]},
+            "T2": {"Name": "Term 2", "Genes": ["3", "4", "4"]},
+            "T3": {"Name": "Term 3", "Genes": ["6"]},
+        }
+        with open(osp.join(cls.tmpdir, "GSC_GO_customnet_GoodSets.json"), "w") as f:
+            json.dump(gsc, f)
+        np.savetxt(osp.join(cls.tmpdir, "GSC_GO_customnet_universe.txt"), ["1", "2", "3", "4", "5"], fmt="%s")
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmpdir)
+
+    def check_gsc_incidence(self, gsc_incidence):
+        self.assertEqual(gsc_incidence.term_ids.tolist(), ["T1", "T2", "T3"])
+        self.assertEqual(gsc_incidence.term_names.tolist(), ["Term 1", "Term 2", "Term 3"])
+        self.assertEqual(gsc_incidence.set_sizes.tolist(), [3, 3, 1])
+        self.assertEqual(gsc_incidence.genes.tolist(), ["1", "2", "3", "4", "5", "6"])
+        self.assertEqual(gsc_incidence.in_universe.tolist(), [True] * 5 + [False])
+        self.assertEqual(gsc_incidence.universe_size, 5)
+
+        gene_mask = gsc_incidence.get_gene_mask(["3", "4", "7"])
+        self.assertEqual(gene_mask.tolist(), [False, False, True, True, False, False])
+        self.assertEqual(gsc_incidence.get_overlaps(gene_mask).tolist(), [1, 2, 0])
+
+        annotated = gsc_incidence.get_annotated_mask(np.array([False, True, True]))
+        self.assertEqual(annotated.tolist(), [False, False, True, True, False, True])
+
+    def test_gsc_incidence(self):
+        self.check_gsc_incidence(util.load_gsc_incidence(self.tmpdir, "GO", "customnet"))
+
+    def test_load_saved(self):
+        util.build_gsc_incidence(self.tmpdir, "GO", "customnet")
+        self.check_gsc_incidence(GSCIncidence.load(osp.join(self.tmpdir, "GSC_GO_customnet_GoodSets.npz")))
+
+
+class TestPretrainedModels(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        pretrained_weights = {
+            "T1": {"Name": "Term 1", "Weights": [3.0, 4.0], "PosGenes": ["1"]},
+            "T2": {"Name": "Term 2", "Weights": [0.0, 2.0], "PosGenes": ["2"]},
+        }
+        with open(osp.join(self.tmpdir, "PreTrainedWeights_GO_customnet_Embedding.json"), "w") as f:
+            json.dump(pretrained_weights, f)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_pretrained_models(self):
+        pretrained_models = util.load_pretrained_models(self.tmpdir, "GO", "customnet", "Embedding")
+        self.assertTrue(osp.isfile(osp.join(self.tmpdir, "PreTrainedWeights_GO_customnet_Embedding.npz")))
+
+        pretrained_models = PretrainedModels.load(osp.join(self.tmpdir, "PreTrainedWeights_GO_customnet_Embedding.npz"))
+        self.assertEqual(pretrained_models.term_ids.tolist(), ["T1", "T2"])
+        self.assertEqual(pretrained_models.term_names.tolist(), ["Term 1", "Term 2"])
+        self.assertTrue(np.allclose(pretrained_models.weights, [[0.6, 0.8], [0.0, 1.0]]))
+        self.assertEqual(pretrained_models.get_rows(["T2", "T1"]).tolist(), [1, 0])
+        with self.assertRaises(KeyError):
+            pretrained_models.get_rows(["T3"])
+
+
+class TestFeatureStats(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        rng = np.random.default_rng(0)
+        self.data = rng.normal(3, 2, size=(101, 7))
+        self.data[:, 2] = 5  # constant feature
+        np.save(osp.join(self.tmpdir, "Data_Embedding_customnet.npy"), self.data)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_feature_stats(self):
+        # Small chunks to test combining the statistics of row blocks
+        with mock.patch("geneplexus.index.FEATURE_CHUNK_BYTES", 10 * 7 * 8):
+            feature_stats = util.load_feature_stats(self.tmpdir, "Embedding", "customnet")
+        self.assertTrue(osp.isfile(osp.join(self.tmpdir, "DataStats_Embedding_customnet.npz")))
+
+        std_scale = StandardScaler().fit(self.data)
+        self.assertEqual(feature_stats.shape, self.data.shape)
+        self.assertTrue(np.allclose(feature_stats.mean, std_scale.mean_))
+        self.assertTrue(np.allclose(feature_stats.var, std_scale.var_))
+        self.assertTrue(np.allclose(feature_stats.scale, std_scale.scale_))
+        self.assertTrue(np.allclose(feature_stats.transform(self.data), std_scale.transform(self.data)))
+
+        feature_stats = FeatureStats.load(osp.join(self.tmpdir, "DataStats_Embedding_customnet.npz"))
+        self.assertTrue(np.allclose(feature_stats.transform(self.data), std_scale.transform(self.data)))
+
+    def test_fold_into_linear_model(self):
+        feature_stats = FeatureStats.from_data(self.data)
+        coef, intercept = np.arange(7.0), 0.5
+        new_coef, new_intercept = feature_stats.fold_into_linear_model(coef, intercept)
+        self.assertTrue(
+            np.allclose(feature_stats.transform(self.data) @ coef + intercept, self.data @ new_coef + new_intercept)
+        )
+
+
+class TestEdgeStore(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        edges = [("1", "2", 0.5), ("3", "1", 0.2), ("2", "4", 0.9), ("3", "2", 0.1), ("1", "3", 0.4)]
+        with open(osp.join(self.tmpdir, "Edgelist_customnet.edg"), "w") as f:
+            f.write("\n".join("\t".join(map(str, edge)) for edge in edges))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_edge_store(self):
+        edge_store = util.load_edge_store(self.tmpdir, "customnet")
+        self.assertTrue(osp.isdir(osp.join(self.tmpdir, "EdgelistIndex_customnet")))
+        self.assertEqual(len(edge_store), 5)
+
+        edge_store = EdgeStore.load(osp.join(self.tmpdir, "EdgelistIndex_customnet"))
+        self.assertIsInstance(edge_store.node1, np.memmap)
+        self.assertEqual(edge_store.get_induced_edges(["1", "3"]).tolist(), [1, 4])
+        self.assertEqual(edge_store.get_induced_edges(["3", "2", "1", "5"]).tolist(), [0, 1, 3, 4])
+        self.assertEqual(edge_store.get_induced_edges(["4", "5"]).tolist(), [])
+        self.assertEqual(edge_store.get_induced_edges([]).tolist(), [])
+
+        edge_ids = edge_store.get_induced_edges(["2", "4"])
+        self.assertEqual(edge_store.nodes[edge_store.node1[edge_ids]].tolist(), ["2"])
+        self.assertEqual(edge_store.nodes[edge_store.node2[edge_ids]].tolist(), ["4"])
+        self.assertEqual(edge_store.weights[edge_ids].tolist(), [0.9])
+
+    def test_save_replace(self):
+        path = osp.join(self.tmpdir, "EdgelistIndex_customnet")
+        edge_store = util.load_edge_store(self.tmpdir, "customnet")
+        loaded = EdgeStore.load(path)
+        EdgeStore(*(getattr(edge_store, name)[:0] for name in EdgeStore._arrays)).save(path)
+
+        # The previously memory-mapped arrays stay intact, and no temporary directories are left
+        self.assertEqual(loaded.get_induced_edges(["1", "3"]).tolist(), [1, 4])
+        self.assertEqual(len(EdgeStore.load(path)), 0)
+        self.assertEqual(sorted(os.listdir(self.tmpdir)), ["EdgelistIndex_customnet", "Edgelist_customnet.edg"])
+
+
 def test_timeout():
     @util.timeout(5)
     def wait():